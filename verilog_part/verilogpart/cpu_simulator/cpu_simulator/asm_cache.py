@@ -0,0 +1,209 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+import instruction
+import stream_assembler
+
+# Content-addressed on-disk cache of assembled programs.
+# Entries are keyed by a hash of the source text, the assembler VERSION and
+# the encoding tables in instruction.py (OPCODES, FUNCT_CODES, REG_MAP), and
+# hold the encoded words plus the symbol table in a compact binary file:
+#
+#   header   magic "ASMC", format, byte order, word count, symbol count
+#   words    word count x uint32 (native byte order, see header)
+#   symbols  symbol count x (uint32 address, uint16 length, utf-8 name)
+#
+# A hit memory-maps the file and exposes the words as a memoryview, without
+# parsing. Entries are written to a temporary file and moved into place with
+# os.replace(), so concurrent processes only ever see whole files; a reader
+# that loses a race to eviction just sees a miss. Each hit refreshes the
+# entry's mtime, and put() evicts least recently used entries until the
+# directory is back under max_bytes.
+#
+#   cache = AsmCache()
+#   with cache.assemble(source) as entry:
+#       entry.words, entry.symbols
+
+MAGIC = b"ASMC"
+FORMAT = 1
+HEADER = struct.Struct("<4sBcxxII")  # magic, format, byte order, words, symbols
+SYMBOL = struct.Struct("<IH")
+SUFFIX = ".asmc"
+BYTE_ORDER = b"L" if sys.byteorder == "little" else b"B"
+
+DEFAULT_DIR = os.environ.get("ASM_CACHE_DIR",
+                             os.path.join(os.path.expanduser("~"), ".cache", "cpu_simulator", "asm"))
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def isa_digest():
+    # Editing an opcode, funct code or register number changes the words
+    # without touching the source or VERSION
+    tables = (instruction.OPCODES, instruction.FUNCT_CODES, instruction.REG_MAP)
+    return hashlib.sha256(repr([sorted(table.items()) for table in tables]).encode()).hexdigest()
+
+
+def source_key(source, version=stream_assembler.VERSION, isa=None):
+    if isa is None:
+        isa = isa_digest()
+    digest = hashlib.sha256(f"asm-v{version}\n{isa}\n".encode())
+    digest.update(source.encode())
+    return digest.hexdigest()
+
+
+def encode(words, symbols):
+    words = array("I", words)
+    parts = [HEADER.pack(MAGIC, FORMAT, BYTE_ORDER, len(words), len(symbols)), words.tobytes()]
+    for name, addr in symbols.items():
+        raw = name.encode()
+        parts.append(SYMBOL.pack(addr, len(raw)))
+        parts.append(raw)
+    return b"".join(parts)
+
+
+class CachedProgram:
+    # A mapped cache entry; close it (or use `with`) to release the mapping
+    def __init__(self, key, buffer):
+        self.key = key
+        self._map = buffer
+        magic, fmt, order, n_words, n_symbols = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or fmt != FORMAT or order != BYTE_ORDER:
+            raise ValueError("Not a cache entry for this format")
+        start = HEADER.size
+        end = start + 4 * n_words
+        if end > len(buffer):
+            raise ValueError("Truncated cache entry")
+        self.words = memoryview(buffer)[start:end].cast("I")
+        self.symbols = {}
+        offset = end
+        for _ in range(n_symbols):
+            addr, length = SYMBOL.unpack_from(buffer, offset)
+            offset += SYMBOL.size
+            self.symbols[bytes(buffer[offset:offset + length]).decode()] = addr
+            offset += length
+
+    def __len__(self):
+        return len(self.words)
+
+    def close(self):
+        if self._map is not None:
+            self.words.release()
+            if isinstance(self._map, mmap.mmap):
+                self._map.close()
+            self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsmCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or DEFAULT_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, source):
+        # Mapped entry for `source`, or None
+        key = source_key(source)
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    raise ValueError("Empty cache entry")
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                entry = CachedProgram(key, buffer)
+            except (ValueError, struct.error):
+                buffer.close()
+                raise
+        except (OSError, ValueError, struct.error):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path) # Recently used, for evict()
+        except OSError:
+            pass # Read-only cache: the entry is still good
+        self.hits += 1
+        return entry
+
+    def put(self, source, words, symbols):
+        key = source_key(source)
+        data = encode(words, symbols)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=key[:16], suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.path(key))
+        except OSError:
+            # Another process holds the entry open (Windows); its copy is identical
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        self.evict(keep=key)
+        return key
+
+    def assemble(self, source):
+        # Cached entry for `source`, assembling and storing it on a miss
+        entry = self.get(source)
+        if entry is None:
+            asm = stream_assembler.StreamAssembler()
+            words = asm.assemble(source.splitlines())
+            key = self.put(source, words, asm.symbols)
+            entry = CachedProgram(key, encode(words, asm.symbols))
+        return entry
+
+    def entries(self):
+        # (mtime, size, path) of every entry, least recently used first
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found.append((stat.st_mtime, stat.st_size, path))
+        found.sort()
+        return found
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        keep = keep and self.path(keep)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue # Already gone, or mapped by a reader (Windows)
+            total -= size
+        return total
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
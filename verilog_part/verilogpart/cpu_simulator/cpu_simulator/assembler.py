@@ -1,3 +1,4 @@
+import copy
 import re
 from instruction import RType, IType, JType
 
@@ -5,35 +6,35 @@ class Assembler:
     def __init__(self):
         self.label_pattern = re.compile(r"^(\w+):")
         self.comment_pattern = re.compile(r"#.*$")
+        self.mem_pattern = re.compile(r"(-?\d+)\((\$\w+)\)") # offset($base)
         
         self.r_type_ops = ["ADD", "SUB", "AND", "OR", "SLT", "JR"]
         self.i_type_ops = ["ADDI", "LW", "SW", "BEQ", "BNE", "LOAD", "STORE"]
         self.j_type_ops = ["J", "JAL"]
         self.pseudo_ops = ["CALL", "RET"]
 
+        # Filled in by assemble(): label -> address, and the 1-based source
+        # line of each assembled instruction (indexed by address)
+        self.symbols = {}
+        self.line_map = []
+
     def assemble(self, source_code):
         lines = source_code.splitlines()
         clean_lines = []
         labels = {}
+        line_map = []
         instruction_list = []
         
         # Pass 1: Clean code and find labels
         inst_idx = 0
-        for line in lines:
-            line = self.comment_pattern.sub("", line).strip()
-            if not line:
-                continue
-                
-            # Check for label
-            label_match = self.label_pattern.match(line)
-            if label_match:
-                label = label_match.group(1)
+        for line_no, line in enumerate(lines, 1):
+            label, line = self._clean(line)
+            if label:
                 labels[label] = inst_idx
-                # Remove label from line
-                line = line[len(label)+1:].strip()
             
             if line:
                 clean_lines.append(line)
+                line_map.append(line_no)
                 inst_idx += 1
                 
         # Pass 2: Parse instructions
@@ -42,11 +43,24 @@ class Assembler:
                 instr = self._parse_line(line, labels, idx)
                 instruction_list.append(instr)
             except Exception as e:
-                print(f"Error parsing line {idx+1}: {line} -> {e}")
-                raise e
+                # Raise rather than print: callers such as batch_runner own stdout
+                raise ValueError(f"Error parsing line {line_map[idx]}: {line} -> {e}") from e
                 
+        self.symbols = labels
+        self.line_map = line_map
         return instruction_list
 
+    def _clean(self, line):
+        # Strip the comment and split off a leading label: (label or None, text)
+        line = self.comment_pattern.sub("", line).strip()
+        label = None
+        label_match = self.label_pattern.match(line)
+        if label_match:
+            label = label_match.group(1)
+            # Remove label from line
+            line = line[len(label)+1:].strip()
+        return label, line
+
     def _parse_line(self, line, labels, current_addr):
         # Normalize commas
         parts = line.replace(",", " ").split()
@@ -108,7 +122,7 @@ class Assembler:
                  rt = args[0]
                  addr_part = args[1]
                  
-                 match = re.match(r"(-?\d+)\((\$\w+)\)", addr_part)
+                 match = self.mem_pattern.match(addr_part)
                  if match:
                      imm = int(match.group(1))
                      rs1 = match.group(2)
@@ -121,7 +135,7 @@ class Assembler:
                  rt = args[0]
                  addr_part = args[1]
                  
-                 match = re.match(r"(-?\d+)\((\$\w+)\)", addr_part)
+                 match = self.mem_pattern.match(addr_part)
                  if match:
                      imm = int(match.group(1))
                      rs1 = match.group(2)
@@ -144,3 +158,119 @@ class Assembler:
             addr = int(target)
             
         return JType(opcode, address=addr)
+
+
+class IncrementalAssembler(Assembler):
+    # Re-assembles an edited buffer by patching the previous result.
+    # Cleaned lines are cached by their raw text and parsed instructions by
+    # their cleaned text; only the edited region is parsed again, plus any
+    # unchanged instruction whose label moved. update() returns the patch as
+    # (start, stop, instructions) slice replacements against the previous
+    # program, in address order.
+
+    def __init__(self):
+        super().__init__()
+        self.program = []
+        self._texts = []   # Cleaned text per address
+        self._refs = []    # Label referenced per address, or None
+        self._lines = {}   # Raw line -> (label, text)
+        self._parsed = {}  # Text -> pristine Instruction, for label-free lines
+
+    def assemble(self, source_code):
+        self.update(source_code)
+        return self.program
+
+    def update(self, source_code):
+        texts = []
+        labels = {}
+        line_map = []
+        cache = self._lines
+        for line_no, line in enumerate(source_code.splitlines(), 1):
+            entry = cache.get(line)
+            if entry is None:
+                entry = cache[line] = self._clean(line)
+            label, text = entry
+            if label:
+                labels[label] = len(texts)
+            if text:
+                texts.append(text)
+                line_map.append(line_no)
+
+        # Edited region: everything between the common prefix and suffix
+        old = self._texts
+        n_old, n_new = len(old), len(texts)
+        start = 0
+        while start < min(n_old, n_new) and old[start] == texts[start]:
+            start += 1
+        tail = 0
+        while tail < min(n_old, n_new) - start and old[n_old - 1 - tail] == texts[n_new - 1 - tail]:
+            tail += 1
+        if n_new != n_old:
+            # Instructions that move get fresh objects: the old ones carry the
+            # address predecode() recorded and the results of earlier runs
+            tail = 0
+
+        moved = {label for label in set(self.symbols) | set(labels)
+                 if self.symbols.get(label) != labels.get(label)}
+        shift = n_new - n_old
+        patch = []
+        refs = self._refs[:start]
+        for addr in range(start):
+            if refs[addr] in moved:
+                patch.append((addr, addr + 1, [self._parse_cached(texts[addr], labels, addr)]))
+
+        middle = []
+        for addr in range(start, n_new - tail):
+            middle.append(self._parse_cached(texts[addr], labels, addr))
+            refs.append(self._label_ref(texts[addr]))
+        if middle or n_old - tail > start:
+            patch.append((start, n_old - tail, middle))
+
+        for addr in range(n_old - tail, n_old):
+            ref = self._refs[addr]
+            refs.append(ref)
+            if ref in moved:
+                patch.append((addr, addr + 1, [self._parse_cached(texts[addr + shift], labels, addr + shift)]))
+
+        self.program = apply_patch(self.program, patch)
+        self._texts = texts
+        self._refs = refs
+        self.symbols = labels
+        self.line_map = line_map
+        # Keep the caches to the lines of the current buffer
+        self._lines = {line: cache[line] for line in source_code.splitlines()}
+        parsed = self._parsed
+        self._parsed = {text: parsed[text] for text in texts if text in parsed}
+        return patch
+
+    def _label_ref(self, text):
+        parts = text.replace(",", " ").split()
+        opcode = parts[0].upper()
+        if opcode in ("BEQ", "BNE") and len(parts) > 3:
+            return parts[3]
+        if opcode in ("J", "JAL", "CALL") and len(parts) > 1:
+            return parts[1]
+        return None
+
+    def _parse_cached(self, text, labels, addr):
+        if self._label_ref(text) in labels:
+            return self._parse_checked(text, labels, addr)
+        template = self._parsed.get(text)
+        if template is None:
+            template = self._parsed[text] = self._parse_checked(text, labels, addr)
+        # Every address gets its own object: the pipeline annotates instructions
+        return copy.copy(template)
+
+    def _parse_checked(self, text, labels, addr):
+        try:
+            return self._parse_line(text, labels, addr)
+        except Exception as e:
+            raise ValueError(f"Error parsing instruction {addr}: {text} -> {e}") from e
+
+
+def apply_patch(program, patch):
+    # Apply (start, stop, instructions) replacements made against `program`
+    program = list(program)
+    for start, stop, instructions in reversed(patch):
+        program[start:stop] = instructions
+    return program
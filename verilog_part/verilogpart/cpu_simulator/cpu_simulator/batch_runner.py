@@ -0,0 +1,133 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from assembler import Assembler
+from cpu import CPU
+from instruction import JType
+from memory import PagedMemory
+from pipeline import Pipeline
+from predecode import predecode
+from predictor import make_predictor, PREDICTORS
+from program_image import load_program
+
+# Headless batch runner: assembles every .asm file found in a directory or
+# glob and simulates them on a process pool, streaming one JSON object per
+# program to a JSON Lines file as jobs complete.
+#
+#   python batch_runner.py programs/ -o results.jsonl --max-cycles 100000 --timeout 10
+
+CHECK_EVERY = 1024 # Cycles between wall-clock checks
+
+
+def find_programs(target):
+    if os.path.isdir(target):
+        return sorted(glob.glob(os.path.join(target, "*.asm")))
+    return sorted(glob.glob(target))
+
+
+def simulate_file(path, max_cycles, time_limit, predictor=None):
+    result = {"program": path, "status": "error", "cycles": 0}
+    start = time.monotonic()
+    try:
+        if path.endswith((".hex", ".mem", ".bin")):
+            program = load_program(path) # RTL instruction image, byte-addressed targets
+        else:
+            with open(path, "r") as f:
+                program = Assembler().assemble(f.read())
+        predecode(program)
+
+        # "End: J End" marks the end of a program once it reaches WB
+        halts = {id(instr) for pc, instr in enumerate(program)
+                 if isinstance(instr, JType) and instr.opcode == "J" and instr.address == pc}
+
+        cpu = CPU()
+        mem = PagedMemory()
+        pipe = Pipeline(cpu, mem, dispatch=True)
+        if predictor is not None:
+            pipe.predictor = make_predictor(predictor)
+        cycles = 0
+        status = "cycle_limit"
+        while cycles < max_cycles:
+            pipe.fetch(program)
+            pipe.step()
+            cycles += 1
+            if pipe.WB is not None and id(pipe.WB) in halts:
+                status = "halted"
+                break
+            if cpu.pc >= len(program) and not pipe.busy():
+                status = "halted"
+                break
+            if cycles % CHECK_EVERY == 0 and time.monotonic() - start > time_limit:
+                status = "timeout"
+                break
+
+        result["status"] = status
+        result["cycles"] = cycles
+        result["pc"] = cpu.pc
+        result["registers"] = cpu.registers
+        result["memory"] = memory_diff(mem)
+        result["counters"] = pipe.counters.as_dict()
+        if pipe.predictor is not None:
+            result["predictor"] = pipe.predictor.stats()
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["elapsed"] = round(time.monotonic() - start, 6)
+    return result
+
+
+def memory_diff(mem):
+    # Non-zero words, i.e. the difference from the all-zero reset state
+    diff = []
+    for n in mem.mapped_pages():
+        base = mem.page_base(n)
+        for offset, value in enumerate(mem.pages[n]):
+            if value:
+                diff.append([base + offset, value])
+    return diff
+
+
+def run_batch(paths, out, max_cycles=100000, time_limit=10.0, workers=None, predictor=None):
+    counts = {}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(simulate_file, path, max_cycles, time_limit, predictor) for path in paths]
+        for future in as_completed(futures):
+            result = future.result()
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Assemble and simulate a batch of .asm programs")
+    parser.add_argument("target", help="directory or glob pattern of .asm files (or .hex/.mem/.bin images)")
+    parser.add_argument("-o", "--output", default="-", help="JSON Lines output file (default: stdout)")
+    parser.add_argument("--max-cycles", type=int, default=100000, help="cycle limit per program")
+    parser.add_argument("--timeout", type=float, default=10.0,
+                        help=f"wall-clock limit per program in seconds, checked every {CHECK_EVERY} simulated cycles "
+                             "(assembly itself is not interrupted)")
+    parser.add_argument("--workers", type=int, default=None, help="process count (default: all cores)")
+    parser.add_argument("--predictor", choices=sorted(PREDICTORS), default=None, help="branch predictor (default: none)")
+    args = parser.parse_args(argv)
+
+    paths = find_programs(args.target)
+    if not paths:
+        print(f"No .asm files found for {args.target}", file=sys.stderr)
+        return 1
+
+    if args.output == "-":
+        counts = run_batch(paths, sys.stdout, args.max_cycles, args.timeout, args.workers, args.predictor)
+    else:
+        with open(args.output, "w") as out:
+            counts = run_batch(paths, out, args.max_cycles, args.timeout, args.workers, args.predictor)
+    print(f"{len(paths)} programs: {counts}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
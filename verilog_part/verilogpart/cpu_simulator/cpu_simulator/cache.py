@@ -0,0 +1,154 @@
+import copy
+import random
+from collections import deque
+
+# Timing model of a cache in front of Memory.
+# Data always lives in Memory: the cache only tracks which lines it holds,
+# so access() returns the extra cycles an access costs (0 on a hit) and the
+# pipeline freezes for that long. Attach as pipe.icache (fetch) and/or
+# pipe.dcache (loads and stores). Sizes are in 16-bit words.
+#
+# Write-back caches allocate on writes and send dirty victims through the
+# write buffer; write-through caches do not allocate on write misses and
+# send every store through it. A full write buffer stalls until its oldest
+# entry has drained (one per write_latency cycles).
+
+REPLACEMENT = ("lru", "fifo", "random")
+WRITE_POLICIES = ("write-back", "write-through")
+
+
+def _log2(value, what):
+    if value <= 0 or value & (value - 1):
+        raise ValueError(f"{what} must be a power of two, got {value}")
+    return value.bit_length() - 1
+
+
+class Cache:
+    def __init__(self, size=256, assoc=2, line_size=4, replacement="lru", write_policy="write-back",
+                 miss_latency=10, write_buffer=4, write_latency=None, seed=0, name="cache"):
+        if replacement not in REPLACEMENT:
+            raise ValueError(f"Unknown replacement policy: {replacement}")
+        if write_policy not in WRITE_POLICIES:
+            raise ValueError(f"Unknown write policy: {write_policy}")
+        self.name = name
+        self.size = size
+        self.assoc = assoc
+        self.line_size = line_size
+        self.replacement = replacement
+        self.write_back = write_policy == "write-back"
+        self.miss_latency = miss_latency
+        self.write_latency = miss_latency if write_latency is None else write_latency
+        self.write_buffer = write_buffer
+
+        self.offset_bits = _log2(line_size, "line_size")
+        sets = size // (assoc * line_size)
+        _log2(sets, "size / (assoc * line_size)")
+        self.set_mask = sets - 1
+        self.rng = random.Random(seed)
+        self.flush()
+        self.reset_stats()
+
+    def flush(self):
+        # Invalidate everything (dirty lines are dropped, data is in Memory)
+        self.sets = [[] for _ in range(self.set_mask + 1)] # Line numbers, oldest first
+        self.dirty = set()
+        self.pending = deque() # Write buffer: cycle each entry finishes draining
+        self._last = -1        # Line of the previous read, still most recently used
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0    # Dirty lines written back
+        self.buffer_stalls = 0 # Cycles waiting for a full write buffer
+        self.stall_cycles = 0  # All cycles returned by access()
+
+    @property
+    def accesses(self):
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.accesses if self.accesses else 0.0
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "accesses": self.accesses,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "evictions": self.evictions,
+            "writebacks": self.writebacks,
+            "buffer_stalls": self.buffer_stalls,
+            "stall_cycles": self.stall_cycles,
+        }
+
+    def access(self, address, write=False, cycle=0):
+        line = address >> self.offset_bits
+        if line == self._last and not write:
+            self.hits += 1
+            return 0
+
+        ways = self.sets[line & self.set_mask]
+        latency = 0
+        if line in ways:
+            self.hits += 1
+            if self.replacement == "lru" and ways[-1] != line:
+                ways.remove(line)
+                ways.append(line)
+        else:
+            self.misses += 1
+            if write and not self.write_back:
+                # No write allocate: the store only goes through the buffer
+                latency = self._buffer(cycle)
+                self.stall_cycles += latency
+                return latency
+            latency = self.miss_latency
+            if len(ways) == self.assoc:
+                if self.replacement == "random":
+                    victim = ways.pop(self.rng.randrange(self.assoc))
+                else:
+                    victim = ways.pop(0)
+                self.evictions += 1
+                if victim == self._last:
+                    self._last = -1
+                if victim in self.dirty:
+                    self.dirty.discard(victim)
+                    self.writebacks += 1
+                    latency += self._buffer(cycle)
+            ways.append(line)
+
+        if write:
+            self._last = -1 # Keeps the read fast path from skipping an LRU update
+            if self.write_back:
+                self.dirty.add(line)
+            else:
+                latency += self._buffer(cycle)
+        else:
+            self._last = line
+        self.stall_cycles += latency
+        return latency
+
+    def _buffer(self, cycle):
+        # Queue one write; returns the cycles spent waiting for a free entry
+        pending = self.pending
+        while pending and pending[0] <= cycle:
+            pending.popleft()
+        stall = 0
+        if len(pending) >= self.write_buffer:
+            if pending:
+                stall = pending.popleft() - cycle
+            else:
+                stall = self.write_latency # No buffer: write straight through
+        start = max(cycle + stall, pending[-1] if pending else 0)
+        if self.write_buffer:
+            pending.append(start + self.write_latency)
+        self.buffer_stalls += stall
+        return stall
+
+    def snapshot(self):
+        return copy.deepcopy(self.__dict__)
+
+    def restore(self, state):
+        self.__dict__.update(copy.deepcopy(state))
@@ -0,0 +1,215 @@
+import argparse
+import sys
+from collections import deque, namedtuple
+from itertools import zip_longest
+
+from asm_cache import AsmCache, DEFAULT_DIR
+from assembler import Assembler
+from batch_runner import find_programs
+from cpu import CPU
+from instruction import JType
+from memory import PagedMemory
+from pipeline import Pipeline
+from predecode import predecode, OP_JAL, RA
+from program_image import REGISTERS, decode_word, encode_program, format_instruction, rtl_words, write_mem
+from rtl_model import RTLModel, MASK
+
+# Differential co-simulation of the Python Pipeline against the RTL core.
+# Both sides are reduced to a commit stream: one Commit per register write,
+# in retirement order, holding the cycle, the word address of the writing
+# instruction, the register and the 16-bit value. The streams are compared
+# lazily and the first commit that differs in pc, register or value is
+# reported; cycles are shown but not compared, as the two cores need not
+# have the same timing.
+#
+# The RTL stream comes from a tb_cpu.v waveform (mem_wb_reg_write,
+# mem_wb_dest_reg and write_back_data sampled at each rising clock edge,
+# streamed so long dumps never sit in memory), or from rtl_model.RTLModel
+# when there is no simulator at hand.
+#
+# The assembler resolves labels to word indices, while the RTL fetches by
+# byte address (pc steps by 2) and adds branch offsets to pc+2. rtl_image()
+# rewrites the targets, so both cores run the same program. JAL link values
+# are likewise halved to word addresses before comparison. With an
+# asm_cache.AsmCache the RTL image is built from the cached words, so a
+# corpus is only encoded once.
+#
+#   python cosim.py sum_loop.asm                      # against RTLModel
+#   python cosim.py sum_loop.asm --image program.mem  # image for instruction_memory.v
+#   vvp cpu_sim.vvp                                   # writes cpu_wave.vcd
+#   python cosim.py sum_loop.asm --vcd cpu_wave.vcd
+#   python cosim.py programs/ --max-cycles 1000000    # a whole corpus
+#   python cosim.py programs/ --asm-cache             # image words cached on disk
+
+DEFAULT_SCOPE = "tb_cpu.uut"
+
+Commit = namedtuple("Commit", ["cycle", "pc", "reg", "value"])
+Divergence = namedtuple("Divergence", ["index", "expected", "actual"])
+
+
+def rtl_image(program):
+    # Instruction words for instruction_memory.v, with byte-addressed
+    # J/JAL targets and BEQ/BNE offsets relative to pc+2
+    return rtl_words(encode_program(program))
+
+
+def pipeline_commits(program, max_cycles=100000):
+    # Streams the register writes of the Python Pipeline as Commits
+    predecode(program)
+    address = {id(instr): pc for pc, instr in enumerate(program)}
+    halts = {id(instr) for pc, instr in enumerate(program)
+             if isinstance(instr, JType) and instr.opcode == "J" and instr.address == pc}
+    cpu = CPU()
+    pipe = Pipeline(cpu, PagedMemory(), dispatch=True)
+
+    # JAL writes $ra in EX; hold the value until the JAL retires
+    links = deque()
+    for cycle in range(max_cycles):
+        pipe.fetch(program)
+        pipe.step()
+        wb, ex = pipe.WB, pipe.EX
+        if ex is not None and ex.decoded.op == OP_JAL:
+            links.append(cpu.regs[RA])
+        if wb is not None:
+            rec = wb.decoded
+            if rec.op == OP_JAL:
+                yield Commit(cycle, address[id(wb)], RA, links.popleft())
+            elif rec.wb:
+                yield Commit(cycle, address[id(wb)], rec.wb, getattr(wb, 'result', 0) & MASK)
+            if id(wb) in halts:
+                return
+        if cpu.pc >= len(program) and not pipe.busy():
+            return
+
+
+def model_commits(words, max_cycles=100000):
+    # Streams the register writes of RTLModel running `words` as Commits
+    model = RTLModel(words)
+    model.commits = commits = []
+    pcs = deque([0, 0], maxlen=2) # ID/EX pc+2 of the last two edges
+    for _ in range(max_cycles):
+        pc = model.id_ex[11]
+        model.step()
+        for cycle, reg, value in commits:
+            yield _rtl_commit(words, cycle, pcs[0], reg, value)
+        commits.clear()
+        pcs.append(pc)
+
+
+def wave_commits(path, words, scope=DEFAULT_SCOPE, clock="tb_cpu.clk", max_cycles=None):
+    # Streams the register writes recorded in a tb_cpu.v waveform as Commits.
+    # Cycles count the rising edges after reset is released. The instruction
+    # in MEM/WB at an edge was in ID/EX two edges earlier, which gives its pc.
+    # Import here: vcd needs numpy, the rest of this module does not.
+    from vcd import clock_samples
+    names = [f"{scope}.{name}" for name in
+             ("reset", "mem_wb_reg_write", "mem_wb_dest_reg", "write_back_data", "id_ex_pc_plus_1")]
+    reset, reg_write, dest, data, id_ex_pc = names
+    cycle = 0
+    pcs = deque([0, 0], maxlen=2)
+    for sample in clock_samples(path, names, clock):
+        if sample[reset] != 0:
+            cycle = 0
+            pcs.extend((0, 0))
+            continue
+        if max_cycles is not None and cycle >= max_cycles:
+            return
+        reg = (sample[dest] or 0) & 7
+        if sample[reg_write] and reg and sample[data] is not None:
+            yield _rtl_commit(words, cycle, pcs[0], reg, sample[data])
+        pcs.append(sample[id_ex_pc] or 0)
+        cycle += 1
+
+
+def _rtl_commit(words, cycle, pc_plus_2, reg, value):
+    pc = ((pc_plus_2 - 2) & MASK) >> 1
+    if pc < len(words) and words[pc] >> 26 == 3: # JAL: link is a byte address
+        value >>= 1
+    return Commit(cycle, pc, reg, value)
+
+
+def compare(expected, actual):
+    # (matching commits, first Divergence or None) of two commit streams;
+    # a stream that ends early diverges with None on its side
+    matched = 0
+    for a, b in zip_longest(expected, actual):
+        if a is None or b is None or a[1:] != b[1:]:
+            return matched, Divergence(matched, a, b)
+        matched += 1
+    return matched, None
+
+
+def describe(divergence, program, words, line_map=None):
+    # Report lines for a Divergence: both commits and their instructions
+    lines = [f"first divergence at commit {divergence.index}"]
+    for side, commit in (("pipeline", divergence.expected), ("rtl", divergence.actual)):
+        if commit is None:
+            lines.append(f"  {side:8s}  no further register writes")
+            continue
+        if side == "pipeline":
+            text = format_instruction(program[commit.pc])
+        else:
+            text = format_instruction(decode_word(words[commit.pc])) if commit.pc < len(words) else "?"
+        where = f"line {line_map[commit.pc]}: " if line_map and commit.pc < len(line_map) else ""
+        lines.append(f"  {side:8s}  cycle {commit.cycle}, pc {commit.pc} ({where}{text}): "
+                     f"{REGISTERS[commit.reg]} = {commit.value:#06x}")
+    return lines
+
+
+def cosim(path, vcd=None, image=None, max_cycles=100000, scope=DEFAULT_SCOPE, cache=None):
+    # Assembles `path` and compares both cores; returns (commits, Divergence or None, report lines)
+    assembler = Assembler()
+    with open(path, "r") as f:
+        source = f.read()
+    program = assembler.assemble(source)
+    if cache is None:
+        words = rtl_image(program)
+    else:
+        with cache.assemble(source) as entry:
+            words = rtl_words(entry.words)
+    if image is not None:
+        write_mem(image, words)
+    if vcd is None:
+        actual = model_commits(words, max_cycles)
+    else:
+        actual = wave_commits(vcd, words, scope, max_cycles=max_cycles)
+    count, divergence = compare(pipeline_commits(program, max_cycles), actual)
+    if divergence is None:
+        return count, None, [f"{count} register writes match"]
+    return count, divergence, describe(divergence, program, words, assembler.line_map)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the Python Pipeline with the cpu.v RTL, commit by commit")
+    parser.add_argument("target", help=".asm file, directory or glob pattern of .asm files")
+    parser.add_argument("--vcd", default=None, help="tb_cpu.v waveform of the program (default: run rtl_model)")
+    parser.add_argument("--image", default=None, help="write the instruction_memory.v image (.mem) here")
+    parser.add_argument("--scope", default=DEFAULT_SCOPE, help=f"hierarchy of the cpu in the VCD (default: {DEFAULT_SCOPE})")
+    parser.add_argument("--max-cycles", type=int, default=100000, help="cycle limit per core")
+    parser.add_argument("--asm-cache", nargs="?", const=DEFAULT_DIR, default=None, metavar="DIR",
+                        help=f"take the RTL image words from an assembly cache (default dir: {DEFAULT_DIR})")
+    args = parser.parse_args(argv)
+    cache = AsmCache(args.asm_cache) if args.asm_cache else None
+
+    paths = find_programs(args.target)
+    if not paths:
+        print(f"No .asm files found for {args.target}", file=sys.stderr)
+        return 1
+    if (args.vcd or args.image) and len(paths) > 1:
+        print("--vcd and --image take a single program", file=sys.stderr)
+        return 1
+
+    diverged = 0
+    for path in paths:
+        _, divergence, report = cosim(path, args.vcd, args.image, args.max_cycles, args.scope, cache)
+        diverged += divergence is not None
+        print(f"{path}: {report[0]}")
+        for line in report[1:]:
+            print(line)
+    if len(paths) > 1:
+        print(f"{len(paths)} programs, {diverged} diverged", file=sys.stderr)
+    return 1 if diverged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
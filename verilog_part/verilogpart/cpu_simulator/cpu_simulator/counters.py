@@ -0,0 +1,126 @@
+# Microarchitectural performance counters.
+# The Pipeline keeps raw counts as it runs (one dict increment per retired
+# instruction, one increment per stall, flush and forwarded operand), cheap
+# enough to leave on. pipe.counters reads them at any time; reset() starts a
+# new region of interest. Cycles are taken from pipe.cycle, and the per-
+# opcode mix and branch/jump split are summed from per-instruction counts
+# when read.
+
+BRANCH_OPS = ("BEQ", "BNE")
+
+
+class PerfCounters:
+    def __init__(self, pipe):
+        self.pipe = pipe
+        self.reset()
+
+    def reset(self):
+        pipe = self.pipe
+        self.start_cycle = pipe.cycle
+        pipe._retired.clear()
+        pipe._flushes.clear()
+        pipe._stalls = 0
+        pipe._squashed = 0
+        pipe._fwd_hits = 0
+        pipe._freeze_cycles = 0
+
+    def snapshot(self):
+        # Raw counts and region start, for Pipeline.snapshot()
+        pipe = self.pipe
+        return (self.start_cycle, dict(pipe._retired), dict(pipe._flushes),
+                pipe._stalls, pipe._squashed, pipe._fwd_hits, pipe._freeze_cycles)
+
+    def restore(self, state):
+        pipe = self.pipe
+        start, retired, flushes, pipe._stalls, pipe._squashed, pipe._fwd_hits, pipe._freeze_cycles = state
+        self.start_cycle = start
+        pipe._retired.clear()
+        pipe._retired.update(retired)
+        pipe._flushes.clear()
+        pipe._flushes.update(flushes)
+
+    @property
+    def cycles(self):
+        return self.pipe.cycle - self.start_cycle
+
+    @property
+    def retired(self):
+        return sum(self.pipe._retired.values())
+
+    @property
+    def cpi(self):
+        retired = self.retired
+        return self.cycles / retired if retired else 0.0
+
+    @property
+    def load_use_stalls(self):
+        return self.pipe._stalls
+
+    @property
+    def branch_flushes(self):
+        # Taken BEQ/BNE
+        return sum(n for instr, n in self.pipe._flushes.items() if instr.opcode in BRANCH_OPS)
+
+    @property
+    def jump_flushes(self):
+        # J/JAL/JR
+        return sum(n for instr, n in self.pipe._flushes.items() if instr.opcode not in BRANCH_OPS)
+
+    @property
+    def flushes(self):
+        return sum(self.pipe._flushes.values())
+
+    @property
+    def squashed(self):
+        # Wrong-path instructions thrown away by flushes
+        return self.pipe._squashed
+
+    @property
+    def forwarding_hits(self):
+        # Operands taken from the MEM stage
+        return self.pipe._fwd_hits
+
+    @property
+    def cache_stalls(self):
+        # Cycles the pipeline was frozen on cache misses
+        return self.pipe._freeze_cycles
+
+    @property
+    def opcodes(self):
+        # Retired instructions per opcode
+        mix = {}
+        for instruction, count in self.pipe._retired.items():
+            mix[instruction.opcode] = mix.get(instruction.opcode, 0) + count
+        return mix
+
+    def as_dict(self):
+        return {
+            "cycles": self.cycles,
+            "retired": self.retired,
+            "cpi": self.cpi,
+            "load_use_stalls": self.load_use_stalls,
+            "branch_flushes": self.branch_flushes,
+            "jump_flushes": self.jump_flushes,
+            "squashed": self.squashed,
+            "forwarding_hits": self.forwarding_hits,
+            "cache_stalls": self.cache_stalls,
+            "opcodes": self.opcodes,
+        }
+
+    def report(self):
+        lines = [
+            f"Cycles:          {self.cycles}",
+            f"Retired:         {self.retired}",
+            f"CPI:             {self.cpi:.3f}",
+            f"Load-use stalls: {self.load_use_stalls}",
+            f"Branch flushes:  {self.branch_flushes}",
+            f"Jump flushes:    {self.jump_flushes}",
+            f"Squashed:        {self.squashed}",
+            f"Forwarding hits: {self.forwarding_hits}",
+            f"Cache stalls:    {self.cache_stalls}",
+            "Opcode mix:",
+        ]
+        retired = self.retired
+        for opcode, count in sorted(self.opcodes.items(), key=lambda item: -item[1]):
+            lines.append(f"  {opcode:<6} {count:>10} {100.0 * count / retired:6.2f}%")
+        return "\n".join(lines)
@@ -1,33 +1,73 @@
+import warnings
+
+from instruction import REG_MAP
+
+# Register file layout: REG_MAP numbers for the architectural registers,
+# $s0-$s7 mapped at 16-23. Slots not listed here are unused.
+# Storage is a fixed 32-entry list indexed by these numbers.
+REG_INDEX = {
+    **REG_MAP, # 0-7
+    "$s0": 16, "$s1": 17, "$s2": 18, "$s3": 19, "$s4": 20, "$s5": 21, "$s6": 22, "$s7": 23, # 16-23 (Mapped arbitrarily here)
+}
+NUM_REGS = 32
+
+REG_NAMES = [None] * NUM_REGS
+for _name, _idx in REG_INDEX.items():
+    REG_NAMES[_idx] = _name
+
 class CPU:
     def __init__(self):
-        self.registers = {}
+        self.regs = [0] * NUM_REGS
+        # Undo journal: when set to a list, writes append (index, old value)
+        self.journal = None
         self.reset()
 
+    # Index-based accessors (hot path)
+    def read(self, idx):
+        return self.regs[idx]
+
+    def write(self, idx, value):
+        if idx: # $zero is read-only
+            if self.journal is not None:
+                self.journal.append((idx, self.regs[idx]))
+            self.regs[idx] = value & 0xFFFF # Enforce 16-bit for this sim data path
+
+    # Name-based accessors (GUI, tests)
     def get_register(self, name):
-        if name == "$zero": return 0
-        return self.registers.get(name, 0)
+        idx = REG_INDEX.get(name)
+        if idx is None: return 0
+        return self.regs[idx]
 
     def set_register(self, name, value):
-        if name == "$zero": return # Read-only
-        if name in self.registers:
-            self.registers[name] = value & 0xFFFF # Enforce 16-bit for this sim data path
-        else:
-            print(f"Warning: Attempt to write to invalid register {name}")
+        idx = REG_INDEX.get(name)
+        if idx is None:
+            warnings.warn(f"Attempt to write to invalid register {name}")
+            return
+        if idx:
+            if self.journal is not None:
+                self.journal.append((idx, self.regs[idx]))
+            self.regs[idx] = value & 0xFFFF
+
+    @property
+    def registers(self):
+        # Name -> value view of the register file
+        regs = self.regs
+        return {name: regs[idx] for name, idx in REG_INDEX.items()}
 
     def reset(self):
-        # Reduced Register Set (8 Total)
-        reg_names = [
-            "$zero", # 0
-            "$t0", "$t1", "$t2", "$t3", # 1-4
-            "$s0", "$s1", "$s2", "$s3", "$s4", "$s5", "$s6", "$s7", # 16-23 (Mapped arbitrarily here)
-            "$v0",   # 5
-            "$sp",   # 6
-            "$ra"    # 7
-        ]
-        self.registers = {name: 0 for name in reg_names}
+        for i in range(NUM_REGS):
+            self.regs[i] = 0
         
         # Specific initializations
-        self.registers["$sp"] = 0xFFF # Stack pointer
+        self.regs[REG_INDEX["$sp"]] = 0xFFF # Stack pointer
         
         self.pc = 0
         self.stack = []
+
+    def snapshot(self):
+        return (tuple(self.regs), self.pc, list(self.stack))
+
+    def restore(self, state):
+        regs, self.pc, stack = state
+        self.regs[:] = regs
+        self.stack = list(stack)
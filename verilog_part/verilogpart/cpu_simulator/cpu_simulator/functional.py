@@ -0,0 +1,102 @@
+from cpu import CPU
+from memory import PagedMemory
+from predecode import (
+    decode,
+    OP_ADD, OP_SUB, OP_AND, OP_OR, OP_SLT, OP_JR, OP_ADDI,
+    OP_LOAD, OP_STORE, OP_BEQ, OP_BNE, OP_J, OP_JAL, RA,
+)
+
+# Functional (ISA-level) interpreter.
+# Retires one instruction per iteration straight from the predecoded records:
+# no pipeline latches, no flushes, no console output. Only architectural
+# results are modelled:
+#   - JAL links the address of the following instruction into $ra
+#   - branches and stores do not write any register
+#   - ALU results and addresses wrap to 16 bits
+# A jump to itself (the "End: J End" idiom) or running off the end of the
+# program halts execution. With stop_at, execution also stops just before
+# the instruction at that address would retire.
+
+OP_STOP = -1 # Replaces the stop_at instruction, so the check costs nothing
+
+def _flatten(program):
+    # (op, rd, rs1, rs2, imm) per address; missing registers read as $zero
+    code = []
+    for instr in program:
+        rec = getattr(instr, "decoded", None) or decode(instr)
+        code.append((rec.op, rec.rd or 0, rec.rs1 or 0, rec.rs2 or 0, rec.imm))
+    return code
+
+
+def run(program, max_instructions=1000000, cpu=None, memory=None, stop_at=None):
+    if cpu is None:
+        cpu = CPU()
+    if memory is None:
+        memory = PagedMemory()
+
+    code = _flatten(program)
+    n = len(code)
+    if stop_at is not None and 0 <= stop_at < n:
+        code[stop_at] = (OP_STOP, 0, 0, 0, 0)
+    regs = cpu.regs
+    load = memory.load
+    store = memory.store
+    pc = cpu.pc
+    retired = 0
+
+    while retired < max_instructions and 0 <= pc < n:
+        op, rd, rs1, rs2, imm = code[pc]
+        retired += 1
+
+        if op == OP_ADDI:
+            if rd:
+                regs[rd] = (regs[rs1] + imm) & 0xFFFF
+        elif op == OP_ADD:
+            if rd:
+                regs[rd] = (regs[rs1] + regs[rs2]) & 0xFFFF
+        elif op == OP_BNE:
+            if regs[rs1] != regs[rd]:
+                pc = imm
+                continue
+        elif op == OP_BEQ:
+            if regs[rs1] == regs[rd]:
+                pc = imm
+                continue
+        elif op == OP_LOAD:
+            if rd:
+                regs[rd] = load((regs[rs1] + imm) & 0xFFFF) & 0xFFFF
+            else:
+                load((regs[rs1] + imm) & 0xFFFF)
+        elif op == OP_STORE:
+            store((regs[rs1] + imm) & 0xFFFF, regs[rd])
+        elif op == OP_SUB:
+            if rd:
+                regs[rd] = (regs[rs1] - regs[rs2]) & 0xFFFF
+        elif op == OP_J:
+            if imm == pc:
+                break
+            pc = imm
+            continue
+        elif op == OP_JAL:
+            regs[RA] = (pc + 1) & 0xFFFF
+            pc = imm
+            continue
+        elif op == OP_JR:
+            pc = regs[rs1]
+            continue
+        elif op == OP_AND:
+            if rd:
+                regs[rd] = regs[rs1] & regs[rs2]
+        elif op == OP_OR:
+            if rd:
+                regs[rd] = regs[rs1] | regs[rs2]
+        elif op == OP_SLT:
+            if rd:
+                regs[rd] = 1 if regs[rs1] < regs[rs2] else 0
+        elif op == OP_STOP:
+            retired -= 1
+            break
+        pc += 1
+
+    cpu.pc = pc
+    return cpu, memory, retired
@@ -0,0 +1,116 @@
+from cpu import CPU
+from instruction import JType
+from memory import PagedMemory
+from pipeline import Pipeline
+from predecode import predecode
+import functional
+
+# Fast-forward-then-detail simulation.
+# The functional interpreter runs the program up to a trigger (an address,
+# a label or an instruction count), then the architectural state (CPU
+# registers/pc and Memory) is handed to a fresh Pipeline. Its predictor and
+# caches are warmed for `warmup` cycles, after which all statistics are
+# reset and `cycles` cycles are simulated in detail. With switch_back the
+# pipeline is then drained and the functional interpreter finishes the run.
+#
+#   result = hybrid.run(program, label="Loop", symbols=asm.symbols,
+#                       cycles=10000, warmup=1000, predictor=TwoBit())
+#   print(result["counters"]["cpi"])
+
+
+def fast_forward(program, pc=None, count=None, cpu=None, memory=None, max_instructions=100000000):
+    # Returns (cpu, memory, retired, triggered)
+    if cpu is None:
+        cpu = CPU()
+    if memory is None:
+        memory = PagedMemory()
+    limit = max_instructions if count is None else min(count, max_instructions)
+    cpu, memory, retired = functional.run(program, limit, cpu, memory, stop_at=pc)
+    if pc is not None:
+        triggered = cpu.pc == pc
+    else:
+        triggered = count is not None and retired == count
+    return cpu, memory, retired, triggered
+
+
+def halt_set(program):
+    # "End: J End" marks the end of a program once it reaches WB
+    return {id(instr) for pc, instr in enumerate(program)
+            if isinstance(instr, JType) and instr.opcode == "J" and instr.address == pc}
+
+
+def detail(pipe, program, cycles, halts=None):
+    # Step the pipeline; returns (cycles run, halted)
+    if halts is None:
+        halts = halt_set(program)
+    cpu = pipe.cpu
+    n = len(program)
+    for cycle in range(1, cycles + 1):
+        pipe.fetch(program)
+        pipe.step()
+        if pipe.WB is not None and id(pipe.WB) in halts:
+            return cycle, True
+        if cpu.pc >= n and not pipe.busy():
+            return cycle, True
+    return cycles, False
+
+
+def drain(pipe):
+    # Stop fetching and let the in-flight instructions finish. Anything
+    # fetched down a wrong path is flushed on the way, so afterwards cpu.pc
+    # is the next instruction to execute.
+    cycles = 0
+    while pipe.busy() or pipe.freeze:
+        pipe.step()
+        cycles += 1
+    return cycles
+
+
+def run(program, pc=None, label=None, symbols=None, count=None, cycles=10000, warmup=0,
+        switch_back=False, max_instructions=100000000, predictor=None, icache=None, dcache=None,
+        dispatch=True, cpu=None, memory=None):
+    if label is not None:
+        if symbols is None or label not in symbols:
+            raise ValueError(f"Unknown label: {label}")
+        pc = symbols[label]
+    if dispatch:
+        predecode(program)
+
+    cpu, memory, ff, triggered = fast_forward(program, pc, count, cpu, memory, max_instructions)
+    result = {"fast_forward": ff, "triggered": triggered, "warmup": 0, "cycles": 0,
+              "halted": False, "tail": 0}
+
+    pipe = Pipeline(cpu, memory, dispatch=dispatch)
+    pipe.predictor = predictor
+    pipe.icache = icache
+    pipe.dcache = dcache
+    result["pipe"] = pipe
+    halts = halt_set(program)
+
+    halted = False
+    if warmup:
+        result["warmup"], halted = detail(pipe, program, warmup, halts)
+    warm_retired = pipe.counters.retired
+    pipe.counters.reset()
+    for structure in (predictor, icache, dcache):
+        if structure is not None:
+            structure.reset_stats()
+
+    if not halted:
+        result["cycles"], halted = detail(pipe, program, cycles, halts)
+    result["halted"] = halted
+    result["counters"] = pipe.counters.as_dict()
+    if predictor is not None:
+        result["predictor"] = predictor.stats()
+    for name, cache in (("icache", icache), ("dcache", dcache)):
+        if cache is not None:
+            result[name] = cache.stats()
+
+    if switch_back and not halted:
+        result["drain"] = drain(pipe)
+        # Retired so far: fast-forward, warmup, window and drain
+        left = max_instructions - ff - warm_retired - pipe.counters.retired
+        cpu, memory, result["tail"] = functional.run(program, max(left, 0), cpu, memory)
+    result["cpu"] = cpu
+    result["memory"] = memory
+    return result
@@ -28,14 +28,26 @@ REG_MAP = {
 }
 
 class Instruction:
+    _word = None # Encoded word, cached by encode()
+
     def __init__(self, opcode):
         self.opcode = opcode
 
     def __str__(self):
         return f"{self.opcode}"
+
+    def encode(self):
+        # 32-bit machine word. Computed once: fields are fixed after assembly
+        word = self._word
+        if word is None:
+            word = self._word = self._encode()
+        return word
+
+    def _encode(self):
+        return 0
     
     def to_binary(self):
-        return "0" * 32
+        return f"{self.encode():032b}"
 
     def _reg_num(self, reg_name):
         return REG_MAP.get(reg_name, 0)
@@ -50,17 +62,16 @@ class RType(Instruction):
     def __str__(self):
         return f"{self.opcode} {self.rd}, {self.rs1}, {self.rs2}"
     
-    def to_binary(self):
+    def _encode(self):
         # R-Type: Opcode(6) | RS(5) | RT(5) | RD(5) | Shamt(5) | Funct(6)
-        op = 0 # R-Type is always 0
-        rs = self._reg_num(self.rs1)
-        rt = self._reg_num(self.rs2)
-        rd = self._reg_num(self.rd)
-        shamt = 0
+        # Opcode and shamt are always 0
+        reg = REG_MAP.get
+        rs = reg(self.rs1, 0)
+        rt = reg(self.rs2, 0)
+        rd = reg(self.rd, 0)
         funct = FUNCT_CODES.get(self.opcode, 0)
         
-        val = (op << 26) | (rs << 21) | (rt << 16) | (rd << 11) | (shamt << 6) | funct
-        return f"{val:032b}"
+        return (rs << 21) | (rt << 16) | (rd << 11) | funct
 
 class IType(Instruction):
     def __init__(self, opcode, rd, rs1, imm):
@@ -75,15 +86,14 @@ class IType(Instruction):
         else:
              return f"{self.opcode} {self.rd}, {self.imm}"
              
-    def to_binary(self):
+    def _encode(self):
         # I-Type: Opcode(6) | RS(5) | RT(5) | Imm(16)
         op = OPCODES.get(self.opcode, 0)
-        rs = self._reg_num(self.rs1) if self.rs1 else 0
-        rt = self._reg_num(self.rd)
+        rs = REG_MAP.get(self.rs1, 0)
+        rt = REG_MAP.get(self.rd, 0)
         imm = self.imm & 0xFFFF # Handle negative
         
-        val = (op << 26) | (rs << 21) | (rt << 16) | imm
-        return f"{val:032b}"
+        return (op << 26) | (rs << 21) | (rt << 16) | imm
 
 class JType(Instruction):
     def __init__(self, opcode, address):
@@ -93,10 +103,9 @@ class JType(Instruction):
     def __str__(self):
         return f"{self.opcode} {self.address}"
         
-    def to_binary(self):
+    def _encode(self):
         # J-Type: Opcode(6) | Address(26)
         op = OPCODES.get(self.opcode, 0)
         addr = self.address & 0x3FFFFFF
         
-        val = (op << 26) | addr
-        return f"{val:032b}"
+        return (op << 26) | addr
@@ -0,0 +1,125 @@
+import numpy as np
+
+from cpu import NUM_REGS, REG_INDEX
+from predecode import (
+    decode,
+    OP_ADD, OP_SUB, OP_AND, OP_OR, OP_SLT, OP_JR, OP_ADDI,
+    OP_LOAD, OP_STORE, OP_BEQ, OP_BNE, OP_J, OP_JAL, RA,
+)
+
+# Lockstep batch engine: N independent CPUs running the same program, held
+# as NumPy arrays (regs: (N, 32), mem: (N, mem_size), both uint16). Each
+# instruction is applied to every lane at that PC as one vectorised
+# operation; uint16 arithmetic gives the 16-bit wraparound. Lanes that
+# diverge at a branch are grouped by PC each step.
+# Semantics match functional.run() with a flat Memory(mem_size): loads
+# outside memory read 0 and stores outside memory are dropped.
+
+class LockstepBatch:
+    def __init__(self, program, lanes, mem_size=256):
+        self.records = [getattr(instr, "decoded", None) or decode(instr) for instr in program]
+        self.lanes = lanes
+        self.mem_size = mem_size
+        self.regs = np.zeros((lanes, NUM_REGS), dtype=np.uint16)
+        self.regs[:, REG_INDEX["$sp"]] = 0xFFF
+        self.mem = np.zeros((lanes, mem_size), dtype=np.uint16)
+        self.pc = np.zeros(lanes, dtype=np.int64)
+        self.active = np.ones(lanes, dtype=bool)
+        self.retired = np.zeros(lanes, dtype=np.int64)
+        self._all = np.arange(lanes)
+
+    def get_register(self, name):
+        return self.regs[:, REG_INDEX[name]]
+
+    def set_register(self, name, values):
+        idx = REG_INDEX[name]
+        if idx:
+            self.regs[:, idx] = np.asarray(values, dtype=np.int64) & 0xFFFF
+
+    def step(self):
+        # Execute one instruction on every active lane; False once all halted
+        act = np.flatnonzero(self.active)
+        if act.size == 0:
+            return False
+        pcs = self.pc[act]
+        first = pcs[0]
+        if (pcs == first).all():
+            self._execute(int(first), act)
+        else:
+            for pc in np.unique(pcs):
+                self._execute(int(pc), act[pcs == pc])
+        return True
+
+    def run(self, max_steps=1000000):
+        steps = 0
+        while steps < max_steps and self.step():
+            steps += 1
+        return steps
+
+    def _execute(self, pc, lanes):
+        if not 0 <= pc < len(self.records):
+            self.active[lanes] = False
+            return
+
+        # Whole-batch groups use basic slicing instead of fancy indexing
+        sel = slice(None) if lanes.size == self.lanes else lanes
+        regs = self.regs
+        rec = self.records[pc]
+        op = rec.op
+        rd = rec.rd or 0
+        rs1 = rec.rs1 or 0
+        rs2 = rec.rs2 or 0
+        imm = np.uint16(rec.imm & 0xFFFF)
+        self.retired[sel] += 1
+        next_pc = pc + 1
+
+        if op == OP_ADDI:
+            if rd:
+                regs[sel, rd] = regs[sel, rs1] + imm
+        elif op == OP_ADD:
+            if rd:
+                regs[sel, rd] = regs[sel, rs1] + regs[sel, rs2]
+        elif op == OP_SUB:
+            if rd:
+                regs[sel, rd] = regs[sel, rs1] - regs[sel, rs2]
+        elif op == OP_AND:
+            if rd:
+                regs[sel, rd] = regs[sel, rs1] & regs[sel, rs2]
+        elif op == OP_OR:
+            if rd:
+                regs[sel, rd] = regs[sel, rs1] | regs[sel, rs2]
+        elif op == OP_SLT:
+            if rd:
+                regs[sel, rd] = regs[sel, rs1] < regs[sel, rs2]
+        elif op == OP_LOAD:
+            addr = (regs[sel, rs1] + imm).astype(np.int64)
+            inside = addr < self.mem_size
+            rows = self._all if lanes.size == self.lanes else lanes
+            vals = np.where(inside, self.mem[rows, np.where(inside, addr, 0)], 0)
+            if rd:
+                regs[sel, rd] = vals
+        elif op == OP_STORE:
+            addr = (regs[sel, rs1] + imm).astype(np.int64)
+            inside = addr < self.mem_size
+            rows = self._all if lanes.size == self.lanes else lanes
+            self.mem[rows[inside], addr[inside]] = regs[sel, rd][inside]
+        elif op == OP_BEQ or op == OP_BNE:
+            taken = regs[sel, rs1] == regs[sel, rd]
+            if op == OP_BNE:
+                taken = ~taken
+            self.pc[sel] = np.where(taken, rec.imm, next_pc)
+            return
+        elif op == OP_J:
+            if rec.imm == pc:
+                # Jump to itself: program finished
+                self.active[sel] = False
+                return
+            next_pc = rec.imm
+        elif op == OP_JAL:
+            regs[sel, RA] = (pc + 1) & 0xFFFF
+            next_pc = rec.imm
+        elif op == OP_JR:
+            self.pc[sel] = regs[sel, rs1]
+            return
+
+        self.pc[sel] = next_pc
@@ -1,25 +1,27 @@
+import argparse
+import sys
+
 from cpu import CPU
 from memory import Memory
 from pipeline import Pipeline
 from program import program
+from tracing import Tracer, FileSink, ALL, STAGES
 
 cpu = CPU()
 mem = Memory()
 pipe = Pipeline(cpu, mem)
 
+# Trace everything to the console; -q drops the per-cycle stage dump,
+# -qq turns tracing off entirely
+parser = argparse.ArgumentParser(description="Run program.py on the pipeline")
+parser.add_argument("-q", "--quiet", action="count", default=0)
+args = parser.parse_args()
+if args.quiet < 2:
+    pipe.tracer = Tracer(FileSink(sys.stdout), ALL & ~STAGES if args.quiet else ALL)
+
 while cpu.pc < len(program):
     # Fetch Stage: Only fetch if IF stage is empty (not stalled/holding)
-    if pipe.IF is None:
-        pipe.IF = program[cpu.pc]
-        cpu.pc += 1
+    pipe.fetch(program)
     
     # Step Pipeline
     stalled = pipe.step()
-
-    print("Pipeline State:")
-    print("IF:", pipe.IF)
-    print("ID:", pipe.ID)
-    print("EX:", pipe.EX)
-    print("MEM:", pipe.MEM)
-    print("WB:", pipe.WB)
-    print("------")
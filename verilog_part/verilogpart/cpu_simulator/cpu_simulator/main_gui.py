@@ -4,7 +4,7 @@ from cpu import CPU
 from memory import Memory
 from pipeline import Pipeline
 from program import program
-from assembler import Assembler
+from assembler import IncrementalAssembler
 
 class CPUSimulatorGUI:
     def __init__(self, root):
@@ -33,7 +33,7 @@ class CPUSimulatorGUI:
         self.cpu = CPU()
         self.mem = Memory()
         self.pipe = Pipeline(self.cpu, self.mem)
-        self.assembler = Assembler()
+        self.assembler = IncrementalAssembler() # Re-parses only edited lines
         self.pc = 0
         self.program = program
         self.is_running = False
@@ -192,9 +192,11 @@ SW $t2, 100
     def assemble_code(self):
         code = self.editor.get(1.0, tk.END)
         try:
-            self.program = self.assembler.assemble(code)
-            self.reset()
-            self._refresh_program_view()
+            patch = self.assembler.update(code)
+            self.program = self.assembler.program
+            # Always start over; the listing is only rebuilt when the program
+            # changed or the current-line marker has to move back to 0
+            self.reset(refresh_view=bool(patch) or self.pc != 0)
             self.notebook.select(self.tab_exec) # Switch to exec tab
             messagebox.showinfo("Success", "Assembly compiled and loaded successfully!")
         except Exception as e:
@@ -234,12 +236,13 @@ SW $t2, 100
         else:
             self.is_running = False
 
-    def reset(self):
+    def reset(self, refresh_view=True):
         self.cpu.reset()
         self.pc = 0
         self.pipe = Pipeline(self.cpu, self.mem)
         self.update_display()
-        self._refresh_program_view()
+        if refresh_view:
+            self._refresh_program_view()
 
     def update_display(self):
         # Registers
@@ -258,9 +261,10 @@ SW $t2, 100
                 return "⚠️ STALL (BUBBLE)"
 
             if not val: return "-"
-            if stage == "ID" and hasattr(val, 'to_binary'):
+            if stage == "ID" and hasattr(val, 'encode'):
                 # Show BINARY & OPCODE
-                return f"{val} \nbin: {val.to_binary()} \nhex: {hex(int(val.to_binary(), 2))}"
+                word = val.encode()
+                return f"{val} \nbin: {word:032b} \nhex: {hex(word)}"
             elif stage == "EX" and hasattr(val, 'result'):
                 return f"{val} [Res: {val.result}]"
             elif stage == "MEM" and hasattr(val, 'val_to_store'):
@@ -279,7 +283,7 @@ SW $t2, 100
         for idx, instr in enumerate(self.program):
             prefix = " >" if idx == self.pc else "  "
             
-            binary = instr.to_binary() if hasattr(instr, 'to_binary') else "?"
+            binary = f"{instr.encode():032b}" if hasattr(instr, 'encode') else "?"
             line = f"{prefix} {idx:02d} | {binary} | {instr}\n"
             
             self.prog_text.insert(tk.END, line)
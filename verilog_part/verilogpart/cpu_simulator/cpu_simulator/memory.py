@@ -1,11 +1,115 @@
+from array import array
+
 class Memory:
     def __init__(self, size=256):
         self.data = [0] * size
+        # Undo journal: when set to a list, stores append (address, old value)
+        self.journal = None
 
     def load(self, address):
-        return self.data[address]
+        if 0 <= address < len(self.data):
+            return self.data[address]
+        return 0
 
     def store(self, address, value):
         if 0 <= address < len(self.data):
+             if self.journal is not None:
+                 self.journal.append((address, self.data[address]))
              self.data[address] = value & 0xFFFF
 
+    def snapshot(self):
+        return tuple(self.data)
+
+    def restore(self, state):
+        self.data[:] = state
+
+# Full 16-bit address space, allocated lazily in pages of 16-bit words.
+# Unmapped pages read as 0 and cost nothing; a page is created on its first
+# store. Pages written since the last clear_dirty() are tracked so callers
+# can snapshot or diff only what changed.
+ADDRESS_BITS = 16
+
+class PagedMemory:
+    def __init__(self, page_bits=8):
+        self.page_bits = page_bits
+        self.page_size = 1 << page_bits
+        self.offset_mask = self.page_size - 1
+        self.address_mask = (1 << ADDRESS_BITS) - 1
+        self.pages = [None] * (1 << (ADDRESS_BITS - page_bits))
+        self.dirty = set()
+        self._snapshot_base = {} # Page copies shared with the latest snapshot
+        self._unsaved = set() # Pages written since the latest snapshot or restore
+        self.journal = None # Undo journal, as for Memory
+
+    def __len__(self):
+        return 1 << ADDRESS_BITS
+
+    def load(self, address):
+        address &= self.address_mask
+        page = self.pages[address >> self.page_bits]
+        if page is None:
+            return 0
+        return page[address & self.offset_mask]
+
+    def store(self, address, value):
+        address &= self.address_mask
+        n = address >> self.page_bits
+        page = self.pages[n]
+        if page is None:
+            page = self.pages[n] = array('H', bytes(2 * self.page_size))
+        if self.journal is not None:
+            self.journal.append((address, page[address & self.offset_mask]))
+        page[address & self.offset_mask] = value & 0xFFFF
+        self.dirty.add(n)
+        self._unsaved.add(n)
+
+    # --- Page-level access ---
+
+    def mapped_pages(self):
+        return [n for n, page in enumerate(self.pages) if page is not None]
+
+    def dirty_pages(self):
+        return sorted(self.dirty)
+
+    def clear_dirty(self):
+        self.dirty.clear()
+
+    def read_page(self, n):
+        # Copy of page n (zeros if unmapped)
+        page = self.pages[n]
+        if page is None:
+            return array('H', bytes(2 * self.page_size))
+        return array('H', page)
+
+    def write_page(self, n, words):
+        page = array('H', words)
+        if len(page) != self.page_size:
+            raise ValueError(f"Page {n} needs {self.page_size} words, got {len(page)}")
+        self.pages[n] = page
+        self.dirty.add(n)
+        self._unsaved.add(n)
+
+    def page_base(self, n):
+        return n << self.page_bits
+
+    # --- Snapshots ---
+    # A snapshot maps page number -> frozen page copy. Only pages written
+    # since the previous snapshot (or restore) are copied; the rest are
+    # shared with it, so a snapshot costs O(pages written), not O(memory).
+
+    def snapshot(self):
+        pages = dict(self._snapshot_base)
+        for n in self._unsaved:
+            pages[n] = array('H', self.pages[n])
+        self._unsaved.clear()
+        self._snapshot_base = pages
+        return pages
+
+    def restore(self, pages):
+        self.dirty.update(self.mapped_pages())
+        self.dirty.update(pages)
+        self.pages = [None] * len(self.pages)
+        for n, page in pages.items():
+            self.pages[n] = array('H', page)
+        self._snapshot_base = pages
+        self._unsaved.clear()
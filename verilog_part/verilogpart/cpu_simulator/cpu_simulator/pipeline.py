@@ -1,7 +1,14 @@
+from collections import defaultdict
+
+from counters import PerfCounters
 from instruction import RType, IType, JType
+from predecode import decode
+from snapshot import Snapshot, STAGES as LATCHES, capture_latch, apply_latch
+from tracefile import Recorders
+from tracing import BRANCH, JUMP, STORE, STAGES
 
 class Pipeline:
-    def __init__(self, cpu, memory):
+    def __init__(self, cpu, memory, dispatch=False):
         self.cpu = cpu
         self.memory = memory
         self.IF = None
@@ -10,12 +17,137 @@ class Pipeline:
         self.MEM = None
         self.WB = None
 
+        # Dispatch-table engine: execute predecoded records instead of
+        # isinstance/string-compare chains. Same register and memory results.
+        self.dispatch = dispatch
+        if dispatch:
+            self._detect_hazard = self._detect_hazard_dispatch
+            self._execute_ex = self._execute_ex_dispatch
+            self._execute_mem = self._execute_mem_dispatch
+            self._execute_wb = self._execute_wb_dispatch
+        self._fwd_rd = -1
+        self._fwd_val = 0
+
+        # Optional tracing.Tracer; None keeps the hot path free of tracing
+        self.tracer = None
+        self.cycle = 0
+        self.flushed = False
+        self.program = None # Last program fetched from
+
+        # Optional tracefile.TraceRecorder, profiler.Profiler or other
+        # recorder, fed once per cycle as record(pipe, stall, frozen=False);
+        # frozen cycles (cache misses) move no stage and write nothing.
+        # add_recorder() attaches more than one.
+        self.recorder = None
+
+        # Optional timetravel.TimeTravel undo journal, fed once per cycle
+        self.journal = None
+
+        # Always-on raw performance counts, read and reset through
+        # self.counters (see counters.py)
+        self._retired = defaultdict(int) # Per instruction object
+        self._flushes = defaultdict(int) # Per branch/jump that flushed
+        self._stalls = 0
+        self._squashed = 0
+        self._fwd_hits = 0
+        self._freeze_cycles = 0
+        self.counters = PerfCounters(self)
+
+        # Optional fetch-time branch predictor (see predictor.py). Each fetched
+        # instruction carries (fetch pc, predicted next pc) down to EX in these
+        # latches, where the prediction is checked against the resolved target.
+        self.predictor = None
+        self.IF_pred = None
+        self.ID_pred = None
+        self.EX_pred = None
+        self._resolved = None
+
+        # Optional cache timing models (see cache.py). Miss cycles they return
+        # freeze the whole pipeline for that many steps.
+        self.icache = None
+        self.dcache = None
+        self.freeze = 0
+
+    def fetch(self, program):
+        # Fetch Stage: Only fetch if IF stage is empty (not stalled/holding)
+        if self.IF is None and self.cpu.pc < len(program):
+            self.IF = program[self.cpu.pc]
+            self.program = program
+            if self.icache is not None:
+                self.freeze += self.icache.access(self.cpu.pc, False, self.cycle)
+            if self.predictor is None:
+                self.cpu.pc += 1
+            else:
+                pc = self.cpu.pc
+                self.cpu.pc = self.predictor.predict(pc, self.IF)
+                self.IF_pred = (pc, self.cpu.pc)
+
+    def add_recorder(self, recorder):
+        # Attach `recorder` next to any already attached
+        current = self.recorder
+        if current is None:
+            self.recorder = recorder
+        elif isinstance(current, Recorders):
+            current.recorders.append(recorder)
+        else:
+            self.recorder = Recorders(current, recorder)
+        return recorder
+
+    def busy(self):
+        return bool(self.IF or self.ID or self.EX or self.MEM or self.WB)
+
+    def snapshot(self):
+        # Capture CPU, memory and in-flight latches (see snapshot.py)
+        latches = {stage: capture_latch(getattr(self, stage)) for stage in LATCHES}
+        prediction = None
+        if self.predictor is not None:
+            prediction = (self.IF_pred, self.ID_pred, self.predictor.snapshot())
+        caches = None
+        if self.icache is not None or self.dcache is not None:
+            caches = (self.freeze,
+                      self.icache.snapshot() if self.icache is not None else None,
+                      self.dcache.snapshot() if self.dcache is not None else None)
+        return Snapshot(self.cpu.snapshot(), self.memory.snapshot(), latches, self.cycle, prediction, caches,
+                        self.counters.snapshot())
+
+    def restore(self, snap):
+        self.cpu.restore(snap.cpu)
+        self.memory.restore(snap.memory)
+        for stage in LATCHES:
+            setattr(self, stage, apply_latch(snap.latches[stage]))
+        self.cycle = snap.cycle
+        self.flushed = False
+        if snap.prediction is not None and self.predictor is not None:
+            self.IF_pred, self.ID_pred, state = snap.prediction
+            self.predictor.restore(state)
+        else:
+            self.IF_pred = self.ID_pred = None
+        self.freeze = 0
+        if snap.caches is not None:
+            self.freeze, icache, dcache = snap.caches
+            if icache is not None and self.icache is not None:
+                self.icache.restore(icache)
+            if dcache is not None and self.dcache is not None:
+                self.dcache.restore(dcache)
+        if snap.counters is not None:
+            self.counters.restore(snap.counters)
+        else:
+            self.counters.reset()
+
     def step(self):
+        self.cycle += 1
+        self.flushed = False
+        if self.freeze:
+            return self._step_frozen()
         stall = self._detect_hazard()
 
-        self.WB = self.MEM
-        if self.WB:
-            self._execute_wb(self.WB)
+        if stall:
+            self._stalls += 1
+
+        wb = self.WB = self.MEM
+        if wb:
+            self._execute_wb(wb)
+            self._retired[wb] += 1
 
         self.MEM = self.EX
         if self.MEM:
@@ -25,15 +157,38 @@ class Pipeline:
             self.EX = None
         else:
             self.EX = self.ID
-            if self.EX:
+            if self.predictor is not None:
+                self._execute_ex_predicted(self.EX)
+            elif self.EX:
                  self._execute_ex(self.EX)
 
         if not stall:
             self.ID = self.IF
             self.IF = None
+
+        tracer = self.tracer
+        if tracer is not None and tracer.categories & STAGES:
+            tracer.emit(self.cycle, STAGES, "stages", IF=self.IF, ID=self.ID, EX=self.EX, MEM=self.MEM, WB=self.WB)
+        if self.recorder is not None:
+            self.recorder.record(self, stall)
+        if self.journal is not None:
+            self.journal.record(self)
             
         return stall
 
+    def _step_frozen(self):
+        # Waiting on a cache miss: no stage moves this cycle
+        self.freeze -= 1
+        self._freeze_cycles += 1
+        tracer = self.tracer
+        if tracer is not None and tracer.categories & STAGES:
+            tracer.emit(self.cycle, STAGES, "stages", IF=self.IF, ID=self.ID, EX=self.EX, MEM=self.MEM, WB=self.WB)
+        if self.recorder is not None:
+            self.recorder.record(self, False, True)
+        if self.journal is not None:
+            self.journal.record(self)
+        return True
+
     def _detect_hazard(self):
         if self.EX and self.EX.opcode in ["LOAD", "LW"] and self.ID:
             load_dest = self.EX.rd
@@ -60,6 +215,7 @@ class Pipeline:
             # If MEM stage writes to this register, grab the value before it hits WB
 
             if self.MEM and hasattr(self.MEM, 'rd') and self.MEM.rd == reg_name and reg_name is not None:
+                self._fwd_hits += 1
                 return getattr(self.MEM, 'result', 0)
             
             # Otherwise read from register file (WB happened at start of step)
@@ -91,9 +247,9 @@ class Pipeline:
             elif instruction.opcode == "JR":
                 # Jump Register: PC = $rs1
                 target = get_val(instruction.rs1)
-                self.cpu.pc = target
-                self._flush_pipeline()
-                print(f"JR to {target}")
+                self._redirect(target)
+                if self.tracer is not None:
+                    self.tracer.emit(self.cycle, JUMP, "JR", target=target)
             
         elif isinstance(instruction, IType):
             if instruction.opcode in ["LOAD", "LW"]:
@@ -114,50 +270,116 @@ class Pipeline:
                 val2 = get_val(instruction.rd)
                 
                 if val1 == val2:
-                     self.cpu.pc = instruction.imm # Using absolute address (simplified)
-                     self._flush_pipeline()
-                     print(f"BEQ taken to {instruction.imm}")
+                     self._redirect(instruction.imm) # Using absolute address (simplified)
+                     if self.tracer is not None:
+                         self.tracer.emit(self.cycle, BRANCH, "BEQ", target=instruction.imm)
             elif instruction.opcode == "BNE":
                 val1 = get_val(instruction.rs1)
                 val2 = get_val(instruction.rd)
                 if val1 != val2:
-                     self.cpu.pc = instruction.imm
-                     self._flush_pipeline()
-                     print(f"BNE taken to {instruction.imm}")
+                     self._redirect(instruction.imm)
+                     if self.tracer is not None:
+                         self.tracer.emit(self.cycle, BRANCH, "BNE", target=instruction.imm)
             elif instruction.opcode == "ADDI":
                  val1 = get_val(instruction.rs1)
                  instruction.result = val1 + instruction.imm
 
         elif isinstance(instruction, JType):
             if instruction.opcode == "J":
-                self.cpu.pc = instruction.address
-                self._flush_pipeline()
-                print(f"J to {instruction.address}")
+                self._redirect(instruction.address)
+                if self.tracer is not None:
+                    self.tracer.emit(self.cycle, JUMP, "J", target=instruction.address)
             elif instruction.opcode == "JAL":
                 # Jump and Link (JAL)
                 # Save the return address (PC of next instruction).
-                # Since PC increments at Fetch, current PC points to next instruction.
-                # However, due to pipeline delay, we adjust to ensure correct return.
-
-                self.cpu.set_register("$ra", self.cpu.pc - 2)
-                self.cpu.pc = instruction.address
-                self._flush_pipeline()
-                print(f"JAL to {instruction.address}, return to {self.cpu.get_register('$ra')}")
+                self.cpu.set_register("$ra", self._link_address(instruction))
+                self._redirect(instruction.address)
+                if self.tracer is not None:
+                    self.tracer.emit(self.cycle, JUMP, "JAL", target=instruction.address, ra=self.cpu.get_register('$ra'))
 
     def _execute_mem(self, instruction):
         if instruction.opcode in ["LOAD", "LW"]:
              # Perform Read
              val = self.memory.load(instruction.effective_address)
              instruction.result = val
+             if self.dcache is not None:
+                 self.freeze += self.dcache.access(instruction.effective_address, False, self.cycle)
              
         elif instruction.opcode in ["STORE", "SW"]:
              # Perform Write
              self.memory.store(instruction.effective_address, instruction.val_to_store)
-             print(f"MEM: Stored {instruction.val_to_store} to address {instruction.effective_address}")
+             if self.dcache is not None:
+                 self.freeze += self.dcache.access(instruction.effective_address, True, self.cycle)
+             if self.tracer is not None:
+                 self.tracer.emit(self.cycle, STORE, "store", address=instruction.effective_address, value=instruction.val_to_store)
+
+    def _redirect(self, target):
+        # A branch/jump in EX resolved as taken
+        if self.predictor is None:
+            self.cpu.pc = target
+            self._flush_pipeline()
+        else:
+            self._resolved = target
+
+    def _link_address(self, instruction):
+        # The address after the JAL's own. cpu.pc cannot be used: it depends on
+        # how many instructions were fetched behind the JAL (none while
+        # draining) and follows the predicted path when predicting.
+        # predecode() records addresses; otherwise, or when the recorded one
+        # no longer holds this object (an edited program reuses objects at
+        # new addresses), the JAL is looked up in the program being fetched from.
+        rec = _decoded(instruction)
+        program = self.program
+        pc = rec.pc
+        if program is not None and (pc is None or pc >= len(program) or program[pc] is not instruction):
+            for pc, instr in enumerate(program):
+                if instr is instruction:
+                    rec.pc = pc
+                    break
+        if rec.pc is None:
+            # Placed in the latches by hand, not fetched
+            return self.cpu.pc - 2
+        return rec.pc + 1
+
+    def _execute_ex_predicted(self, instruction):
+        # Predictions move down with their instructions
+        pred = self.EX_pred = self.ID_pred
+        self.ID_pred = self.IF_pred
+        self.IF_pred = None
+        if instruction is None:
+            return
+        self._resolved = None
+        self._execute_ex(instruction)
+        resolved = self._resolved
+
+        if pred is None:
+            # Fetched before the predictor was attached: resolve as usual
+            if resolved is not None:
+                self.cpu.pc = resolved
+                self._flush_pipeline()
+                self.ID_pred = None
+            return
+
+        pc, predicted = pred
+        actual = resolved if resolved is not None else pc + 1
+        if self.predictor.resolve(pc, instruction, predicted, actual):
+            return
+        # Mispredicted: refetch from the resolved target
+        if self.IF is not None:
+            self.predictor.flush_cycles += 1
+        self.cpu.pc = actual
+        self._flush_pipeline()
+        self.ID_pred = None
 
     def _flush_pipeline(self):
+        # Called from EX, where ID still holds the branch/jump itself: only
+        # the instruction in IF is wrong-path
+        self._flushes[self.EX] += 1
+        if self.IF is not None:
+            self._squashed += 1
         self.IF = None
         self.ID = None
+        self.flushed = True
 
     def _execute_wb(self, instruction):
         if isinstance(instruction, RType):
@@ -172,3 +394,64 @@ class Pipeline:
                  val = getattr(instruction, 'result', 0)
                  self.cpu.set_register(instruction.rd, val)
 
+    # --- Dispatch-table engine ---
+
+    def _detect_hazard_dispatch(self):
+        ex = self.EX
+        if ex is not None and self.ID is not None:
+            ex_rec = ex.decoded
+            if ex_rec.is_load:
+                id_rec = _decoded(self.ID)
+                load_dest = ex_rec.rd
+                if id_rec.is_store:
+                    return load_dest == id_rec.rd or load_dest == id_rec.rs1
+                return load_dest is not None and (load_dest == id_rec.rs1 or load_dest == id_rec.rs2)
+        return False
+
+    def _operand(self, idx):
+        if idx == self._fwd_rd:
+            self._fwd_hits += 1
+            return self._fwd_val
+        if idx is None:
+            return 0
+        return self.cpu.regs[idx]
+
+    def _execute_ex_dispatch(self, instruction):
+        rec = _decoded(instruction)
+        mem = self.MEM
+        if mem is not None:
+            fwd = mem.decoded.rd
+            if fwd is not None:
+                self._fwd_rd = fwd
+                self._fwd_val = getattr(mem, 'result', 0)
+            else:
+                self._fwd_rd = -1
+        else:
+            self._fwd_rd = -1
+        rec.handler(self, instruction, rec)
+
+    def _execute_mem_dispatch(self, instruction):
+        rec = instruction.decoded
+        if rec.is_load:
+             instruction.result = self.memory.load(instruction.effective_address)
+             if self.dcache is not None:
+                 self.freeze += self.dcache.access(instruction.effective_address, False, self.cycle)
+        elif rec.is_store:
+             self.memory.store(instruction.effective_address, instruction.val_to_store)
+             if self.dcache is not None:
+                 self.freeze += self.dcache.access(instruction.effective_address, True, self.cycle)
+             if self.tracer is not None:
+                 self.tracer.emit(self.cycle, STORE, "store", address=instruction.effective_address, value=instruction.val_to_store)
+
+    def _execute_wb_dispatch(self, instruction):
+        wb = instruction.decoded.wb
+        if wb is not None:
+            self.cpu.write(wb, getattr(instruction, 'result', 0))
+
+
+def _decoded(instruction):
+    # Use the record attached by predecode(), decoding lazily if missing
+    try:
+        return instruction.decoded
+    except AttributeError:
+        return decode(instruction)
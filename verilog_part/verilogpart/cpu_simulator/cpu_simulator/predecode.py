@@ -0,0 +1,181 @@
+from cpu import REG_INDEX
+from instruction import RType, IType, JType
+from tracing import BRANCH, JUMP
+
+# Predecoded instruction records for the dispatch-table execution path.
+# Each Instruction is turned once into a DecodedInstruction holding an integer
+# opcode, register indices and a direct reference to its EX handler, so the
+# pipeline no longer walks isinstance chains or compares opcode strings.
+
+# Integer opcodes
+OP_NOP = 0
+OP_ADD = 1
+OP_SUB = 2
+OP_AND = 3
+OP_OR = 4
+OP_SLT = 5
+OP_JR = 6
+OP_ADDI = 7
+OP_LOAD = 8
+OP_STORE = 9
+OP_BEQ = 10
+OP_BNE = 11
+OP_J = 12
+OP_JAL = 13
+
+R_OPS = {"ADD": OP_ADD, "SUB": OP_SUB, "AND": OP_AND, "OR": OP_OR, "SLT": OP_SLT, "JR": OP_JR}
+I_OPS = {"ADDI": OP_ADDI, "LOAD": OP_LOAD, "LW": OP_LOAD, "STORE": OP_STORE, "SW": OP_STORE,
+         "BEQ": OP_BEQ, "BNE": OP_BNE}
+J_OPS = {"J": OP_J, "JAL": OP_JAL}
+
+RA = REG_INDEX["$ra"]
+
+
+class DecodedInstruction:
+    __slots__ = ("op", "rd", "rs1", "rs2", "imm", "handler", "is_load", "is_store", "wb", "pc")
+
+    def __init__(self, op, rd, rs1, rs2, imm, handler, is_load, is_store, wb):
+        self.op = op
+        self.rd = rd
+        self.rs1 = rs1
+        self.rs2 = rs2
+        self.imm = imm
+        self.handler = handler
+        self.is_load = is_load
+        self.is_store = is_store
+        self.wb = wb  # Register index written in WB, or None
+        self.pc = None  # Program address, set by predecode()
+
+    def __repr__(self):
+        return f"DecodedInstruction(op={self.op}, rd={self.rd}, rs1={self.rs1}, rs2={self.rs2}, imm={self.imm})"
+
+
+def _reg(name):
+    if name is None:
+        return None
+    if name not in REG_INDEX:
+        raise ValueError(f"Unknown register: {name}")
+    return REG_INDEX[name]
+
+
+# --- EX handlers ---
+# Signature: handler(pipe, instruction, rec). Operands are read through
+# pipe._operand(), which applies the same MEM-stage forwarding as get_val().
+
+def _ex_nop(pipe, instruction, rec):
+    pass
+
+def _ex_add(pipe, instruction, rec):
+    instruction.result = pipe._operand(rec.rs1) + pipe._operand(rec.rs2)
+
+def _ex_sub(pipe, instruction, rec):
+    instruction.result = pipe._operand(rec.rs1) - pipe._operand(rec.rs2)
+
+def _ex_and(pipe, instruction, rec):
+    instruction.result = pipe._operand(rec.rs1) & pipe._operand(rec.rs2)
+
+def _ex_or(pipe, instruction, rec):
+    instruction.result = pipe._operand(rec.rs1) | pipe._operand(rec.rs2)
+
+def _ex_slt(pipe, instruction, rec):
+    instruction.result = 1 if pipe._operand(rec.rs1) < pipe._operand(rec.rs2) else 0
+
+def _ex_jr(pipe, instruction, rec):
+    target = pipe._operand(rec.rs1)
+    pipe._redirect(target)
+    if pipe.tracer is not None:
+        pipe.tracer.emit(pipe.cycle, JUMP, "JR", target=target)
+
+def _ex_addi(pipe, instruction, rec):
+    instruction.result = pipe._operand(rec.rs1) + rec.imm
+
+def _ex_load(pipe, instruction, rec):
+    instruction.effective_address = pipe._operand(rec.rs1) + rec.imm
+
+def _ex_store(pipe, instruction, rec):
+    instruction.effective_address = pipe._operand(rec.rs1) + rec.imm
+    instruction.val_to_store = pipe._operand(rec.rd)
+
+def _ex_beq(pipe, instruction, rec):
+    if pipe._operand(rec.rs1) == pipe._operand(rec.rd):
+        pipe._redirect(rec.imm)
+        if pipe.tracer is not None:
+            pipe.tracer.emit(pipe.cycle, BRANCH, "BEQ", target=rec.imm)
+
+def _ex_bne(pipe, instruction, rec):
+    if pipe._operand(rec.rs1) != pipe._operand(rec.rd):
+        pipe._redirect(rec.imm)
+        if pipe.tracer is not None:
+            pipe.tracer.emit(pipe.cycle, BRANCH, "BNE", target=rec.imm)
+
+def _ex_j(pipe, instruction, rec):
+    pipe._redirect(rec.imm)
+    if pipe.tracer is not None:
+        pipe.tracer.emit(pipe.cycle, JUMP, "J", target=rec.imm)
+
+def _ex_jal(pipe, instruction, rec):
+    cpu = pipe.cpu
+    cpu.write(RA, pipe._link_address(instruction))
+    pipe._redirect(rec.imm)
+    if pipe.tracer is not None:
+        pipe.tracer.emit(pipe.cycle, JUMP, "JAL", target=rec.imm, ra=cpu.regs[RA])
+
+
+EX_HANDLERS = {
+    OP_NOP: _ex_nop,
+    OP_ADD: _ex_add,
+    OP_SUB: _ex_sub,
+    OP_AND: _ex_and,
+    OP_OR: _ex_or,
+    OP_SLT: _ex_slt,
+    OP_JR: _ex_jr,
+    OP_ADDI: _ex_addi,
+    OP_LOAD: _ex_load,
+    OP_STORE: _ex_store,
+    OP_BEQ: _ex_beq,
+    OP_BNE: _ex_bne,
+    OP_J: _ex_j,
+    OP_JAL: _ex_jal,
+}
+
+
+def decode(instruction):
+    # Build the record and cache it on the instruction
+    opcode = instruction.opcode
+    rd = _reg(getattr(instruction, "rd", None))
+    rs1 = _reg(getattr(instruction, "rs1", None))
+    rs2 = _reg(getattr(instruction, "rs2", None))
+    imm = 0
+    wb = None
+
+    if isinstance(instruction, RType):
+        op = R_OPS.get(opcode, OP_NOP)
+        if instruction.rd:
+            wb = rd
+    elif isinstance(instruction, IType):
+        op = I_OPS.get(opcode, OP_NOP)
+        imm = instruction.imm
+        if opcode not in ("STORE", "SW") and instruction.rd:
+            wb = rd
+    elif isinstance(instruction, JType):
+        op = J_OPS.get(opcode, OP_NOP)
+        imm = instruction.address
+    else:
+        op = OP_NOP
+
+    rec = DecodedInstruction(
+        op, rd, rs1, rs2, imm, EX_HANDLERS[op],
+        opcode in ("LOAD", "LW"), opcode in ("STORE", "SW"), wb,
+    )
+    instruction.decoded = rec
+    return rec
+
+
+def predecode(program):
+    # Load-time pass: decode every instruction of the program once
+    records = []
+    for pc, instr in enumerate(program):
+        rec = decode(instr)
+        rec.pc = pc
+        records.append(rec)
+    return records
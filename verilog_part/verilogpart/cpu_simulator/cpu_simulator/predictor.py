@@ -0,0 +1,218 @@
+import copy
+
+from predecode import decode, OP_BEQ, OP_BNE, OP_J, OP_JAL, OP_JR, RA
+
+# Branch predictors consulted by Pipeline.fetch().
+# Attach one with pipe.predictor = TwoBit() (or make_predictor("2bit")).
+# predict() returns the next pc to fetch; when the instruction reaches EX
+# the pipeline calls resolve() with the actual next pc, which trains the
+# predictor and keeps accuracy statistics. Only a misprediction flushes.
+#
+# Like the assembler's absolute branch targets, direction predictors read
+# the target of BEQ/BNE/J/JAL from the fetched instruction; only the BTB
+# and the return-address stack can supply a JR target.
+
+CONDITIONAL = (OP_BEQ, OP_BNE)
+DIRECT = (OP_J, OP_JAL)
+CONTROL = (OP_BEQ, OP_BNE, OP_J, OP_JAL, OP_JR)
+
+
+def _rec(instruction):
+    try:
+        return instruction.decoded
+    except AttributeError:
+        return decode(instruction)
+
+
+class Predictor:
+    # Static not-taken: always fetch the next instruction
+    name = "not-taken"
+
+    def __init__(self):
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.predictions = 0  # Branches and jumps resolved
+        self.correct = 0
+        self.mispredicts = 0  # Including non-branches predicted as taken
+        self.flush_cycles = 0 # Wrong-path fetches squashed on mispredicts
+
+    @property
+    def accuracy(self):
+        return self.correct / self.predictions if self.predictions else 0.0
+
+    def stats(self):
+        return {
+            "predictor": self.name,
+            "predictions": self.predictions,
+            "correct": self.correct,
+            "mispredicts": self.mispredicts,
+            "accuracy": self.accuracy,
+            "flush_cycles": self.flush_cycles,
+        }
+
+    def predict(self, pc, instruction):
+        return pc + 1
+
+    def update(self, pc, rec, taken, target):
+        pass
+
+    def resolve(self, pc, instruction, predicted, actual):
+        # Called from EX; returns True when the prediction was right
+        rec = _rec(instruction)
+        control = rec.op in CONTROL
+        if control:
+            self.predictions += 1
+            self.update(pc, rec, actual != pc + 1, actual)
+        if predicted == actual:
+            if control:
+                self.correct += 1
+            return True
+        self.mispredicts += 1
+        return False
+
+    def snapshot(self):
+        # Tables and statistics, for Pipeline.snapshot()
+        return copy.deepcopy(self.__dict__)
+
+    def restore(self, state):
+        self.__dict__.update(copy.deepcopy(state))
+
+
+class NotTaken(Predictor):
+    pass
+
+
+class BackwardTaken(Predictor):
+    # Static BTFN: backward branches (loops) taken, forward ones not
+    name = "backward-taken"
+
+    def predict(self, pc, instruction):
+        rec = _rec(instruction)
+        op = rec.op
+        if op in DIRECT or (op in CONDITIONAL and rec.imm <= pc):
+            return rec.imm
+        return pc + 1
+
+
+class OneBit(Predictor):
+    # Last outcome per branch, in a table indexed by pc
+    name = "1bit"
+
+    def __init__(self, entries=256):
+        super().__init__()
+        self.entries = entries
+        self.table = [False] * entries
+
+    def predict_taken(self, pc):
+        return self.table[pc % self.entries]
+
+    def train(self, pc, taken):
+        self.table[pc % self.entries] = taken
+
+    def predict(self, pc, instruction):
+        rec = _rec(instruction)
+        op = rec.op
+        if op in DIRECT or (op in CONDITIONAL and self.predict_taken(pc)):
+            return rec.imm
+        return pc + 1
+
+    def update(self, pc, rec, taken, target):
+        if rec.op in CONDITIONAL:
+            self.train(pc, taken)
+
+
+class TwoBit(OneBit):
+    # Saturating counters: 0-1 predict not-taken, 2-3 taken
+    name = "2bit"
+
+    def __init__(self, entries=256):
+        super().__init__(entries)
+        self.table = [1] * entries # Weakly not-taken
+
+    def predict_taken(self, pc):
+        return self.table[pc % self.entries] >= 2
+
+    def train(self, pc, taken):
+        i = pc % self.entries
+        counter = self.table[i]
+        if taken:
+            if counter < 3:
+                self.table[i] = counter + 1
+        elif counter > 0:
+            self.table[i] = counter - 1
+
+
+class BTB(Predictor):
+    # Direct-mapped branch target buffer holding the last taken target of
+    # each branch/jump, JR included. A hit predicts taken, unless a
+    # direction predictor says a conditional branch falls through.
+    name = "btb"
+
+    def __init__(self, entries=64, direction=None):
+        super().__init__()
+        self.entries = entries
+        self.direction = direction
+        self.tags = [None] * entries
+        self.targets = [0] * entries
+
+    def predict(self, pc, instruction):
+        i = pc % self.entries
+        if self.tags[i] != pc:
+            return pc + 1
+        if self.direction is not None and _rec(instruction).op in CONDITIONAL:
+            if not self.direction.predict_taken(pc):
+                return pc + 1
+        return self.targets[i]
+
+    def update(self, pc, rec, taken, target):
+        i = pc % self.entries
+        if self.direction is not None and rec.op in CONDITIONAL:
+            self.direction.train(pc, taken)
+        if taken:
+            self.tags[i] = pc
+            self.targets[i] = target
+        elif self.direction is None and self.tags[i] == pc:
+            self.tags[i] = None
+
+
+class ReturnStack(Predictor):
+    # Return-address stack in front of another predictor: JAL pushes its
+    # return address at fetch, JR $ra pops it. Pushes and pops made on a
+    # mispredicted path are not undone.
+    name = "ras"
+
+    def __init__(self, base=None, depth=8):
+        super().__init__()
+        self.base = base if base is not None else TwoBit()
+        self.depth = depth
+        self.stack = []
+
+    def predict(self, pc, instruction):
+        rec = _rec(instruction)
+        if rec.op == OP_JAL:
+            if len(self.stack) == self.depth:
+                del self.stack[0]
+            self.stack.append(pc + 1)
+        elif rec.op == OP_JR and rec.rs1 == RA and self.stack:
+            return self.stack.pop()
+        return self.base.predict(pc, instruction)
+
+    def update(self, pc, rec, taken, target):
+        self.base.update(pc, rec, taken, target)
+
+
+PREDICTORS = {
+    "not-taken": NotTaken,
+    "backward-taken": BackwardTaken,
+    "1bit": OneBit,
+    "2bit": TwoBit,
+    "btb": lambda: BTB(direction=TwoBit()),
+    "ras": lambda: ReturnStack(BTB(direction=TwoBit())),
+}
+
+
+def make_predictor(name):
+    if name not in PREDICTORS:
+        raise ValueError(f"Unknown predictor: {name}")
+    return PREDICTORS[name]()
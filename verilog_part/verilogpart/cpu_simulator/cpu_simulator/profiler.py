@@ -0,0 +1,129 @@
+import bisect
+import sys
+
+from instruction import RType, JType
+
+# Exact hot-spot profiler for the pipeline.
+# Attach it as a per-cycle recorder (pipe.add_recorder(Profiler(...))), on
+# its own or next to a tracefile.TraceRecorder.
+# Every cycle is charged to one instruction: the one in EX, or when EX holds
+# a bubble the instruction waiting in ID (a load-use stall) or IF (the
+# target refetched after a flush). Stalls are charged to the stalled
+# instruction, cycles frozen on a cache miss to the instruction in EX/ID/IF
+# as cache stalls, and flushes to the branch/jump that caused them. Totals can be
+# reported per PC, source line or enclosing label, and written as folded
+# stacks (caller labels;label count) for flamegraph.pl / speedscope.
+#
+#   asm = Assembler()
+#   program = asm.assemble(source)
+#   prof = pipe.add_recorder(Profiler(program, asm.symbols, asm.line_map))
+#   ... run ...
+#   print(prof.report(by="label"))
+
+ROOT = "_start" # Code before the first label
+
+
+class Profiler:
+    def __init__(self, program, symbols=None, line_map=None):
+        self.program = program
+        self.symbols = symbols or {}
+        self.line_map = line_map or []
+        self.pcs = {id(instr): pc for pc, instr in enumerate(program)}
+        n = len(program)
+        self.cycles = [0] * n
+        self.stalls = [0] * n
+        self.cache_stalls = [0] * n
+        self.flushes = [0] * n
+        self.idle = 0 # Cycles with nothing in IF/ID/EX (fill and drain)
+
+        # Enclosing label lookup: label start addresses in order
+        starts = {}
+        for label, pc in sorted(self.symbols.items(), key=lambda item: item[1]):
+            starts.setdefault(pc, label)
+        self._starts = sorted(starts)
+        self._names = [starts[pc] for pc in self._starts]
+
+        # Shadow call stack of caller labels, for folded output
+        self.stack = []
+        self.folded = {}
+
+    def label_of(self, pc):
+        i = bisect.bisect_right(self._starts, pc) - 1
+        return self._names[i] if i >= 0 else ROOT
+
+    def line_of(self, pc):
+        return self.line_map[pc] if pc < len(self.line_map) else None
+
+    def record(self, pipe, stall, frozen=False):
+        instr = pipe.EX or pipe.ID or pipe.IF
+        if instr is None:
+            self.idle += 1
+            return
+        pc = self.pcs[id(instr)]
+        self.cycles[pc] += 1
+        if stall:
+            self.stalls[pc] += 1
+
+        key = ";".join(self.stack + [self.label_of(pc)])
+        self.folded[key] = self.folded.get(key, 0) + 1
+
+        if frozen:
+            self.cache_stalls[pc] += 1
+            return
+        ex = pipe.EX
+        if ex is not None and pipe.flushed:
+            self.flushes[pc] += 1
+            # Taken JAL enters a procedure, JR $ra returns from one
+            if isinstance(ex, JType) and ex.opcode == "JAL":
+                self.stack.append(self.label_of(pc))
+            elif isinstance(ex, RType) and ex.opcode == "JR" and ex.rs1 == "$ra" and self.stack:
+                self.stack.pop()
+
+    # --- Reports ---
+
+    def totals(self, by="pc"):
+        # {key: [cycles, stalls, flushes, cache stalls]} grouped by "pc", "line" or "label"
+        if by == "pc":
+            key = lambda pc: pc
+        elif by == "line":
+            key = self.line_of
+        elif by == "label":
+            key = self.label_of
+        else:
+            raise ValueError(f"Unknown grouping: {by}")
+        totals = {}
+        for pc in range(len(self.program)):
+            if not self.cycles[pc]:
+                continue
+            row = totals.setdefault(key(pc), [0, 0, 0, 0])
+            row[0] += self.cycles[pc]
+            row[1] += self.stalls[pc]
+            row[2] += self.flushes[pc]
+            row[3] += self.cache_stalls[pc]
+        return totals
+
+    def report(self, by="pc", limit=None):
+        totals = self.totals(by)
+        total = sum(self.cycles) + self.idle
+        rows = sorted(totals.items(), key=lambda item: -item[1][0])[:limit]
+        lines = [f"{'cycles':>10} {'%':>6} {'stalls':>8} {'flushes':>8} {'cache':>8}  {by}"]
+        for key, (cycles, stalls, flushes, cache) in rows:
+            if by == "pc":
+                where = f"{key:4d}  {self.label_of(key):<12} {self.program[key]}"
+                line = self.line_of(key)
+                if line is not None:
+                    where += f"  (line {line})"
+            elif by == "line":
+                where = f"line {key}"
+            else:
+                where = key
+            lines.append(f"{cycles:>10} {100.0 * cycles / total:6.2f} {stalls:>8} {flushes:>8} {cache:>8}  {where}")
+        if self.idle:
+            lines.append(f"{self.idle:>10} {100.0 * self.idle / total:6.2f} {'':>8} {'':>8} {'':>8}  (idle)")
+        return "\n".join(lines)
+
+    def write_folded(self, out=None):
+        # One "frame;frame count" line per stack, as read by flamegraph.pl
+        out = out or sys.stdout
+        for key, count in sorted(self.folded.items()):
+            out.write(f"{key} {count}\n")
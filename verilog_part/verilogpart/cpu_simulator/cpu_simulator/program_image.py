@@ -0,0 +1,271 @@
+import sys
+from array import array
+
+from cpu import REG_NAMES
+from instruction import OPCODES, FUNCT_CODES, REG_MAP, Instruction, RType, IType, JType
+
+# Loader, decoder and writers for the instruction images fed to the RTL.
+# read_image() bulk-reads a $readmemh-style file (program.hex, program.mem):
+# whitespace-separated hex words, // and /* */ comments, _ separators and
+# @address directives, with any gap left as zero words. .bin files are raw
+# little-endian words. decode() turns words back into RType/IType/JType using
+# tables built from OPCODES, FUNCT_CODES and REG_MAP, so the Python pipeline
+# can run the exact image the RTL runs. The RTL fetches by byte address: J/JAL
+# targets are byte addresses and BEQ/BNE immediates byte offsets from pc+2,
+# where the assembler uses word addresses and absolute targets throughout.
+# rtl_words() and word_targets() convert between the two, and load_program()
+# converts the images it reads:
+#
+#   program = load_program("program.mem")
+#   print("\n".join(disassemble(read_image("program.mem"))))
+#
+# Decoding follows the RTL control unit: an R-type funct it does not know
+# runs as AND (ALU op 000), so word 0 is AND $zero, $zero, $zero, a NOP.
+# Unknown opcodes drive no control signals and decode to a plain NOP
+# Instruction. Register numbers without a name decode as "$<n>".
+#
+# The other direction: encode_program() packs a program into array('I') and
+# write_hex/write_mem/write_bin/write_ihex save words for $readmemh, raw
+# little-endian loaders and Intel HEX programmers.
+#
+#   write_mem("program.mem", encode_program(program), depth=256)
+
+# Register number -> name: REG_MAP first, then the CPU's extra registers
+REGISTERS = [name or f"${n}" for n, name in enumerate(REG_NAMES)]
+for _name, _num in REG_MAP.items():
+    REGISTERS[_num] = _name
+
+# 6-bit opcode -> mnemonic; the first name listed wins (LW over LOAD)
+OPCODE_NAMES = [None] * 64
+for _name, _op in OPCODES.items():
+    if _name != "R-TYPE" and OPCODE_NAMES[_op] is None:
+        OPCODE_NAMES[_op] = _name
+
+FUNCT_NAMES = ["AND"] * 64
+for _name, _funct in FUNCT_CODES.items():
+    FUNCT_NAMES[_funct] = _name
+
+# Branch targets are absolute addresses; other immediates are sign-extended
+SIGNED_IMM = {"ADDI", "LW", "SW", "LOAD", "STORE"}
+
+JUMP_OPS = (OPCODES["J"], OPCODES["JAL"])
+BRANCH_OPS = (OPCODES["BEQ"], OPCODES["BNE"])
+IMM_MASK = 0xFFFF
+ADDR_MASK = 0x3FFFFFF
+
+
+def parse_image(text):
+    # Words of a $readmemh-style image, as array('I')
+    if "/" not in text and "@" not in text and "_" not in text:
+        return array("I", [int(token, 16) for token in text.split()])
+
+    words = array("I")
+    addr = 0
+    in_comment = False
+    for line_no, line in enumerate(text.splitlines(), 1):
+        if in_comment or "/*" in line:
+            line, in_comment = _strip_block_comments(line, in_comment)
+        if "//" in line:
+            line = line[:line.index("//")]
+        for token in line.split():
+            try:
+                if token[0] == "@":
+                    addr = int(token[1:], 16)
+                    continue
+                word = int(token.replace("_", ""), 16)
+            except ValueError:
+                raise ValueError(f"Line {line_no}: Bad image token: {token}") from None
+            if addr >= len(words):
+                words.extend([0] * (addr - len(words) + 1))
+            words[addr] = word
+            addr += 1
+    return words
+
+
+def _strip_block_comments(line, in_comment):
+    kept = []
+    while line:
+        if in_comment:
+            end = line.find("*/")
+            if end < 0:
+                return "".join(kept), True
+            line = line[end + 2:]
+            in_comment = False
+        else:
+            start = line.find("/*")
+            if start < 0:
+                kept.append(line)
+                break
+            kept.append(line[:start] + " ")
+            line = line[start + 2:]
+            in_comment = True
+    return "".join(kept), in_comment
+
+
+def read_image(path):
+    if path.endswith(".bin"):
+        words = array("I")
+        with open(path, "rb") as f:
+            words.frombytes(f.read())
+        if sys.byteorder == "big":
+            words.byteswap()
+        return words
+    with open(path, "r") as f:
+        return parse_image(f.read())
+
+
+def decode_word(word):
+    op = word >> 26
+    rs = REGISTERS[(word >> 21) & 31]
+    rt = REGISTERS[(word >> 16) & 31]
+    if op == 0:
+        funct = FUNCT_NAMES[word & 63]
+        if funct == "JR":
+            return RType("JR", rd=None, rs1=rs, rs2=None)
+        return RType(funct, rd=REGISTERS[(word >> 11) & 31], rs1=rs, rs2=rt)
+    name = OPCODE_NAMES[op]
+    if name is None:
+        return Instruction("NOP")
+    if name in ("J", "JAL"):
+        return JType(name, address=word & 0x3FFFFFF)
+    imm = word & 0xFFFF
+    if imm & 0x8000 and name in SIGNED_IMM:
+        imm -= 0x10000
+    return IType(name, rd=rt, rs1=rs, imm=imm)
+
+
+def decode(words):
+    # One Instruction per word (each address gets its own object)
+    return [decode_word(word) for word in words]
+
+
+def rtl_words(words):
+    # Words with absolute word targets -> the RTL's byte-addressed J/JAL
+    # targets and BEQ/BNE offsets relative to pc+2
+    words = array("I", words)
+    for pc, word in enumerate(words):
+        op = word >> 26
+        if op in JUMP_OPS:
+            words[pc] = word >> 26 << 26 | 2 * (word & ADDR_MASK) & IMM_MASK
+        elif op in BRANCH_OPS:
+            words[pc] = word >> 16 << 16 | 2 * ((word & IMM_MASK) - pc - 1) & IMM_MASK
+    return words
+
+
+def word_targets(words):
+    # The inverse of rtl_words(): halve J/JAL byte targets and turn BEQ/BNE
+    # offsets from pc+2 into absolute word targets
+    words = array("I", words)
+    for pc, word in enumerate(words):
+        op = word >> 26
+        if op in JUMP_OPS:
+            words[pc] = word >> 26 << 26 | (word & ADDR_MASK) >> 1
+        elif op in BRANCH_OPS:
+            offset = word & IMM_MASK
+            if offset & 0x8000:
+                offset -= 0x10000
+            words[pc] = word >> 16 << 16 | (pc + 1 + (offset >> 1)) & IMM_MASK
+    return words
+
+
+def load_program(path, rtl=True):
+    # Instructions of an image file; rtl=False for images that already hold
+    # word targets (encode_program() output)
+    words = read_image(path)
+    if rtl:
+        words = word_targets(words)
+    return decode(words)
+
+
+def format_instruction(instr):
+    # Assembler syntax, so listings of named registers re-assemble
+    opcode = instr.opcode
+    if isinstance(instr, JType):
+        return f"{opcode} {instr.address}"
+    if isinstance(instr, IType):
+        if opcode in ("LW", "SW", "LOAD", "STORE"):
+            return f"{opcode} {instr.rd}, {instr.imm}({instr.rs1})"
+        if opcode in ("BEQ", "BNE"):
+            return f"{opcode} {instr.rs1}, {instr.rd}, {instr.imm}"
+        return f"{opcode} {instr.rd}, {instr.rs1}, {instr.imm}"
+    if isinstance(instr, RType):
+        if opcode == "JR":
+            return f"JR {instr.rs1}"
+        return f"{opcode} {instr.rd}, {instr.rs1}, {instr.rs2}"
+    return opcode
+
+
+def disassemble(words, start=0):
+    return [f"{addr:04x}: {word:08x}  {format_instruction(decode_word(word))}"
+            for addr, word in enumerate(words, start)]
+
+
+def encode_program(program):
+    # One word per instruction, via the encoding cached on each instruction
+    encode = Instruction.encode
+    return array("I", [encode(instr) for instr in program])
+
+
+def _padded(words, depth):
+    words = array("I", words)
+    if depth is not None and len(words) < depth:
+        words.extend([0] * (depth - len(words))) # NOPs
+    return words
+
+
+def write_hex(path, words, depth=None):
+    # One 8-digit hex word per line, as generate_hex.py has always written
+    words = _padded(words, depth)
+    with open(path, "w") as f:
+        f.write("".join([f"{word:08x}\n" for word in words]))
+
+
+def write_mem(path, words, depth=None):
+    # Hex words with a // disassembly comment, like program.mem
+    words = _padded(words, depth)
+    with open(path, "w") as f:
+        f.write("".join([f"{word:08x} // {format_instruction(decode_word(word))}\n" for word in words]))
+
+
+def _little_endian(words):
+    words = array("I", words)
+    if sys.byteorder == "big":
+        words.byteswap()
+    return words.tobytes()
+
+
+def write_bin(path, words, depth=None):
+    with open(path, "wb") as f:
+        f.write(_little_endian(_padded(words, depth)))
+
+
+def _ihex_record(kind, address, data):
+    record = bytes([len(data), (address >> 8) & 0xFF, address & 0xFF, kind]) + data
+    checksum = -sum(record) & 0xFF
+    return f":{record.hex().upper()}{checksum:02X}\n"
+
+
+def write_ihex(path, words, depth=None, base=0, record_size=16):
+    # Intel HEX of the little-endian bytes at byte address base, with
+    # extended linear address records at every 64K boundary
+    data = _little_endian(_padded(words, depth))
+    lines = []
+    upper = 0
+    offset = 0
+    while offset < len(data):
+        address = base + offset
+        if address >> 16 != upper:
+            upper = address >> 16
+            lines.append(_ihex_record(4, 0, upper.to_bytes(2, "big")))
+        # Records never cross a 64K boundary
+        size = min(record_size, 0x10000 - (address & 0xFFFF))
+        lines.append(_ihex_record(0, address & 0xFFFF, data[offset:offset + size]))
+        offset += size
+    lines.append(_ihex_record(1, 0, b""))
+    with open(path, "w") as f:
+        f.write("".join(lines))
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        print("\n".join(disassemble(read_image(path))))
@@ -0,0 +1,311 @@
+import argparse
+import sys
+
+from instruction import OPCODES, FUNCT_CODES
+from program_image import read_image
+
+# Cycle-level model of the RTL core in verilog_part (cpu.v and its modules).
+# Each step() is one rising clock edge: the combinational logic is evaluated
+# from the current pipeline registers, then every register updates at once,
+# exactly as the nonblocking assignments do. It follows the RTL rather than
+# the Python Pipeline, including its quirks:
+#   - pc is a byte address stepping by 2; instruction_memory reads pc[8:1]
+#     out of 256 words, so J/JAL targets and BEQ/BNE offsets are bytes
+#   - branches resolve in EX (target = pc+2 + imm), J/JAL/JR in ID; both
+#     flush IF/ID, a taken branch also squashes ID/EX, and a flush wins over
+#     a load-use stall (pipeline_reg gives flush priority over enable)
+#   - 8 x 16-bit registers addressed by rs/rt/rd[2:0], $sp = 0x0FFF on reset;
+#     reads are asynchronous with no write-through, so ID reads the value
+#     from before this edge's write-back
+#   - forwarding from EX/MEM and MEM/WB into EX only; load-use stalls only
+#   - JAL writes $ra with link_reg_out as it was *before* the JAL updated
+#     the link register; OR and SLT decode to the default ALU op (AND)
+#   - data memory is 256 words indexed by address[7:0]; never reset (X in
+#     the RTL, 0 here)
+#
+#   model = RTLModel(read_image("program.mem"))
+#   model.commits = []
+#   model.run(100)
+#
+#   python rtl_model.py program.mem --cycles 100   # same log as tb_cpu.v
+
+IMEM_WORDS = 256
+DMEM_WORDS = 256
+MASK = 0xFFFF
+SP_RESET = 0x0FFF
+RA = 7
+
+# ALU control (alu.v)
+ALU_AND, ALU_OR, ALU_ADD, ALU_SUB, ALU_SLT = 0, 1, 2, 6, 7
+
+# Control unit outputs (control_unit.v), in this order:
+CONTROL_FIELDS = ("reg_dst", "branch_eq", "branch_ne", "mem_read", "mem_to_reg", "alu_op",
+                  "mem_write", "alu_src", "reg_write", "jump", "jump_reg", "LinkWrite")
+NO_CONTROL = (0, 0, 0, 0, 0, ALU_AND, 0, 0, 0, 0, 0, 0)
+
+CONTROL = {
+    OPCODES["J"]: (0, 0, 0, 0, 0, ALU_AND, 0, 0, 0, 1, 0, 0),
+    OPCODES["JAL"]: (0, 0, 0, 0, 0, ALU_AND, 0, 0, 1, 1, 0, 1),
+    OPCODES["BEQ"]: (0, 1, 0, 0, 0, ALU_SUB, 0, 0, 0, 0, 0, 0),
+    OPCODES["BNE"]: (0, 0, 1, 0, 0, ALU_SUB, 0, 0, 0, 0, 0, 0),
+    OPCODES["ADDI"]: (0, 0, 0, 0, 0, ALU_ADD, 0, 1, 1, 0, 0, 0),
+    OPCODES["LW"]: (0, 0, 0, 1, 1, ALU_ADD, 0, 1, 1, 0, 0, 0),
+    OPCODES["SW"]: (0, 0, 0, 0, 0, ALU_ADD, 1, 1, 0, 0, 0, 0),
+}
+R_CONTROL = {
+    FUNCT_CODES["JR"]: (0, 0, 0, 0, 0, ALU_AND, 0, 0, 0, 0, 1, 0),
+    FUNCT_CODES["ADD"]: (1, 0, 0, 0, 0, ALU_ADD, 0, 0, 1, 0, 0, 0),
+    FUNCT_CODES["SUB"]: (1, 0, 0, 0, 0, ALU_SUB, 0, 0, 1, 0, 0, 0),
+}
+R_DEFAULT = (1, 0, 0, 0, 0, ALU_AND, 0, 0, 1, 0, 0, 0)
+
+
+def control(word):
+    op = word >> 26
+    if op == 0:
+        return R_CONTROL.get(word & 63, R_DEFAULT)
+    return CONTROL.get(op, NO_CONTROL)
+
+
+def alu(op, a, b):
+    if op == ALU_ADD:
+        return (a + b) & MASK
+    if op == ALU_SUB:
+        return (a - b) & MASK
+    if op == ALU_AND:
+        return a & b
+    if op == ALU_OR:
+        return a | b
+    if op == ALU_SLT:
+        return 1 if a < b else 0
+    return 0
+
+
+# Pipeline registers as tuples (all zero after reset or a flush)
+# IF/ID:  pc_plus_1, instr
+# ID/EX:  reg_dst, alu_op, alu_src, branch_eq, branch_ne, mem_read, mem_write,
+#         LinkWrite, link_reg_out, reg_write, mem_to_reg, pc_plus_1,
+#         read_data1, read_data2, sign_ext_imm, rs, rt, rd
+# EX/MEM: reg_write, mem_to_reg, mem_read, mem_write, branch_eq, branch_ne,
+#         zero, branch_target, LinkWrite, alu_result, write_data_mem, dest_reg
+# MEM/WB: reg_write, mem_to_reg, read_data, alu_result, dest_reg
+IF_ID_ZERO = (0, 0)
+ID_EX_ZERO = (0,) * 18
+EX_MEM_ZERO = (0,) * 12
+MEM_WB_ZERO = (0,) * 5
+
+
+class RTLModel:
+    def __init__(self, image, data=None):
+        words = list(image)[:IMEM_WORDS]
+        self.imem = words + [0] * (IMEM_WORDS - len(words))
+        self.dmem = [0] * DMEM_WORDS
+        if data is not None:
+            for addr, value in enumerate(list(data)[:DMEM_WORDS]):
+                self.dmem[addr] = value & MASK
+        self._controls = {} # Word -> control tuple
+        # When set to a list, each register write-back appends (cycle, reg, value)
+        self.commits = None
+        self.reset()
+
+    def reset(self):
+        # Asynchronous reset: every register except data memory
+        self.pc = 0
+        self.link = 0
+        self.regs = [0] * 8
+        self.regs[6] = SP_RESET
+        self.if_id = IF_ID_ZERO
+        self.id_ex = ID_EX_ZERO
+        self.ex_mem = EX_MEM_ZERO
+        self.mem_wb = MEM_WB_ZERO
+        self.cycle = 0
+
+    def registers(self):
+        return list(self.regs)
+
+    def run(self, cycles):
+        for _ in range(cycles):
+            self.step()
+
+    def step(self):
+        regs = self.regs
+        pc = self.pc
+        instruction = self.imem[(pc >> 1) & 0xFF]
+        pc_next_seq = (pc + 2) & MASK
+
+        # ID
+        if_pc, instr = self.if_id
+        ctrl = self._controls.get(instr)
+        if ctrl is None:
+            ctrl = self._controls[instr] = control(instr)
+        (reg_dst, branch_eq, branch_ne, mem_read, mem_to_reg, alu_op,
+         mem_write, alu_src, reg_write, jump, jump_reg, link_write) = ctrl
+        rs = (instr >> 21) & 31
+        rt = (instr >> 16) & 31
+        read_data1 = regs[rs & 7] if rs & 7 else 0
+        read_data2 = regs[rt & 7] if rt & 7 else 0
+
+        # WB
+        wb_write, wb_mem_to_reg, wb_read_data, wb_alu_result, wb_dest = self.mem_wb
+        write_back_data = wb_read_data if wb_mem_to_reg else wb_alu_result
+
+        # EX, with forwarding
+        (x_reg_dst, x_alu_op, x_alu_src, x_beq, x_bne, x_mem_read, x_mem_write, x_link,
+         x_link_val, x_reg_write, x_mem_to_reg, x_pc, x_r1, x_r2, x_imm, x_rs, x_rt, x_rd) = self.id_ex
+        (m_reg_write, m_mem_to_reg, m_mem_read, m_mem_write, _, _,
+         _, _, _, m_alu_result, m_write_data, m_dest) = self.ex_mem
+        m_fwd = m_reg_write and m_dest & 7
+        w_fwd = wb_write and wb_dest & 7
+        if m_fwd and m_dest & 7 == x_rs & 7:
+            a = m_alu_result
+        elif w_fwd and wb_dest & 7 == x_rs & 7:
+            a = write_back_data
+        else:
+            a = x_r1
+        if m_fwd and m_dest & 7 == x_rt & 7:
+            fwd_b = m_alu_result
+        elif w_fwd and wb_dest & 7 == x_rt & 7:
+            fwd_b = write_back_data
+        else:
+            fwd_b = x_r2
+        alu_result = alu(x_alu_op, a, x_imm if x_alu_src else fwd_b)
+        zero = 1 if alu_result == 0 else 0
+        branch_target = (x_pc + x_imm) & MASK
+        branch_taken = (x_beq and zero) or (x_bne and not zero)
+        dest = RA if x_link else (x_rd if x_reg_dst else x_rt)
+
+        # MEM
+        mem_read_data = self.dmem[m_alu_result & 0xFF] if m_mem_read else 0
+
+        # Hazard detection and next pc
+        stall = x_mem_read and (x_rt & 7 == rs & 7 or x_rt & 7 == rt & 7)
+        if branch_taken:
+            pc_next = branch_target
+        elif jump or link_write:
+            pc_next = instr & MASK
+        elif jump_reg:
+            pc_next = read_data1
+        else:
+            pc_next = pc_next_seq
+
+        # Rising edge
+        if wb_write and wb_dest & 7:
+            regs[wb_dest & 7] = write_back_data
+            if self.commits is not None:
+                self.commits.append((self.cycle, wb_dest & 7, write_back_data))
+        if m_mem_write:
+            self.dmem[m_alu_result & 0xFF] = m_write_data
+        if not stall:
+            self.pc = pc_next
+        link = self.link
+        if link_write:
+            self.link = pc_next_seq
+        if branch_taken or jump or link_write or jump_reg:
+            self.if_id = IF_ID_ZERO
+        elif not stall:
+            self.if_id = (pc_next_seq, instruction)
+        if stall or branch_taken:
+            self.id_ex = ID_EX_ZERO
+        else:
+            self.id_ex = (reg_dst, alu_op, alu_src, branch_eq, branch_ne, mem_read, mem_write,
+                          link_write, link, reg_write, mem_to_reg, if_pc,
+                          read_data1, read_data2, instr & MASK, rs, rt, (instr >> 11) & 31)
+        self.ex_mem = (x_reg_write, x_mem_to_reg, x_mem_read, x_mem_write, x_beq, x_bne,
+                       zero, branch_target, x_link, x_link_val if x_link else alu_result,
+                       fwd_b, dest)
+        self.mem_wb = (m_reg_write, m_mem_to_reg, mem_read_data, m_alu_result, m_dest)
+        self.cycle += 1
+
+    def signals(self):
+        # Every top-level cpu.v signal, named as in the RTL, for the current
+        # state (i.e. just before the next rising edge)
+        s = {}
+        regs = self.regs
+        s["pc_current"] = pc = self.pc
+        s["pc_next_seq"] = (pc + 2) & MASK
+        s["instruction"] = self.imem[(pc >> 1) & 0xFF]
+        s["if_id_pc_plus_1"], s["if_id_instr"] = self.if_id
+        instr = s["if_id_instr"]
+        s["opcode"] = instr >> 26
+        s["rs"] = rs = (instr >> 21) & 31
+        s["rt"] = rt = (instr >> 16) & 31
+        s["rd"] = (instr >> 11) & 31
+        s["funct"] = instr & 63
+        s["immediate"] = s["sign_ext_imm"] = s["jump_target_address"] = instr & MASK
+        s.update(zip(CONTROL_FIELDS, control(instr)))
+        s["read_data1"] = regs[rs & 7] if rs & 7 else 0
+        s["read_data2"] = regs[rt & 7] if rt & 7 else 0
+        s["link_reg_out"] = self.link
+        s["cals_wb_m_ex"] = ((s["reg_dst"] << 10) | (s["alu_op"] << 7) | (s["alu_src"] << 6)
+                             | (s["branch_eq"] << 5) | (s["branch_ne"] << 4) | (s["mem_read"] << 3)
+                             | (s["mem_write"] << 2) | (s["reg_write"] << 1) | s["mem_to_reg"])
+
+        names = ("reg_dst", "alu_op", "alu_src", "branch_eq", "branch_ne", "mem_read", "mem_write",
+                 "LinkWrite", "link_reg_out", "reg_write", "mem_to_reg", "pc_plus_1",
+                 "read_data1", "read_data2", "sign_ext_imm", "rs", "rt", "rd")
+        s.update(("id_ex_" + name, value) for name, value in zip(names, self.id_ex))
+        names = ("reg_write", "mem_to_reg", "mem_read", "mem_write", "branch_eq", "branch_ne",
+                 "zero", "branch_target", "LinkWrite", "alu_result", "write_data_mem", "dest_reg")
+        s.update(("ex_mem_" + name, value) for name, value in zip(names, self.ex_mem))
+        names = ("reg_write", "mem_to_reg", "read_data", "alu_result", "dest_reg")
+        s.update(("mem_wb_" + name, value) for name, value in zip(names, self.mem_wb))
+
+        s["write_back_data"] = s["mem_wb_read_data"] if s["mem_wb_mem_to_reg"] else s["mem_wb_alu_result"]
+        s["forward_a"] = self._forward(s, s["id_ex_rs"])
+        s["forward_b"] = self._forward(s, s["id_ex_rt"])
+        choice = {2: s["ex_mem_alu_result"], 1: s["write_back_data"]}
+        s["fwd_data_a"] = s["alu_in_a"] = choice.get(s["forward_a"], s["id_ex_read_data1"])
+        s["fwd_data_b"] = choice.get(s["forward_b"], s["id_ex_read_data2"])
+        s["alu_in_b"] = s["id_ex_sign_ext_imm"] if s["id_ex_alu_src"] else s["fwd_data_b"]
+        s["alu_result"] = alu(s["id_ex_alu_op"], s["alu_in_a"], s["alu_in_b"])
+        s["alu_zero"] = 1 if s["alu_result"] == 0 else 0
+        s["dest_mux_out"] = s["id_ex_rd"] if s["id_ex_reg_dst"] else s["id_ex_rt"]
+        s["write_reg_addr_ex"] = RA if s["id_ex_LinkWrite"] else s["dest_mux_out"]
+        s["branch_target_addr"] = (s["id_ex_pc_plus_1"] + s["id_ex_sign_ext_imm"]) & MASK
+        s["branch_taken"] = s["ex_flush"] = int((s["id_ex_branch_eq"] and s["alu_zero"])
+                                                or (s["id_ex_branch_ne"] and not s["alu_zero"]))
+        s["ex_result_to_mem"] = s["id_ex_link_reg_out"] if s["id_ex_LinkWrite"] else s["alu_result"]
+        s["mem_read_data"] = self.dmem[s["ex_mem_alu_result"] & 0xFF] if s["ex_mem_mem_read"] else 0
+
+        s["stall"] = int(bool(s["id_ex_mem_read"]) and (s["id_ex_rt"] & 7 == rs & 7 or s["id_ex_rt"] & 7 == rt & 7))
+        s["pc_write"] = s["if_id_write"] = 1 - s["stall"]
+        s["id_flush_signals"] = int(s["stall"] or s["branch_taken"])
+        s["if_flush"] = int(s["branch_taken"] or s["jump"] or s["LinkWrite"] or s["jump_reg"])
+        if s["branch_taken"]:
+            s["pc_next"] = s["branch_target_addr"]
+        elif s["jump"] or s["LinkWrite"]:
+            s["pc_next"] = s["jump_target_address"]
+        elif s["jump_reg"]:
+            s["pc_next"] = s["read_data1"]
+        else:
+            s["pc_next"] = s["pc_next_seq"]
+        return s
+
+    def _forward(self, s, reg):
+        reg &= 7
+        if s["ex_mem_reg_write"] and s["ex_mem_dest_reg"] & 7 and s["ex_mem_dest_reg"] & 7 == reg:
+            return 2
+        if s["mem_wb_reg_write"] and s["mem_wb_dest_reg"] & 7 and s["mem_wb_dest_reg"] & 7 == reg:
+            return 1
+        return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run an instruction image on the cpu.v cycle model")
+    parser.add_argument("image", help="program.mem / program.hex / .bin image")
+    parser.add_argument("--cycles", type=int, default=100, help="clock cycles after reset (default: 100)")
+    parser.add_argument("--reset-cycles", type=int, default=10, help="cycles held in reset (default: 10)")
+    parser.add_argument("--period", type=int, default=10, help="clock period in ns (default: 10)")
+    args = parser.parse_args(argv)
+
+    # Same log as tb_cpu.v: pc and instruction sampled at each rising edge
+    model = RTLModel(read_image(args.image))
+    for edge in range(args.reset_cycles, args.reset_cycles + args.cycles):
+        time = args.period // 2 + edge * args.period
+        print(f"Time: {time:20d}, PC: {model.pc:04x}, Instr: {model.imem[(model.pc >> 1) & 0xFF]:08x}")
+        model.step()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import math
+import statistics
+
+from cpu import CPU
+from memory import PagedMemory
+from pipeline import Pipeline
+from predecode import predecode
+from hybrid import detail, drain, halt_set
+import functional
+
+# Statistical sampling simulation for long runs.
+# Every `period` instructions, the functional interpreter hands the state to
+# a Pipeline that runs `warmup` cycles to warm the pipeline, predictor and
+# caches, then measures CPI over a `window`-cycle detailed window, and is
+# drained back to the functional interpreter. The mean CPI of the windows,
+# with a normal-approximation confidence interval, is scaled to the total
+# instruction count to estimate whole-program cycles.
+
+
+def run(program, period=100000, window=1000, warmup=1000, confidence=0.95,
+        max_instructions=100000000, predictor=None, icache=None, dcache=None,
+        dispatch=True, cpu=None, memory=None):
+    if cpu is None:
+        cpu = CPU()
+    if memory is None:
+        memory = PagedMemory()
+    if dispatch:
+        predecode(program)
+    halts = halt_set(program)
+
+    samples = []
+    instructions = 0
+    detailed_cycles = 0
+    halted = False
+    while instructions < max_instructions and not halted:
+        # Functional stretch up to the next window
+        budget = min(period, max_instructions - instructions)
+        cpu, memory, retired = functional.run(program, budget, cpu, memory)
+        instructions += retired
+        if retired < budget:
+            break # Program finished
+
+        pipe = Pipeline(cpu, memory, dispatch=dispatch)
+        pipe.predictor = predictor
+        pipe.icache = icache
+        pipe.dcache = dcache
+        cycles, halted = detail(pipe, program, warmup, halts)
+        detailed_cycles += cycles
+        instructions += pipe.counters.retired
+        pipe.counters.reset()
+        if halted:
+            break
+
+        cycles, halted = detail(pipe, program, window, halts)
+        detailed_cycles += cycles
+        retired = pipe.counters.retired
+        instructions += retired
+        if retired and not halted:
+            samples.append(cycles / retired)
+        pipe.counters.reset()
+        if not halted:
+            detailed_cycles += drain(pipe)
+            instructions += pipe.counters.retired
+
+    return estimate(samples, instructions, confidence, detailed_cycles)
+
+
+def estimate(samples, instructions, confidence=0.95, detailed_cycles=0):
+    # Mean CPI and its confidence interval, scaled to `instructions`
+    result = {
+        "windows": len(samples),
+        "instructions": instructions,
+        "detailed_cycles": detailed_cycles,
+        "samples": samples,
+    }
+    if not samples:
+        return result
+    cpi = statistics.fmean(samples)
+    half = 0.0
+    if len(samples) > 1:
+        z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        half = z * statistics.stdev(samples) / math.sqrt(len(samples))
+    result.update({
+        "cpi": cpi,
+        "cpi_low": cpi - half,
+        "cpi_high": cpi + half,
+        "confidence": confidence,
+        "cycles": cpi * instructions,
+        "cycles_low": (cpi - half) * instructions,
+        "cycles_high": (cpi + half) * instructions,
+    })
+    return result
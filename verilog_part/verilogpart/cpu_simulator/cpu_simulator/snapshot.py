@@ -0,0 +1,148 @@
+import pickle
+import zlib
+from array import array
+
+# Full simulator state snapshots: CPU registers/pc, memory, the in-flight
+# pipeline latches together with the per-instruction values they carry, and
+# the performance counters.
+# Taken with Pipeline.snapshot() and applied with Pipeline.restore(); a
+# snapshot can be restored any number of times to fork what-if runs.
+#
+# PagedMemory snapshots share unchanged pages with the previous snapshot, so
+# keeping thousands of them costs little more than the pages that changed.
+
+STAGES = ("IF", "ID", "EX", "MEM", "WB")
+
+# Values computed for an instruction while it travels down the pipeline
+LATCH_ATTRS = ("result", "effective_address", "val_to_store")
+
+FORMAT_VERSION = 1
+
+
+class Snapshot:
+    __slots__ = ("cpu", "memory", "latches", "cycle", "prediction", "caches", "counters")
+
+    def __init__(self, cpu, memory, latches, cycle, prediction=None, caches=None, counters=None):
+        self.cpu = cpu          # CPU.snapshot()
+        self.memory = memory    # Memory/PagedMemory.snapshot()
+        self.latches = latches  # {stage: (instruction, {attr: value}) or None}
+        self.cycle = cycle
+        self.prediction = prediction # (IF_pred, ID_pred, Predictor.snapshot()) or None
+        self.caches = caches         # (freeze, icache, dcache Cache.snapshot()) or None
+        self.counters = counters     # PerfCounters.snapshot() or None
+
+
+def capture_latch(instruction):
+    if instruction is None:
+        return None
+    attrs = {}
+    for attr in LATCH_ATTRS:
+        if hasattr(instruction, attr):
+            attrs[attr] = getattr(instruction, attr)
+    return (instruction, attrs)
+
+
+def apply_latch(latch):
+    if latch is None:
+        return None
+    instruction, attrs = latch
+    for attr in LATCH_ATTRS:
+        if attr in attrs:
+            setattr(instruction, attr, attrs[attr])
+        elif hasattr(instruction, attr):
+            delattr(instruction, attr)
+    return instruction
+
+
+# --- Serialisation ---
+# Latched instructions are stored by program address when a program is
+# given, so a loaded snapshot refers to that program's instruction objects.
+
+def save(snap, path, program=None):
+    index = {id(instr): pc for pc, instr in enumerate(program or ())}
+    latches = {}
+    for stage, latch in snap.latches.items():
+        if latch is None:
+            latches[stage] = None
+            continue
+        instruction, attrs = latch
+        pc = index.get(id(instruction))
+        latches[stage] = ("pc", pc, attrs) if pc is not None else ("object", instruction, attrs)
+
+    counters = snap.counters
+    if counters is not None:
+        start, retired, flushes, *counts = counters
+        counters = (start, _by_address(retired, index), _by_address(flushes, index), *counts)
+
+    memory = snap.memory
+    if isinstance(memory, dict):
+        memory = ("paged", {n: page.tobytes() for n, page in memory.items()})
+    else:
+        memory = ("flat", memory)
+
+    state = {
+        "version": FORMAT_VERSION,
+        "cpu": snap.cpu,
+        "memory": memory,
+        "latches": latches,
+        "cycle": snap.cycle,
+        "prediction": snap.prediction,
+        "caches": snap.caches,
+        "counters": counters,
+    }
+    with open(path, "wb") as f:
+        f.write(zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL)))
+
+
+def load(path, program=None):
+    with open(path, "rb") as f:
+        state = pickle.loads(zlib.decompress(f.read()))
+    if state.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported snapshot version {state.get('version')}")
+
+    kind, memory = state["memory"]
+    if kind == "paged":
+        pages = {}
+        for n, raw in memory.items():
+            page = array('H')
+            page.frombytes(raw)
+            pages[n] = page
+        memory = pages
+
+    latches = {}
+    for stage, latch in state["latches"].items():
+        if latch is None:
+            latches[stage] = None
+        elif latch[0] == "pc":
+            if program is None:
+                raise ValueError(f"{path}: snapshot refers to program addresses, pass the program")
+            latches[stage] = (program[latch[1]], latch[2])
+        else:
+            latches[stage] = (latch[1], latch[2])
+
+    counters = state.get("counters")
+    if counters is not None:
+        start, retired, flushes, *counts = counters
+        counters = (start, _from_address(retired, program, path), _from_address(flushes, program, path), *counts)
+    return Snapshot(state["cpu"], memory, latches, state["cycle"], state.get("prediction"), state.get("caches"),
+                    counters)
+
+
+def _by_address(counts, index):
+    # Per-instruction counts keyed like the latches: by address where possible
+    keys = []
+    for instruction, n in counts.items():
+        pc = index.get(id(instruction))
+        keys.append(("pc", pc, n) if pc is not None else ("object", instruction, n))
+    return keys
+
+
+def _from_address(keys, program, path):
+    counts = {}
+    for kind, key, n in keys:
+        if kind == "pc":
+            if program is None:
+                raise ValueError(f"{path}: snapshot refers to program addresses, pass the program")
+            key = program[key]
+        counts[key] = n
+    return counts
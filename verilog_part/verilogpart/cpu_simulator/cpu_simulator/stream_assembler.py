@@ -0,0 +1,203 @@
+import re
+import sys
+import time
+from array import array
+
+from instruction import OPCODES, FUNCT_CODES, REG_MAP
+
+# Single-pass streaming assembler for very large (machine-written) sources.
+# Lines are consumed one at a time from a file, a path or any iterable, and
+# each instruction is encoded straight into an array('I') of 32-bit words,
+# bit-identical to Instruction.encode(); no Instruction objects are kept.
+# Branches and jumps to labels not seen yet are left as fixups and patched
+# when the label is defined, so only unresolved references stay in memory.
+#
+#   asm = StreamAssembler()
+#   words = asm.assemble("big.asm")
+#   words.tofile(open("big.bin", "wb"))
+#
+# Unlike Assembler, redefining a label is an error: backward references have
+# already been encoded against the first definition.
+#
+#   python stream_assembler.py [lines]   # lines/second benchmark
+
+# Bump whenever the encoding changes: it keys the on-disk cache (asm_cache)
+VERSION = 1
+
+LABEL = re.compile(r"^(\w+):")
+MEM_OPERAND = re.compile(r"(-?\d+)\((\$\w+)\)")
+
+R, JR, RET, ADDI, MEM, BRANCH, JUMP = range(7)
+
+# Opcode -> (operand format, base word)
+FORMATS = {
+    "ADD": (R, FUNCT_CODES["ADD"]),
+    "SUB": (R, FUNCT_CODES["SUB"]),
+    "AND": (R, 0),
+    "OR": (R, 0),
+    "SLT": (R, 0),
+    "JR": (JR, FUNCT_CODES["JR"]),
+    "RET": (RET, (REG_MAP["$ra"] << 21) | FUNCT_CODES["JR"]),
+    "ADDI": (ADDI, OPCODES["ADDI"] << 26),
+    "LW": (MEM, OPCODES["LW"] << 26),
+    "LOAD": (MEM, OPCODES["LOAD"] << 26),
+    "SW": (MEM, OPCODES["SW"] << 26),
+    "STORE": (MEM, OPCODES["STORE"] << 26),
+    "BEQ": (BRANCH, OPCODES["BEQ"] << 26),
+    "BNE": (BRANCH, OPCODES["BNE"] << 26),
+    "J": (JUMP, OPCODES["J"] << 26),
+    "JAL": (JUMP, OPCODES["JAL"] << 26),
+    "CALL": (JUMP, OPCODES["JAL"] << 26),
+}
+
+IMM_MASK = 0xFFFF
+ADDR_MASK = 0x3FFFFFF
+
+
+class StreamAssembler:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.words = array("I")
+        self.symbols = {}  # Label -> address
+        self.pending = {}  # Unresolved label -> [(address, mask, line_no)]
+
+    def assemble(self, source):
+        # source: a path, an open text file or an iterable of lines
+        if isinstance(source, str):
+            with open(source, "r") as f:
+                return self.assemble(f)
+        self.reset()
+        self.feed(source)
+        return self.finish()
+
+    def feed(self, lines, first_line=1):
+        # Encode a chunk of lines; may be called repeatedly before finish()
+        words = self.words
+        append = words.append
+        symbols = self.symbols
+        pending = self.pending
+        formats = FORMATS
+        reg = REG_MAP.get
+        for line_no, line in enumerate(lines, first_line):
+            if "#" in line:
+                line = line[:line.index("#")]
+            line = line.strip()
+            if not line:
+                continue
+            if ":" in line:
+                match = LABEL.match(line)
+                if match:
+                    self._define(match.group(1), line_no)
+                    line = line[match.end():].strip()
+                    if not line:
+                        continue
+
+            parts = line.replace(",", " ").split()
+            opcode = parts[0].upper()
+            try:
+                kind, word = formats[opcode]
+                if kind == R:
+                    word |= (reg(parts[2], 0) << 21) | (reg(parts[3], 0) << 16) | (reg(parts[1], 0) << 11)
+                elif kind == ADDI:
+                    word |= (reg(parts[2], 0) << 21) | (reg(parts[1], 0) << 16) | (int(parts[3]) & IMM_MASK)
+                elif kind == MEM:
+                    match = MEM_OPERAND.match(parts[2])
+                    if match:
+                        word |= (reg(match.group(2), 0) << 21) | (int(match.group(1)) & IMM_MASK)
+                    else:
+                        word |= int(parts[2]) & IMM_MASK
+                    word |= reg(parts[1], 0) << 16
+                elif kind == BRANCH:
+                    word |= (reg(parts[1], 0) << 21) | (reg(parts[2], 0) << 16)
+                    word |= self._target(parts[3], IMM_MASK, line_no)
+                elif kind == JUMP:
+                    word |= self._target(parts[1], ADDR_MASK, line_no)
+                elif kind == JR:
+                    word |= reg(parts[1], 0) << 21
+            except KeyError:
+                raise ValueError(f"Line {line_no}: Unknown opcode: {opcode}") from None
+            except (IndexError, ValueError) as e:
+                raise ValueError(f"Line {line_no}: {line} -> {e}") from None
+            append(word)
+
+    def finish(self):
+        if self.pending:
+            label, refs = next(iter(self.pending.items()))
+            raise ValueError(f"Line {refs[0][2]}: Undefined label: {label}")
+        return self.words
+
+    def _define(self, label, line_no):
+        if label in self.symbols:
+            raise ValueError(f"Line {line_no}: Duplicate label: {label}")
+        addr = len(self.words)
+        self.symbols[label] = addr
+        refs = self.pending.pop(label, None)
+        if refs:
+            words = self.words
+            for ref, mask, _ in refs:
+                words[ref] |= addr & mask
+
+    def _target(self, token, mask, line_no):
+        addr = self.symbols.get(token)
+        if addr is not None:
+            return addr & mask
+        if token.lstrip("-").isdigit():
+            return int(token) & mask
+        self.pending.setdefault(token, []).append((len(self.words), mask, line_no))
+        return 0
+
+
+def assemble(source):
+    # Returns (words, symbols)
+    asm = StreamAssembler()
+    words = asm.assemble(source)
+    return words, asm.symbols
+
+
+def synthetic(count):
+    # Machine-written style source: a loop body repeated `count` times
+    body = [
+        "L{0}: ADDI $t0, $t0, 1",
+        "    LW   $t1, 4($t0)",
+        "    ADD  $t2, $t2, $t1",
+        "    SW   $t2, 8($t0)  # store",
+        "    BNE  $t0, $zero, L{1}",
+        "    J    L{0}",
+    ]
+    for i in range(count // len(body)):
+        for line in body:
+            yield line.format(i, i + 1) + "\n"
+    yield f"L{count // len(body)}: J L{count // len(body)}\n"
+
+
+def benchmark(count=600000, repeat=3):
+    # Best of `repeat` runs of each assembler on `count` synthetic lines;
+    # returns (stream, full) in lines per second
+    from assembler import Assembler
+    source = "".join(synthetic(count))
+    lines = source.count("\n")
+
+    stream = full = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        words = StreamAssembler().assemble(source.splitlines())
+        elapsed = time.perf_counter() - start
+        stream = elapsed if stream is None else min(stream, elapsed)
+
+        start = time.perf_counter()
+        program = Assembler().assemble(source)
+        elapsed = time.perf_counter() - start
+        full = elapsed if full is None else min(full, elapsed)
+
+    assert len(words) == len(program)
+    print(f"{lines} lines, best of {repeat}")
+    print(f"StreamAssembler: {stream:.3f}s  {lines / stream:,.0f} lines/s")
+    print(f"Assembler:       {full:.3f}s  {lines / full:,.0f} lines/s")
+    print(f"Speedup:         {full / stream:.2f}x")
+    return lines / stream, lines / full
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 600000)
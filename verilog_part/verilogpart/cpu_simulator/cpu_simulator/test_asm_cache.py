@@ -0,0 +1,80 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from asm_cache import AsmCache, source_key
+from instruction import OPCODES
+from stream_assembler import StreamAssembler
+
+def program(n):
+    return f"Start: ADDI $t0, $zero, {n}\nLoop: ADDI $t0, $t0, -1\nBNE $t0, $zero, Loop\nEnd: J End\n"
+
+def store(args):
+    directory, source = args
+    with AsmCache(directory).assemble(source) as entry:
+        return list(entry.words)
+
+def test_hit_and_miss():
+    print("Testing cache hit and miss...")
+    cache = AsmCache(tempfile.mkdtemp())
+    source = program(5)
+    with cache.assemble(source) as entry:
+        words, symbols = list(entry.words), dict(entry.symbols)
+    assert cache.misses == 1 and cache.hits == 0
+    expected = StreamAssembler()
+    assert words == list(expected.assemble(source.splitlines()))
+    assert symbols == expected.symbols == {"Start": 0, "Loop": 1, "End": 3}
+    with cache.get(source) as entry:
+        assert list(entry.words) == words and entry.symbols == symbols
+    assert cache.hits == 1
+    assert source_key(source) != source_key(source, version=-1)
+    assert cache.get(program(6)) is None
+    print("PASS")
+
+def test_key_covers_encoding_tables():
+    print("Testing keys against instruction.py table edits...")
+    source = program(5)
+    key = source_key(source)
+    OPCODES["ADDI"] = 9
+    try:
+        assert source_key(source) != key
+    finally:
+        OPCODES["ADDI"] = 8
+    assert source_key(source) == key
+    print("PASS")
+
+def test_lru_eviction():
+    print("Testing size-bounded LRU eviction...")
+    cache = AsmCache(tempfile.mkdtemp())
+    for n in range(3):
+        cache.assemble(program(n)).close()
+        # Explicit ages: filesystem mtime resolution may be coarse
+        os.utime(cache.path(source_key(program(n))), (1000 * (n + 1), 1000 * (n + 1)))
+    entry_size = cache.size() // 3
+    cache.max_bytes = 3 * entry_size
+    cache.get(program(0)).close() # Now the most recently used
+    cache.assemble(program(3)).close()
+    assert cache.size() <= cache.max_bytes
+    assert cache.get(program(1)) is None # Least recently used
+    for n in (0, 2, 3):
+        cache.get(program(n)).close()
+    print("PASS")
+
+def test_concurrent_writers():
+    print("Testing concurrent processes...")
+    directory = tempfile.mkdtemp()
+    jobs = [(directory, program(n % 4)) for n in range(16)]
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(store, jobs))
+    cache = AsmCache(directory)
+    for (_, source), words in zip(jobs, results):
+        with cache.get(source) as entry:
+            assert list(entry.words) == words
+    assert not [name for name in os.listdir(directory) if name.endswith(".tmp")]
+    print("PASS")
+
+if __name__ == "__main__":
+    test_hit_and_miss()
+    test_key_covers_encoding_tables()
+    test_lru_eviction()
+    test_concurrent_writers()
@@ -0,0 +1,57 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import batch_runner
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def test_simulate_file():
+    result = batch_runner.simulate_file(os.path.join(HERE, "fibonacci.asm"), 1000, 10.0)
+    print(result)
+    assert result["status"] == "halted"
+    assert result["registers"]["$t1"] == 89
+    assert [500, 89] in result["memory"]
+
+    result = batch_runner.simulate_file(os.path.join(HERE, "sum_loop.asm"), 500, 10.0)
+    assert result["status"] == "cycle_limit"
+    assert result["cycles"] == 500
+    assert result["memory"] == [[200, 15]]
+
+def test_time_limit():
+    result = batch_runner.simulate_file(os.path.join(HERE, "sum_loop.asm"), 10 ** 9, 0.0)
+    assert result["status"] == "timeout"
+    assert result["cycles"] == batch_runner.CHECK_EVERY
+
+def test_bad_program(tmp_path):
+    path = tmp_path / "bad.asm"
+    path.write_text("ADDI $t0, $zero, 1\nFOO $t0\n")
+    result = batch_runner.simulate_file(str(path), 1000, 10.0)
+    assert result["status"] == "error"
+    assert "Unknown opcode" in result["error"]
+    assert "line 2" in result["error"]
+
+def test_stdout_is_json_lines(tmp_path):
+    # Parse errors must not leak into the default -o - stream
+    (tmp_path / "bad.asm").write_text("ADDI $t0, $zero, 1\nFOO $t0\n")
+    (tmp_path / "good.asm").write_text("ADDI $t0, $zero, 1\nEnd: J End\n")
+    proc = subprocess.run([sys.executable, os.path.join(HERE, "batch_runner.py"), str(tmp_path), "--workers", "1"],
+                          capture_output=True, text=True, cwd=HERE)
+    results = [json.loads(line) for line in proc.stdout.splitlines()]
+    assert sorted(r["status"] for r in results) == ["error", "halted"]
+
+def test_run_batch(tmp_path):
+    for name in ("fibonacci.asm", "procedure_demo.asm", "sum_loop.asm"):
+        with open(os.path.join(HERE, name)) as f:
+            (tmp_path / name).write_text(f.read())
+    paths = batch_runner.find_programs(str(tmp_path))
+    assert len(paths) == 3
+
+    out = io.StringIO()
+    counts = batch_runner.run_batch(paths, out, max_cycles=2000, time_limit=10.0, workers=2)
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(os.path.basename(r["program"]) for r in results) == sorted(
+        ["fibonacci.asm", "procedure_demo.asm", "sum_loop.asm"])
+    assert sum(counts.values()) == 3
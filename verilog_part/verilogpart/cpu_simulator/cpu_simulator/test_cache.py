@@ -0,0 +1,92 @@
+import os
+
+from assembler import Assembler
+from cache import Cache
+from cpu import CPU
+from memory import PagedMemory
+from pipeline import Pipeline
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def test_replacement_policies():
+    # One set of two ways: A, B, A, C then A again
+    a, b, c = 0, 4, 8
+    lru = Cache(size=8, assoc=2, line_size=4, replacement="lru")
+    fifo = Cache(size=8, assoc=2, line_size=4, replacement="fifo")
+    for cache in (lru, fifo):
+        for address in (a, b, a + 1, c):
+            cache.access(address)
+    assert lru.access(a) == 0          # LRU evicted B
+    assert fifo.access(a) == fifo.miss_latency # FIFO evicted A
+    assert lru.misses == 3 and lru.evictions == 1
+    assert lru.hits == 2 and fifo.hits == 1
+
+    rnd = Cache(size=8, assoc=2, line_size=4, replacement="random", seed=1)
+    for address in range(0, 64, 4):
+        rnd.access(address)
+    assert rnd.misses == 16 and rnd.evictions == 14
+
+def test_write_back_and_write_through():
+    wb = Cache(size=8, assoc=1, line_size=4, miss_latency=10, write_buffer=0)
+    assert wb.access(0, write=True) == 10   # Write allocate
+    assert wb.access(1, write=True) == 0
+    assert wb.access(8) == 10 + 10          # Miss plus the dirty line written back
+    assert wb.writebacks == 1 and wb.evictions == 1
+
+    wt = Cache(size=8, assoc=1, line_size=4, write_policy="write-through",
+               miss_latency=10, write_buffer=2, write_latency=5)
+    stalls = [wt.access(0, write=True, cycle=0) for _ in range(3)]
+    assert stalls == [0, 0, 5] # Third write waits for the first to drain
+    assert wt.misses == 3      # No write allocate
+    assert wt.access(0, write=True, cycle=100) == 0
+    assert wt.buffer_stalls == 5
+
+def run(name, icache=None, dcache=None, dispatch=False, max_cycles=2000):
+    with open(os.path.join(HERE, name)) as f:
+        program = Assembler().assemble(f.read())
+    pipe = Pipeline(CPU(), PagedMemory(), dispatch=dispatch)
+    pipe.icache = icache
+    pipe.dcache = dcache
+    for cycle in range(1, max_cycles + 1):
+        pipe.fetch(program)
+        pipe.step()
+        if pipe.WB is program[-1]:
+            return pipe, cycle
+    return pipe, None
+
+def test_pipeline_freezes_on_misses():
+    for dispatch in (False, True):
+        base, base_cycles = run("fibonacci.asm", dispatch=dispatch)
+        icache = Cache(size=16, assoc=1, line_size=4, miss_latency=8, name="I")
+        dcache = Cache(size=64, assoc=2, line_size=4, miss_latency=8, name="D")
+        pipe, cycles = run("fibonacci.asm", icache, dcache, dispatch)
+        print(icache.stats(), dcache.stats())
+        assert pipe.cpu.registers == base.cpu.registers
+        assert pipe.memory.load(500) == 89
+        assert icache.misses == 3 # 11 instructions, 4 per line
+        assert dcache.misses == 1 # The final SW
+        assert pipe.counters.cache_stalls == icache.stall_cycles + dcache.stall_cycles
+        assert cycles == base_cycles + pipe.counters.cache_stalls
+
+def test_snapshot_restores_cache_state():
+    with open(os.path.join(HERE, "array_sum.asm")) as f:
+        program = Assembler().assemble(f.read())
+    pipe = Pipeline(CPU(), PagedMemory())
+    pipe.dcache = Cache(size=8, assoc=1, line_size=2, miss_latency=6)
+    def go(cycles):
+        for _ in range(cycles):
+            pipe.fetch(program)
+            pipe.step()
+        return (list(pipe.cpu.regs), pipe.cycle, pipe.freeze, pipe.dcache.stats())
+    go(7) # Mid-miss
+    snap = pipe.snapshot()
+    expected = go(60)
+    pipe.restore(snap)
+    assert go(60) == expected
+
+if __name__ == "__main__":
+    test_replacement_policies()
+    test_write_back_and_write_through()
+    test_pipeline_freezes_on_misses()
+    test_snapshot_restores_cache_state()
+    print("Cache tests passed!")
@@ -0,0 +1,111 @@
+import os
+import tempfile
+
+import pytest
+
+from asm_cache import AsmCache
+from assembler import Assembler
+from cosim import Commit, compare, cosim, model_commits, pipeline_commits, rtl_image
+from program_image import read_image
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+VERILOG_DIR = os.path.join(HERE, "..", "..")
+
+# Forwarding distances the RTL handles: no reads three instructions after a write
+MATCHING = """
+ADDI $t1, $zero, 0
+ADDI $t0, $zero, 3
+Loop: ADDI $t0, $t0, -1
+ADD $t1, $t1, $t0
+BNE $t0, $zero, Loop
+ADD $t2, $t1, $t1
+SW $t2, 4($zero)
+LW $t3, 4($zero)
+ADD $v0, $t3, $t1
+End: J End
+"""
+
+def write_program(source):
+    path = os.path.join(tempfile.mkdtemp(), "program.asm")
+    with open(path, "w") as f:
+        f.write(source)
+    return path
+
+def test_rtl_image():
+    print("Testing byte-addressed targets in the RTL image...")
+    with open(os.path.join(HERE, "sum_loop.asm")) as f:
+        program = Assembler().assemble(f.read())
+    words = rtl_image(program)
+    # BNE $t0, $zero, Loop at word 4: Loop is word 2, i.e. pc+2 - 6 bytes
+    assert words[4] == 0x1420FFFA
+    # J End at word 6 jumps to End, the SW at word 5: byte 10
+    assert words[6] == 0x0800000A
+    assert words[0] == program[0].encode()
+    print("PASS")
+
+def test_matching_program():
+    print("Testing a program both cores agree on...")
+    path = write_program(MATCHING)
+    image = os.path.join(os.path.dirname(path), "program.mem")
+    count, divergence, report = cosim(path, image=image)
+    assert divergence is None, report
+    assert count == 11
+    assert read_image(image)[:10].tolist() == rtl_image(Assembler().assemble(MATCHING)).tolist()
+    print("PASS")
+
+def test_cached_image():
+    print("Testing the RTL image from the assembly cache...")
+    path = write_program(MATCHING)
+    cache = AsmCache(tempfile.mkdtemp())
+    for _ in range(2):
+        count, divergence, _ = cosim(path, cache=cache)
+        assert divergence is None and count == 11
+    assert cache.misses == 1 and cache.hits == 1
+    assert cosim(os.path.join(HERE, "sum_loop.asm"), cache=cache)[:2] == cosim(os.path.join(HERE, "sum_loop.asm"))[:2]
+    print("PASS")
+
+def test_reports_divergence():
+    print("Testing the first divergence report...")
+    # The RTL register file has no write-through: ADDI $t0 at pc 3 reads
+    # $t0 in ID while pc 0 is still writing it back
+    count, divergence, report = cosim(os.path.join(HERE, "sum_loop.asm"))
+    assert count == 3
+    assert divergence.expected[1:] == (3, 1, 4)
+    assert divergence.actual[1:] == (3, 1, 0xFFFF)
+    assert "line 9: ADDI $t0, $t0, -1" in report[1]
+    print("\n".join(report))
+
+    # A stream that ends early diverges against None
+    commits = [Commit(0, 0, 1, 5), Commit(1, 1, 2, 6)]
+    assert compare(commits, commits[:1]) == (1, (1, commits[1], None))
+    print("PASS")
+
+def test_wave_commits():
+    print("Testing commits extracted from cpu_wave.vcd...")
+    pytest.importorskip("numpy") # Needed by vcd
+    from cosim import wave_commits
+    words = read_image(os.path.join(VERILOG_DIR, "program.mem"))
+    recorded = list(wave_commits(os.path.join(VERILOG_DIR, "cpu_wave.vcd"), words))
+    modelled = list(model_commits(words, 200))
+    assert len(recorded) > 50
+    assert recorded == modelled[:len(recorded)]
+    print("PASS")
+
+def test_pipeline_commits():
+    print("Testing the Pipeline commit stream...")
+    with open(os.path.join(HERE, "procedure_demo.asm")) as f:
+        program = Assembler().assemble(f.read())
+    commits = list(pipeline_commits(program, max_cycles=100))
+    # JAL commits $ra when it retires, after the two ADDIs before it
+    assert [(c.pc, c.reg) for c in commits[:4]] == [(0, 2), (1, 3), (2, 7), (6, 5)]
+    assert commits[3].value == 30
+    assert all(c.cycle < 100 for c in commits)
+    print("PASS")
+
+if __name__ == "__main__":
+    test_rtl_image()
+    test_matching_program()
+    test_cached_image()
+    test_reports_divergence()
+    test_wave_commits()
+    test_pipeline_commits()
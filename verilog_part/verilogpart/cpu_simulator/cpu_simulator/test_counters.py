@@ -0,0 +1,56 @@
+import os
+
+from assembler import Assembler
+from cpu import CPU
+from memory import PagedMemory
+from pipeline import Pipeline
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def run(name, cycles, dispatch=False):
+    with open(os.path.join(HERE, name)) as f:
+        program = Assembler().assemble(f.read())
+    pipe = Pipeline(CPU(), PagedMemory(), dispatch=dispatch)
+    stalls = 0
+    for _ in range(cycles):
+        pipe.fetch(program)
+        stalls += pipe.step()
+    return pipe, program, stalls
+
+def test_fibonacci_counts():
+    for dispatch in (False, True):
+        pipe, _, _ = run("fibonacci.asm", 120, dispatch)
+        c = pipe.counters
+        print(c.report())
+        assert c.cycles == 120
+        assert c.opcodes["ADD"] == 30 and c.opcodes["ADDI"] == 13 and c.opcodes["BNE"] == 10
+        assert c.branch_flushes == 9 # Loop runs 10 times
+        assert c.load_use_stalls == 0
+        assert c.retired == sum(c.opcodes.values())
+        assert c.cpi == c.cycles / c.retired
+
+def test_stalls_and_engines_agree():
+    pipe, _, stalls = run("array_sum.asm", 200)
+    fast, _, _ = run("array_sum.asm", 200, dispatch=True)
+    assert pipe.counters.load_use_stalls == stalls > 0
+    assert pipe.counters.as_dict() == fast.counters.as_dict()
+    assert pipe.counters.forwarding_hits > 0
+
+def test_reset_region():
+    pipe, program, _ = run("fibonacci.asm", 20)
+    before = pipe.counters.as_dict()
+    pipe.counters.reset()
+    assert pipe.counters.cycles == 0 and pipe.counters.retired == 0
+    for _ in range(30):
+        pipe.fetch(program)
+        pipe.step()
+    c = pipe.counters
+    assert c.cycles == 30
+    assert c.retired < 30 + 1
+    assert c.opcodes != before["opcodes"]
+
+if __name__ == "__main__":
+    test_fibonacci_counts()
+    test_stalls_and_engines_agree()
+    test_reset_region()
+    print("Counter tests passed!")
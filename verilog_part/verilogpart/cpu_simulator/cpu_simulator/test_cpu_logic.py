@@ -1,4 +1,4 @@
-from cpu import CPU
+from cpu import CPU, REG_INDEX
 from pipeline import Pipeline
 from instruction import RType, IType
 
@@ -53,5 +53,27 @@ def test_pipeline():
     
     print("Test Passed!")
 
+def test_register_file():
+    cpu = CPU()
+    assert cpu.get_register("$sp") == 0xFFF
+    
+    # Name and index accessors share the same 16-bit storage
+    cpu.set_register("$t0", 0x12345)
+    assert cpu.get_register("$t0") == 0x2345
+    assert cpu.read(REG_INDEX["$t0"]) == 0x2345
+    cpu.write(REG_INDEX["$s3"], -1)
+    assert cpu.get_register("$s3") == 0xFFFF
+    
+    # $zero is read-only
+    cpu.set_register("$zero", 5)
+    cpu.write(0, 5)
+    assert cpu.get_register("$zero") == 0
+    assert cpu.registers["$zero"] == 0
+    
+    cpu.reset()
+    assert cpu.get_register("$t0") == 0
+    assert cpu.registers["$sp"] == 0xFFF
+
 if __name__ == "__main__":
     test_pipeline()
+    test_register_file()
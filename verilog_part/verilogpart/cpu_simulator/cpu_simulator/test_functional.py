@@ -0,0 +1,100 @@
+import contextlib
+import io
+import os
+import time
+
+from assembler import Assembler
+from cpu import CPU
+from memory import Memory
+from pipeline import Pipeline
+import functional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def assemble(name):
+    with open(os.path.join(HERE, name)) as f:
+        return Assembler().assemble(f.read())
+
+def test_programs():
+    # sum_loop ends in a SW/J loop, so it runs until the instruction limit
+    cpu, mem, retired = functional.run(assemble("sum_loop.asm"), max_instructions=100)
+    print(f"sum_loop: $t1={cpu.get_register('$t1')} retired={retired}")
+    assert cpu.get_register("$t1") == 15
+    assert mem.load(200) == 15
+    assert retired == 100
+
+    # fibonacci halts on "End: J End"
+    cpu, mem, retired = functional.run(assemble("fibonacci.asm"))
+    assert retired == 3 + 10 * 5 + 3
+    assert cpu.pc == 10
+
+    assert cpu.get_register("$t1") == 89
+    assert mem.load(500) == 89
+
+    cpu, mem, retired = functional.run(assemble("procedure_demo.asm"))
+    assert cpu.get_register("$v0") == 30
+    assert cpu.get_register("$t0") == 35
+    assert mem.load(100) == 35
+
+    cpu, mem, retired = functional.run(assemble("array_sum.asm"))
+    assert cpu.get_register("$s2") == 60
+    assert cpu.get_register("$s1") == 3
+
+def test_max_instructions():
+    prog = Assembler().assemble("""
+    Loop:
+    ADDI $t0, $t0, 1
+    J Loop
+    """)
+    cpu, mem, retired = functional.run(prog, max_instructions=1001)
+    assert retired == 1001
+    assert cpu.get_register("$t0") == 501
+    assert cpu.pc == 1
+
+def run_pipeline_verbose(prog):
+    # main.py style driver (console output included), run until drained
+    cpu = CPU()
+    pipe = Pipeline(cpu, Memory())
+    with contextlib.redirect_stdout(io.StringIO()):
+        while cpu.pc < len(prog) or pipe.busy():
+            pipe.fetch(prog)
+            pipe.step()
+            print("Pipeline State:")
+            print("IF:", pipe.IF)
+            print("ID:", pipe.ID)
+            print("EX:", pipe.EX)
+            print("MEM:", pipe.MEM)
+            print("WB:", pipe.WB)
+            print("------")
+    return cpu
+
+def best_time(run, repeat=3):
+    # Best of several runs, so a busy machine does not decide the outcome
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def test_faster_than_pipeline():
+    prog = Assembler().assemble("""
+    ADDI $t2, $zero, 2000
+    Loop:
+    ADD  $t1, $t1, $t2
+    ADDI $t2, $t2, -1
+    BNE  $t2, $zero, Loop
+    """)
+    fast, (cpu_fast, _, _) = best_time(lambda: functional.run(prog))
+    slow, cpu = best_time(lambda: run_pipeline_verbose(prog))
+
+    print(f"functional {fast:.4f}s, pipeline {slow:.4f}s ({slow / fast:.0f}x)")
+    assert cpu.get_register("$t1") == cpu_fast.get_register("$t1")
+    # Typically ~70x; the bound leaves room for noisy machines
+    assert fast * 10 < slow
+
+if __name__ == "__main__":
+    test_programs()
+    test_max_instructions()
+    test_faster_than_pipeline()
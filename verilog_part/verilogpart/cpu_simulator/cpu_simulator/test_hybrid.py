@@ -0,0 +1,93 @@
+import os
+
+from assembler import Assembler
+from cache import Cache
+from predictor import TwoBit
+import functional
+import hybrid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def assemble(name):
+    asm = Assembler()
+    with open(os.path.join(HERE, name)) as f:
+        program = asm.assemble(f.read())
+    return program, asm.symbols
+
+def test_fast_forward_triggers():
+    program, symbols = assemble("fibonacci.asm")
+    cpu, mem, retired, triggered = hybrid.fast_forward(program, pc=symbols["End"])
+    assert triggered and cpu.pc == 10 and retired == 3 + 10 * 5 + 2
+    assert cpu.get_register("$t1") == 89
+
+    cpu, mem, retired, triggered = hybrid.fast_forward(program, count=20)
+    assert triggered and retired == 20
+
+    cpu, mem, retired, triggered = hybrid.fast_forward(program, pc=99) # Never reached
+    assert not triggered and cpu.pc == 10
+
+def test_detail_window_and_switch_back():
+    program, symbols = assemble("fibonacci.asm")
+    expected, expected_mem, _ = functional.run(program)
+
+    # Skip the first iterations, time 12 cycles of the loop, then finish functionally
+    result = hybrid.run(program, label="Loop", symbols=symbols, count=None, cycles=12,
+                        warmup=6, switch_back=True)
+    assert result["fast_forward"] == 3 and result["triggered"]
+    assert result["cycles"] == 12 and result["counters"]["cycles"] == 12
+    assert not result["halted"]
+    assert result["cpu"].registers == expected.registers
+    assert result["memory"].load(500) == 89
+
+def test_warmed_structures():
+    program, symbols = assemble("fibonacci.asm")
+    predictor = TwoBit()
+    icache = Cache(size=16, assoc=1, line_size=4)
+    result = hybrid.run(program, count=13, cycles=10, warmup=12, predictor=predictor, icache=icache)
+    # Everything was warmed on the earlier iterations: no misses in the window
+    assert result["predictor"]["mispredicts"] == 0
+    assert result["icache"]["misses"] == 0
+    assert result["counters"]["cpi"] < 1.2
+
+def test_drain_with_jal_in_flight():
+    # Windows ending at every point of the call and return: a JAL still in
+    # flight when the pipeline drains must link the same $ra, or the program
+    # takes extra instructions to finish
+    program, _ = assemble("procedure_demo.asm")
+    expected, _, retired = functional.run(program)
+    for dispatch in (False, True):
+        for cycles in range(1, 10):
+            result = hybrid.run(program, count=1, cycles=cycles, switch_back=True, dispatch=dispatch)
+            assert not result["halted"]
+            total = result["fast_forward"] + result["pipe"].counters.retired + result["tail"]
+            assert total == retired, (dispatch, cycles)
+            assert result["cpu"].registers == expected.registers
+
+def test_switch_back_budget():
+    # Warmup retirements count against max_instructions too
+    program = Assembler().assemble("""
+    Loop:
+    ADDI $t0, $t0, 1
+    J Loop
+    """)
+    expected, _, _ = functional.run(program, max_instructions=1001)
+    for warmup in (0, 7):
+        result = hybrid.run(program, count=5, cycles=9, warmup=warmup, switch_back=True,
+                            max_instructions=1001)
+        assert result["cpu"].get_register("$t0") == expected.get_register("$t0") == 501
+        assert result["cpu"].pc == expected.pc
+
+def test_halts_in_detail():
+    program, _ = assemble("fibonacci.asm")
+    result = hybrid.run(program, count=40, cycles=1000)
+    assert result["halted"] and result["cycles"] < 1000
+    assert result["cpu"].get_register("$t1") == 89
+
+if __name__ == "__main__":
+    test_fast_forward_triggers()
+    test_detail_window_and_switch_back()
+    test_warmed_structures()
+    test_drain_with_jal_in_flight()
+    test_switch_back_budget()
+    test_halts_in_detail()
+    print("Hybrid tests passed!")
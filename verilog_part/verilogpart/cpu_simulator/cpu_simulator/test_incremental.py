@@ -0,0 +1,134 @@
+from assembler import Assembler, IncrementalAssembler, apply_patch
+from cpu import CPU, REG_INDEX
+from memory import Memory
+from pipeline import Pipeline
+
+SOURCE = """
+    ADDI $t0, $zero, 3
+    ADDI $t1, $zero, 0
+Loop:
+    ADD  $t1, $t1, $t0
+    ADDI $t0, $t0, -1
+    BNE  $t0, $zero, Loop
+    SW   $t1, 0($zero)
+End:
+    J End
+"""
+
+CALL_SOURCE = """
+    J Main
+F:
+    ADDI $t0, $zero, 5
+    JR $ra
+Main:
+    JAL F
+    ADDI $t1, $t1, 7
+End:
+    J End
+"""
+
+def full(source):
+    return [instr.to_binary() for instr in Assembler().assemble(source)]
+
+def words(program):
+    return [instr.to_binary() for instr in program]
+
+def run(program, cycles=60, mem=None):
+    cpu = CPU()
+    pipe = Pipeline(cpu, mem or Memory())
+    for _ in range(cycles):
+        pipe.fetch(program)
+        pipe.step()
+    return cpu
+
+def test_edit_middle_line():
+    print("Testing incremental edit of one line...")
+    asm = IncrementalAssembler()
+    old = list(asm.assemble(SOURCE))
+    edited = SOURCE.replace("ADDI $t0, $t0, -1", "ADDI $t0, $t0, -2")
+    patch = asm.update(edited)
+    print(f"Patch: {[(a, b, [str(i) for i in new]) for a, b, new in patch]}")
+    assert len(patch) == 1 and patch[0][:2] == (3, 4)
+    assert words(asm.program) == full(edited)
+    # Untouched instructions are reused as-is
+    assert asm.program[0] is old[0] and asm.program[6] is old[6]
+    assert words(apply_patch(old, patch)) == words(asm.program)
+    print("PASS")
+
+def test_insert_moves_labels():
+    print("Testing insertion before labels...")
+    asm = IncrementalAssembler()
+    old = list(asm.assemble(SOURCE))
+    edited = SOURCE.replace("Loop:", "    ADDI $t2, $zero, 1\nLoop:")
+    patch = asm.update(edited)
+    assert words(asm.program) == full(edited)
+    ref = Assembler()
+    ref.assemble(edited)
+    assert asm.symbols == ref.symbols and asm.line_map == ref.line_map
+    # BNE Loop and J End follow their labels
+    assert asm.program[5].imm == 3 and asm.program[7].address == 7
+    assert asm.program[0] is old[0]
+    assert words(apply_patch(old, patch)) == words(asm.program)
+    print("PASS")
+
+def test_no_change_and_error():
+    print("Testing unchanged source and parse errors...")
+    asm = IncrementalAssembler()
+    program = asm.assemble(SOURCE)
+    assert asm.update(SOURCE) == []
+    assert asm.program == program
+    try:
+        asm.update(SOURCE.replace("SW", "XYZ"))
+        assert False, "expected a parse error"
+    except ValueError as e:
+        print(f"Error: {e}")
+    # A failed update leaves the previous result in place
+    assert asm.program == program
+    assert words(asm.program) == full(SOURCE)
+    print("PASS")
+
+def test_jal_after_edit():
+    print("Testing JAL links in an edited program...")
+    asm = IncrementalAssembler()
+    run(asm.assemble(CALL_SOURCE))
+    edited = CALL_SOURCE.replace("Main:", "Main:\n    ADDI $t2, $t2, 1")
+    asm.update(edited)
+    cpu = run(asm.program)
+    ref = run(Assembler().assemble(edited))
+    print(f"$ra={cpu.regs[REG_INDEX['$ra']]}, $t1={cpu.regs[REG_INDEX['$t1']]}")
+    # The JAL now sits one address later and links past its new address
+    assert cpu.regs[REG_INDEX["$ra"]] == 5 and cpu.regs[REG_INDEX["$t1"]] == 7
+    assert cpu.regs == ref.regs
+    print("PASS")
+
+def test_edits_match_full_assembly():
+    print("Testing edited programs against full reassembly on the pipeline...")
+    # The loop of SOURCE, then a call whose JAL and return path move
+    source = SOURCE.replace("End:\n    J End", "    JAL F\n    SW $t0, 1($zero)") + CALL_SOURCE
+    edits = [
+        source.replace("Loop:", "    ADDI $t3, $zero, 2\nLoop:"),   # insert
+        source.replace("    ADDI $t1, $zero, 0\n", ""),            # delete
+        source.replace("ADDI $t0, $zero, 5", "ADDI $t0, $zero, 6"), # change in place
+        source,                                                    # back again
+    ]
+    asm = IncrementalAssembler()
+    run(asm.assemble(source), 200)
+    for edited in edits:
+        asm.update(edited)
+        ref = Assembler().assemble(edited)
+        assert words(asm.program) == words(ref)
+        mem, expected_mem = Memory(), Memory()
+        cpu = run(asm.program, 200, mem)
+        expected = run(ref, 200, expected_mem)
+        assert cpu.regs == expected.regs and cpu.pc == expected.pc
+        assert mem.data == expected_mem.data and mem.data[1] in (5, 6)
+    # Only the current buffer is cached
+    assert set(asm._lines) == set(source.splitlines())
+    print("PASS")
+
+if __name__ == "__main__":
+    test_edit_middle_line()
+    test_insert_moves_labels()
+    test_no_change_and_error()
+    test_jal_after_edit()
+    test_edits_match_full_assembly()
@@ -0,0 +1,72 @@
+import os
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from assembler import Assembler
+from cpu import CPU
+from memory import Memory
+import functional
+from lockstep import LockstepBatch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PROGRAMS = ["sum_loop.asm", "fibonacci.asm", "procedure_demo.asm", "array_sum.asm"]
+
+def assemble(name):
+    with open(os.path.join(HERE, name)) as f:
+        return Assembler().assemble(f.read())
+
+def test_matches_functional():
+    for name in PROGRAMS:
+        batch = LockstepBatch(assemble(name), lanes=4)
+        batch.run(max_steps=200)
+        cpu, mem, retired = functional.run(assemble(name), max_instructions=200, memory=Memory())
+        for lane in range(4):
+            assert batch.regs[lane].tolist() == cpu.regs, name
+            assert batch.mem[lane].tolist() == mem.data, name
+            assert batch.pc[lane] == cpu.pc, name
+            assert batch.retired[lane] == retired, name
+
+def test_divergent_lanes():
+    # Loop count differs per lane: lanes leave the loop at different steps
+    prog = Assembler().assemble("""
+    ADD  $t1, $zero, $zero
+    Loop:
+    ADD  $t1, $t1, $t0
+    ADDI $t0, $t0, -1
+    BNE  $t0, $zero, Loop
+    SW   $t1, 10
+    End:
+    J End
+    """)
+    counts = [1, 5, 9, 300]
+    batch = LockstepBatch(prog, lanes=len(counts))
+    batch.set_register("$t0", counts)
+    batch.run()
+    assert not batch.active.any()
+
+    for lane, n in enumerate(counts):
+        cpu = CPU()
+        cpu.set_register("$t0", n)
+        cpu, mem, retired = functional.run(prog, cpu=cpu, memory=Memory())
+        assert batch.get_register("$t1")[lane] == cpu.get_register("$t1")
+        assert batch.mem[lane, 10] == mem.load(10) == (n * (n + 1) // 2) & 0xFFFF
+        assert batch.retired[lane] == retired
+
+def test_many_lanes():
+    prog = assemble("fibonacci.asm")
+    batch = LockstepBatch(prog, lanes=10000)
+    batch.set_register("$t1", np.arange(10000))
+    start = time.perf_counter()
+    batch.run()
+    print(f"10000 lanes: {time.perf_counter() - start:.3f}s")
+    assert batch.get_register("$t1")[1] == 89
+    assert not batch.active.any()
+
+if __name__ == "__main__":
+    test_matches_functional()
+    test_divergent_lanes()
+    test_many_lanes()
@@ -0,0 +1,46 @@
+from memory import Memory, PagedMemory
+
+def test_flat_memory_bounds():
+    mem = Memory()
+    mem.store(300, 7) # Out of range, ignored
+    assert mem.load(300) == 0
+    assert mem.load(-1) == 0
+    mem.store(10, 0x1FFFF)
+    assert mem.load(10) == 0xFFFF
+
+def test_paged_memory():
+    mem = PagedMemory()
+    assert len(mem) == 65536
+    assert mem.mapped_pages() == []
+    assert mem.load(0xBEEF) == 0
+    assert mem.mapped_pages() == [] # Reads do not allocate
+
+    mem.store(0xFFFF, 0x12345)
+    mem.store(500, 89)
+    mem.store(-1 & 0xFFFF, 3)
+    assert mem.load(0xFFFF) == 3
+    assert mem.load(-1) == 3 # Addresses wrap to 16 bits
+    assert mem.load(500) == 89
+    assert mem.mapped_pages() == [1, 255]
+    assert mem.dirty_pages() == [1, 255]
+
+def test_dirty_tracking():
+    mem = PagedMemory(page_bits=4)
+    mem.store(0x21, 5)
+    mem.clear_dirty()
+    assert mem.dirty_pages() == []
+
+    mem.store(0x22, 6)
+    mem.store(0x100, 1)
+    assert mem.dirty_pages() == [0x2, 0x10]
+
+    saved = mem.read_page(0x2)
+    mem.store(0x21, 99)
+    mem.write_page(0x2, saved)
+    assert mem.load(0x21) == 5
+    assert mem.page_base(0x2) == 0x20
+
+if __name__ == "__main__":
+    test_flat_memory_bounds()
+    test_paged_memory()
+    test_dirty_tracking()
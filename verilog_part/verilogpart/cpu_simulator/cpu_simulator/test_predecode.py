@@ -0,0 +1,55 @@
+import os
+
+from assembler import Assembler
+from cpu import CPU, REG_INDEX
+from memory import Memory
+from pipeline import Pipeline
+from predecode import predecode, OP_ADD, OP_BNE, OP_LOAD
+from tracing import Tracer, RingBufferSink, ALL, format_event
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PROGRAMS = ["sum_loop.asm", "fibonacci.asm", "procedure_demo.asm", "array_sum.asm"]
+
+def run_pipeline(program, dispatch, cycles=200):
+    cpu = CPU()
+    mem = Memory()
+    pipe = Pipeline(cpu, mem, dispatch=dispatch)
+    sink = RingBufferSink(capacity=None)
+    pipe.tracer = Tracer(sink, ALL)
+    for _ in range(cycles):
+        pipe.fetch(program)
+        pipe.step()
+    return cpu, mem, [format_event(event) for event in sink.events()]
+
+def test_predecode_records():
+    prog = Assembler().assemble("""
+    ADD $t2, $t0, $t1
+    LW $t3, 4($sp)
+    BNE $t2, $t0, 0
+    """)
+    recs = predecode(prog)
+    assert [r.op for r in recs] == [OP_ADD, OP_LOAD, OP_BNE]
+    assert recs[0].rd == REG_INDEX["$t2"] and recs[0].rs2 == REG_INDEX["$t1"]
+    assert recs[1].rs1 == REG_INDEX["$sp"] and recs[1].imm == 4
+    assert recs[2].wb == REG_INDEX["$t0"] # BNE writes its rd field back, as in the reference path
+    assert prog[0].decoded is recs[0]
+
+def test_dispatch_matches_reference():
+    for name in PROGRAMS:
+        with open(os.path.join(HERE, name)) as f:
+            source = f.read()
+        ref_cpu, ref_mem, ref_out = run_pipeline(Assembler().assemble(source), dispatch=False)
+        prog = Assembler().assemble(source)
+        predecode(prog)
+        cpu, mem, out = run_pipeline(prog, dispatch=True)
+
+        print(f"{name}: {cpu.registers}")
+        assert cpu.registers == ref_cpu.registers, name
+        assert cpu.pc == ref_cpu.pc, name
+        assert mem.data == ref_mem.data, name
+        assert out == ref_out, name
+
+if __name__ == "__main__":
+    test_predecode_records()
+    test_dispatch_matches_reference()
@@ -0,0 +1,82 @@
+import os
+
+from assembler import Assembler
+from cpu import CPU
+from memory import PagedMemory
+from pipeline import Pipeline
+from predictor import make_predictor, PREDICTORS, TwoBit
+from timetravel import TimeTravel
+import functional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load(name):
+    with open(os.path.join(HERE, name)) as f:
+        return Assembler().assemble(f.read())
+
+def run(name, predictor=None, dispatch=False, max_cycles=500):
+    # Run until "End: J End" retires; returns the pipeline and the cycle count
+    program = load(name)
+    pipe = Pipeline(CPU(), PagedMemory(), dispatch=dispatch)
+    pipe.predictor = predictor
+    for cycle in range(1, max_cycles + 1):
+        pipe.fetch(program)
+        pipe.step()
+        if pipe.WB is program[-1]:
+            return pipe, cycle
+    return pipe, None
+
+def test_same_results_every_predictor():
+    # procedure_demo: JAL links the same $ra with and without prediction
+    for name in ("fibonacci.asm", "sum_loop.asm", "procedure_demo.asm"):
+        baseline, _ = run(name)
+        for key in PREDICTORS:
+            for dispatch in (False, True):
+                pipe, cycles = run(name, make_predictor(key), dispatch)
+                assert cycles is not None
+                assert pipe.cpu.registers == baseline.cpu.registers, (name, key)
+                assert pipe.memory.load(500) == baseline.memory.load(500)
+
+def test_loop_flushes_cut():
+    _, base_cycles = run("fibonacci.asm")
+    pipe, cycles = run("fibonacci.asm", TwoBit())
+    stats = pipe.predictor.stats()
+    print(f"fibonacci: {base_cycles} cycles without prediction, {cycles} with 2-bit counters", stats)
+    assert cycles < base_cycles
+    assert pipe.counters.branch_flushes == 2 # First iteration and loop exit
+    assert stats["mispredicts"] == 2 and stats["accuracy"] > 0.8
+    assert stats["predictions"] == stats["correct"] + stats["mispredicts"]
+
+def test_return_stack_procedure():
+    # JAL links its own address + 1 on the predicted path too, so the call returns
+    program = load("procedure_demo.asm")
+    expected, memory, _ = functional.run(program, 1000)
+    pipe, cycles = run("procedure_demo.asm", make_predictor("ras"))
+    assert cycles is not None
+    assert pipe.cpu.get_register("$t0") == 35 and pipe.memory.load(100) == 35
+    assert pipe.cpu.get_register("$ra") == expected.get_register("$ra")
+
+    btb, _ = run("procedure_demo.asm", make_predictor("btb"))
+    assert pipe.predictor.mispredicts < btb.predictor.mispredicts # RET predicted by the stack
+
+def test_snapshot_and_step_back_with_predictor():
+    program = load("fibonacci.asm")
+    pipe = Pipeline(CPU(), PagedMemory())
+    pipe.predictor = TwoBit()
+    tt = TimeTravel(pipe, program, checkpoint_interval=8)
+    for _ in range(40):
+        pipe.fetch(program)
+        pipe.step()
+    expected = (list(pipe.cpu.regs), pipe.cpu.pc, pipe.predictor.stats(), str(pipe.EX))
+    tt.step_back(25)
+    for _ in range(25):
+        pipe.fetch(program)
+        pipe.step()
+    assert (list(pipe.cpu.regs), pipe.cpu.pc, pipe.predictor.stats(), str(pipe.EX)) == expected
+
+if __name__ == "__main__":
+    test_same_results_every_predictor()
+    test_loop_flushes_cut()
+    test_return_stack_procedure()
+    test_snapshot_and_step_back_with_predictor()
+    print("Predictor tests passed!")
@@ -0,0 +1,85 @@
+import io
+import os
+
+from assembler import Assembler
+from cache import Cache
+from cpu import CPU
+from memory import PagedMemory
+from pipeline import Pipeline
+from profiler import Profiler
+from tracefile import TraceReader, TraceRecorder
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def profile(name, cycles, dispatch=False, dcache=None, trace=None):
+    asm = Assembler()
+    with open(os.path.join(HERE, name)) as f:
+        program = asm.assemble(f.read())
+    pipe = Pipeline(CPU(), PagedMemory(), dispatch=dispatch)
+    pipe.dcache = dcache
+    if trace is not None:
+        pipe.add_recorder(trace)
+    prof = pipe.add_recorder(Profiler(program, asm.symbols, asm.line_map))
+    for _ in range(cycles):
+        pipe.fetch(program)
+        pipe.step()
+    return prof, pipe
+
+def test_symbols_and_line_map():
+    asm = Assembler()
+    with open(os.path.join(HERE, "fibonacci.asm")) as f:
+        asm.assemble(f.read())
+    assert asm.symbols == {"Loop": 3, "End": 10}
+    assert asm.line_map[0] == 4 and asm.line_map[3] == 9 and asm.line_map[10] == 20
+
+def test_hot_loop():
+    prof, pipe = profile("fibonacci.asm", 60)
+    print(prof.report())
+    assert sum(prof.cycles) + prof.idle == 60
+    labels = prof.totals(by="label")
+    assert max(labels, key=lambda label: labels[label][0]) == "Loop"
+    assert labels["Loop"][2] == 9 # Taken BNE flushes
+    assert prof.report().splitlines()[1].split()[6] == "Loop"
+
+def test_stalls_attributed_to_consumer():
+    prof, pipe = profile("array_sum.asm", 100, dispatch=True)
+    add_pc = 10 # ADD $s2, $s2, $t3 right after the load
+    assert prof.stalls[add_pc] == pipe.counters.load_use_stalls > 0
+    assert prof.totals(by="line")[prof.line_of(add_pc)][1] == prof.stalls[add_pc]
+
+def test_cache_stalls_kept_apart():
+    prof, pipe = profile("array_sum.asm", 300, dcache=Cache(size=16, assoc=1, miss_latency=10))
+    print(prof.report())
+    assert sum(prof.cache_stalls) == pipe.counters.cache_stalls > 0
+    assert sum(prof.stalls) == pipe.counters.load_use_stalls
+    assert sum(prof.cycles) + prof.idle == 300
+
+def test_alongside_trace_recorder(tmp_path):
+    path = str(tmp_path / "fib.trace")
+    with TraceRecorder(path) as trace:
+        prof, pipe = profile("fibonacci.asm", 60, trace=trace)
+    alone, _ = profile("fibonacci.asm", 60)
+    assert pipe.recorder.recorders == [trace, prof]
+    assert prof.cycles == alone.cycles and prof.flushes == alone.flushes
+    with TraceReader(path) as reader:
+        assert len(reader) == 60
+
+def test_folded_stacks():
+    prof, _ = profile("procedure_demo.asm", 30)
+    out = io.StringIO()
+    prof.write_folded(out)
+    stacks = dict(line.rsplit(" ", 1) for line in out.getvalue().splitlines())
+    print(out.getvalue())
+    assert "_start;SumFunc" in stacks
+    assert sum(int(count) for count in stacks.values()) == sum(prof.cycles)
+
+if __name__ == "__main__":
+    test_symbols_and_line_map()
+    test_hot_loop()
+    test_stalls_attributed_to_consumer()
+    test_cache_stalls_kept_apart()
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as d:
+        test_alongside_trace_recorder(pathlib.Path(d))
+    test_folded_stacks()
+    print("Profiler tests passed!")
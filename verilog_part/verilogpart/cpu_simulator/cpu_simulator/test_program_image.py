@@ -0,0 +1,158 @@
+import glob
+import os
+import tempfile
+import time
+
+from assembler import Assembler
+from cpu import CPU
+from memory import PagedMemory
+from instruction import RType, IType, JType
+from program_image import (parse_image, read_image, decode, load_program, disassemble,
+                           encode_program, rtl_words, word_targets,
+                           write_hex, write_mem, write_bin, write_ihex)
+from batch_runner import simulate_file
+import functional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MEM_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "program.mem")
+
+def test_round_trip():
+    print("Testing encode -> decode round trip...")
+    for path in sorted(glob.glob(os.path.join(HERE, "*.asm"))):
+        with open(path) as f:
+            program = Assembler().assemble(f.read())
+        words = [int(instr.to_binary(), 2) for instr in program]
+        decoded = decode(words)
+        assert [instr.to_binary() for instr in decoded] == [instr.to_binary() for instr in program]
+        print(f"{path}: {len(words)} words")
+    print("PASS")
+
+def test_image_syntax():
+    print("Testing $readmemh syntax...")
+    text = """
+    // header
+    2001_0001 00201020  // two words
+    /* block
+       comment */ 08000000
+    @6 ffffffff
+    """
+    words = parse_image(text)
+    assert list(words) == [0x20010001, 0x00201020, 0x08000000, 0, 0, 0, 0xFFFFFFFF]
+    listing = disassemble(words)
+    print("\n".join(listing))
+    assert listing[0] == "0000: 20010001  ADDI $t0, $zero, 1"
+    assert listing[3] == "0003: 00000000  AND $zero, $zero, $zero"
+    try:
+        parse_image("// x\nzz\n")
+        assert False, "expected a parse error"
+    except ValueError as e:
+        assert str(e) == "Line 2: Bad image token: zz"
+    print("PASS")
+
+def test_run_program_mem():
+    print("Testing program.mem on the functional model...")
+    program = load_program(MEM_FILE)
+    cpu, memory, retired = functional.run(program, 8, CPU(), PagedMemory())
+    regs = cpu.registers
+    print(f"Registers: {regs}")
+    assert retired == 8
+    assert (regs["$t0"], regs["$t1"], regs["$t2"], regs["$t3"]) == (2, 3, 3, 6)
+    assert regs["$v0"] == (6 - 12) & 0xFFFF
+    print("PASS")
+
+def test_rtl_image_round_trip():
+    print("Testing programs run from their RTL images...")
+    directory = tempfile.mkdtemp()
+    # Programs within the RTL's eight registers; sum_loop never halts
+    for name in ("fibonacci.asm", "procedure_demo.asm", "sum_loop.asm"):
+        with open(os.path.join(HERE, name)) as f:
+            program = Assembler().assemble(f.read())
+        words = encode_program(program)
+        assert list(word_targets(rtl_words(words))) == list(words)
+
+        path = os.path.join(directory, name.replace(".asm", ".mem"))
+        write_mem(path, rtl_words(words))
+        expected, expected_mem, retired = functional.run(program, 1000)
+        cpu, memory, image_retired = functional.run(load_program(path), 1000)
+        assert image_retired == retired, name
+        assert cpu.regs == expected.regs and cpu.pc == expected.pc, name
+        assert memory.snapshot() == expected_mem.snapshot(), name
+
+        # The batch runner simulates images the same way
+        image = simulate_file(path, 2000, 10)
+        source = simulate_file(os.path.join(HERE, name), 2000, 10)
+        assert image["status"] == source["status"], name
+        assert image["registers"] == source["registers"] and image["memory"] == source["memory"], name
+    print("PASS")
+
+def test_bulk_speed():
+    print("Testing a 64K-word image...")
+    words = [0x20010001, 0x00201020, 0x8C220004, 0xAC220008, 0x1422FFF0, 0x0C000010, 0x00E00008]
+    text = "\n".join(f"{words[i % len(words)]:08x}" for i in range(65536))
+    path = os.path.join(tempfile.mkdtemp(), "big.hex")
+    with open(path, "w") as f:
+        f.write(text)
+    start = time.perf_counter()
+    program = load_program(path)
+    elapsed = time.perf_counter() - start
+    print(f"Loaded and decoded {len(program)} words in {elapsed:.3f}s")
+    assert len(program) == 65536 and elapsed < 1.0
+    # BNE at 4 with a byte offset of -16 from pc+2: word target 4 + 1 - 8
+    assert program[4].imm == (4 + 1 - 8) & 0xFFFF and program[2].imm == 4
+    assert int(program[3].to_binary(), 2) == 0xAC220008
+    assert list(read_image(path))[:2] == words[:2]
+    print("PASS")
+
+def test_encode():
+    print("Testing Instruction.encode()...")
+    instr = IType("ADDI", rd="$t0", rs1="$t0", imm=-1)
+    assert instr.encode() == 0x2021FFFF
+    assert instr.to_binary() == f"{0x2021FFFF:032b}"
+    assert instr._word == 0x2021FFFF # Cached
+    assert RType("JR", rd=None, rs1="$ra", rs2=None).encode() == 0x00E00008
+    assert JType("JAL", address=5).encode() == 0x0C000005
+
+    program = [RType("ADD", "$t0", "$t1", "$t2"), IType("LW", "$t1", "$sp", 4), JType("J", 0)] * 100000
+    start = time.perf_counter()
+    words = encode_program(program)
+    elapsed = time.perf_counter() - start
+    print(f"Encoded {len(words)} instructions in {elapsed:.3f}s")
+    assert list(words[:3]) == [instr.encode() for instr in program[:3]]
+    assert elapsed < 1.0
+    print("PASS")
+
+def test_writers():
+    print("Testing hex/mem/bin/Intel HEX writers...")
+    directory = tempfile.mkdtemp()
+    words = [0x20010001, 0x00201020, 0x08000000]
+    for name, writer in (("p.hex", write_hex), ("p.mem", write_mem), ("p.bin", write_bin)):
+        path = os.path.join(directory, name)
+        writer(path, words, depth=8)
+        assert list(read_image(path)) == words + [0] * 5, name
+    with open(os.path.join(directory, "p.mem")) as f:
+        assert f.readline() == "20010001 // ADDI $t0, $zero, 1\n"
+
+    path = os.path.join(directory, "p.ihx")
+    write_ihex(path, words)
+    with open(path) as f:
+        records = f.read().splitlines()
+    print("\n".join(records))
+    assert records == [":0C0000000100012020102000000000087A", ":00000001FF"]
+    for record in records:
+        assert sum(bytes.fromhex(record[1:])) & 0xFF == 0
+    # Extended linear address record after 64K bytes
+    write_ihex(path, [0] * 16400)
+    with open(path) as f:
+        records = f.read().splitlines()
+    assert ":020000040001F9" in records
+    print("PASS")
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_image_syntax()
+    test_run_program_mem()
+    test_rtl_image_round_trip()
+    test_bulk_speed()
+    test_encode()
+    test_writers()
@@ -0,0 +1,84 @@
+import os
+import time
+
+import pytest
+
+from program_image import read_image
+from rtl_model import RTLModel, control, NO_CONTROL
+from stream_assembler import StreamAssembler
+
+VERILOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+VCD_FILE = os.path.join(VERILOG_DIR, "cpu_wave.vcd")
+MEM_FILE = os.path.join(VERILOG_DIR, "program.mem")
+
+def test_matches_cpu_wave():
+    pytest.importorskip("numpy") # Needed by vcd
+    import vcd
+    print("Testing the model against cpu_wave.vcd...")
+    model = RTLModel(read_image(MEM_FILE))
+    with open(VCD_FILE) as f:
+        names = [name for name in vcd.read_header(f) if name.count(".") == 2 and name.startswith("tb_cpu.uut.")]
+    checked = 0
+    signals = set()
+    for edge, sample in enumerate(vcd.clock_samples(VCD_FILE, names + ["tb_cpu.reset"])):
+        expected = model.signals()
+        for name in names:
+            short = name.split(".")[-1]
+            if short in expected and sample[name] is not None:
+                assert sample[name] == expected[short], f"edge {edge}: {short} = {sample[name]:#x}, model {expected[short]:#x}"
+                signals.add(short)
+                checked += 1
+        if sample["tb_cpu.reset"]:
+            model.reset()
+        else:
+            model.step()
+    print(f"{edge + 1} edges, {len(signals)} signals, {checked} values match")
+    assert edge >= 100 and len(signals) >= 80
+    print("PASS")
+
+def test_control_and_hazards():
+    print("Testing forwarding, load-use stall, branch and JAL...")
+    source = """
+    ADDI $t0, $zero, 5
+    SW   $t0, 3($zero)
+    LW   $t1, 3($zero)
+    ADD  $t2, $t1, $t1     # load-use stall, then MEM/WB forwarding
+    BEQ  $t2, $t2, 2       # byte offset from pc+2: skips one instruction
+    ADDI $t3, $zero, 1     # squashed
+    ADDI $t3, $zero, 2
+    JAL  20                # byte address of word 10
+    ADDI $v0, $zero, 9     # flushed in IF
+    ADDI $v0, $zero, 9
+    End: J 20
+    """
+    asm = StreamAssembler()
+    model = RTLModel(asm.assemble(source.splitlines()))
+    model.commits = []
+    stalls = 0
+    for _ in range(30):
+        stalls += model.signals()["stall"]
+        model.step()
+    regs = model.registers()
+    print(f"Registers: {regs}  commits: {model.commits}")
+    assert stalls == 1
+    assert model.dmem[3] == 5
+    assert regs[1:6] == [5, 5, 10, 2, 0]
+    assert regs[6] == 0x0FFF
+    assert regs[7] == 0 # JAL links the link register's old value
+    assert control(0xFC000000) == NO_CONTROL
+    print("PASS")
+
+def test_speed():
+    print("Testing throughput...")
+    model = RTLModel(read_image(MEM_FILE))
+    start = time.perf_counter()
+    model.run(100000)
+    elapsed = time.perf_counter() - start
+    print(f"{100000 / elapsed:,.0f} cycles/s")
+    assert elapsed < 5.0
+    print("PASS")
+
+if __name__ == "__main__":
+    test_matches_cpu_wave()
+    test_control_and_hazards()
+    test_speed()
@@ -0,0 +1,61 @@
+import time
+
+from assembler import Assembler
+from cpu import CPU
+from memory import PagedMemory
+from pipeline import Pipeline
+import hybrid
+import sampling
+
+LOOP = """
+    ADDI $t2, $zero, 15000
+    ADDI $t1, $zero, 63
+Loop:
+    LW   $t3, 0($s0)
+    ADD  $t0, $t0, $t3
+    SW   $t0, 64($s0)
+    ADDI $s0, $s0, 1
+    AND  $s0, $s0, $t1
+    ADDI $t2, $t2, -1
+    BNE  $t2, $zero, Loop
+End:
+    J End
+"""
+
+def full_cpi(program):
+    pipe = Pipeline(CPU(), PagedMemory(), dispatch=True)
+    cycles, halted = hybrid.detail(pipe, program, 10 ** 7)
+    assert halted
+    return cycles, pipe.counters.retired
+
+def test_estimate_brackets_full_run():
+    program = Assembler().assemble(LOOP)
+    start = time.perf_counter()
+    cycles, retired = full_cpi(program)
+    full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = sampling.run(program, period=5000, window=300, warmup=50)
+    sampled = time.perf_counter() - start
+    print(f"full: {cycles} cycles, CPI {cycles / retired:.3f} in {full:.2f}s; "
+          f"sampled: CPI {result['cpi']:.3f} [{result['cpi_low']:.3f}, {result['cpi_high']:.3f}] "
+          f"from {result['windows']} windows in {sampled:.2f}s")
+
+    assert result["windows"] >= 10
+    assert abs(result["instructions"] - retired) <= 2
+    assert abs(result["cpi"] - cycles / retired) < 0.05 * cycles / retired
+    assert result["cycles_low"] <= result["cycles"] <= result["cycles_high"]
+    assert result["detailed_cycles"] < cycles / 5
+
+def test_estimate_statistics():
+    result = sampling.estimate([1.0, 1.2, 1.4], 1000, confidence=0.95)
+    assert abs(result["cpi"] - 1.2) < 1e-9
+    half = result["cpi_high"] - result["cpi"]
+    assert abs(half - 1.959964 * 0.2 / 3 ** 0.5) < 1e-5
+    assert abs(result["cycles"] - 1200) < 1e-6
+    assert "cpi" not in sampling.estimate([], 10)
+
+if __name__ == "__main__":
+    test_estimate_brackets_full_run()
+    test_estimate_statistics()
+    print("Sampling tests passed!")
@@ -0,0 +1,100 @@
+import os
+
+from assembler import Assembler
+from cpu import CPU
+from memory import Memory, PagedMemory
+from pipeline import Pipeline
+import snapshot
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def make(name, memory):
+    with open(os.path.join(HERE, name)) as f:
+        program = Assembler().assemble(f.read())
+    return program, Pipeline(CPU(), memory)
+
+def run(pipe, program, cycles):
+    for _ in range(cycles):
+        pipe.fetch(program)
+        pipe.step()
+
+def state(pipe):
+    mem = pipe.memory
+    memory = mem.snapshot() if isinstance(mem, Memory) else {n: mem.read_page(n) for n in mem.mapped_pages()}
+    return (list(pipe.cpu.regs), pipe.cpu.pc, memory, pipe.cycle,
+            [str(getattr(pipe, stage)) for stage in snapshot.STAGES], pipe.counters.as_dict())
+
+def test_fork_from_snapshot():
+    for memory in (Memory(), PagedMemory()):
+        program, pipe = make("array_sum.asm", memory)
+        run(pipe, program, 12) # Mid-run: latches hold in-flight results
+        snap = pipe.snapshot()
+
+        run(pipe, program, 40)
+        expected = state(pipe)
+
+        # Diverge, then go back and replay the same 40 cycles
+        pipe.cpu.set_register("$t3", 1234)
+        pipe.memory.store(1, 999)
+        run(pipe, program, 7)
+        pipe.restore(snap)
+        assert pipe.cycle == 12
+        run(pipe, program, 40)
+        assert state(pipe) == expected
+
+def test_latch_values_restored():
+    program, pipe = make("array_sum.asm", PagedMemory())
+    run(pipe, program, 3)
+    snap = pipe.snapshot()
+    ex, mem = pipe.EX, pipe.MEM # SW $t0, 0($zero) and ADDI $t0, $zero, 10
+    assert mem.result == 10
+    mem.result = -1
+    ex.result = 5 # Not present when the snapshot was taken
+    pipe.restore(snap)
+    assert pipe.MEM is mem and mem.result == 10
+    assert not hasattr(ex, "result")
+
+def test_pages_shared_between_snapshots():
+    mem = PagedMemory()
+    mem.store(0x0010, 1)
+    mem.store(0x2000, 2)
+    first = mem.snapshot()
+    mem.store(0x2001, 3)
+    second = mem.snapshot()
+    assert second[0x00] is first[0x00] # Unchanged page shared
+    assert second[0x20] is not first[0x20]
+    assert first[0x20][1] == 0 and second[0x20][1] == 3
+
+    # Only pages written since the last snapshot or restore are copied
+    for n in range(0, 256, 2):
+        mem.store(n << 8, n)
+    many = mem.snapshot()
+    mem.store(0x4000, 9)
+    after = mem.snapshot()
+    assert [n for n in after if after[n] is not many.get(n)] == [0x40]
+    mem.restore(first)
+    assert mem.snapshot() == first and mem.load(0x4000) == 0
+    mem.store(0x2001, 4)
+    assert mem.snapshot()[0x20][1] == 4 and first[0x20][1] == 0
+
+def test_save_and_load(tmp_path):
+    program, pipe = make("procedure_demo.asm", PagedMemory())
+    run(pipe, program, 9)
+    path = str(tmp_path / "warm.snap")
+    snapshot.save(pipe.snapshot(), path, program)
+    run(pipe, program, 30)
+    expected = state(pipe)
+
+    program2, fresh = make("procedure_demo.asm", PagedMemory())
+    fresh.restore(snapshot.load(path, program2))
+    run(fresh, program2, 30)
+    assert state(fresh) == expected
+    assert fresh.EX is None or fresh.EX in program2
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_fork_from_snapshot()
+    test_latch_values_restored()
+    test_pages_shared_between_snapshots()
+    with tempfile.TemporaryDirectory() as d:
+        test_save_and_load(pathlib.Path(d))
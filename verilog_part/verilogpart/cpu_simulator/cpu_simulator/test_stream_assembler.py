@@ -0,0 +1,74 @@
+import glob
+import io
+import os
+
+from assembler import Assembler
+from stream_assembler import StreamAssembler, assemble, benchmark
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def reference(source):
+    asm = Assembler()
+    words = [int(instr.to_binary(), 2) for instr in asm.assemble(source)]
+    return words, asm.symbols
+
+def test_matches_assembler():
+    print("Testing StreamAssembler against Assembler...")
+    for path in sorted(glob.glob(os.path.join(HERE, "*.asm"))):
+        with open(path) as f:
+            source = f.read()
+        expected, symbols = reference(source)
+        words, stream_symbols = assemble(path)
+        print(f"{path}: {len(words)} words")
+        assert list(words) == expected
+        assert stream_symbols == symbols
+    print("PASS")
+
+def test_forward_references():
+    print("Testing forward-reference fixups...")
+    source = """
+    J Start            # forward
+    Back: ADDI $t0, $t0, -1
+    Start:
+    BEQ $t0, $zero, Done
+    SUB $t1, $t1, $t0
+    BNE $t0, $zero, Back
+    LW $t2, -4($sp)
+    SW $t2, 12
+    CALL Done
+    RET
+    Done: J Done
+    """
+    asm = StreamAssembler()
+    words = asm.assemble(io.StringIO(source))
+    assert list(words) == reference(source)[0]
+    assert asm.pending == {}
+    print("PASS")
+
+def test_errors():
+    print("Testing streaming errors...")
+    for source, message in (("ADDI $t0, $zero, 1\nJ Nowhere\n", "Line 2: Undefined label: Nowhere"),
+                            ("NOP\n", "Line 1: Unknown opcode: NOP"),
+                            ("A: J A\nA: J A\n", "Line 2: Duplicate label: A"),
+                            ("ADDI $t0, $zero\n", "Line 1:")):
+        try:
+            StreamAssembler().assemble(source.splitlines())
+            assert False, "expected an error"
+        except ValueError as e:
+            print(f"Error: {e}")
+            assert str(e).startswith(message)
+    print("PASS")
+
+def test_benchmark():
+    # Timing comparisons live in the CLI (python stream_assembler.py); this
+    # only checks that the benchmark runs and both assemblers agree on size
+    print("Benchmarking...")
+    stream, full = benchmark(20000, repeat=1)
+    assert stream > 0 and full > 0
+    print("PASS")
+
+if __name__ == "__main__":
+    test_matches_assembler()
+    test_forward_references()
+    test_errors()
+    test_benchmark()
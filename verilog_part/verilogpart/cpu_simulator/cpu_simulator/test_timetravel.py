@@ -0,0 +1,114 @@
+import os
+import time
+
+from assembler import Assembler
+from cpu import CPU
+from memory import Memory, PagedMemory
+from pipeline import Pipeline
+from snapshot import STAGES
+from timetravel import TimeTravel
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def make(name, memory):
+    with open(os.path.join(HERE, name)) as f:
+        program = Assembler().assemble(f.read())
+    return program, Pipeline(CPU(), memory)
+
+def run(pipe, program, cycles):
+    for _ in range(cycles):
+        pipe.fetch(program)
+        pipe.step()
+
+def state(pipe):
+    mem = pipe.memory
+    memory = mem.snapshot() if isinstance(mem, Memory) else {n: mem.read_page(n) for n in mem.mapped_pages()}
+    # Results only mean something once an instruction has been through EX
+    latches = [str(getattr(pipe, s)) for s in STAGES]
+    latches += [getattr(getattr(pipe, s), "result", None) for s in ("MEM", "WB")]
+    return (list(pipe.cpu.regs), pipe.cpu.pc, memory, pipe.cycle, latches, pipe.counters.as_dict())
+
+def history(name, memory, cycles):
+    program, pipe = make(name, memory)
+    states = [state(pipe)]
+    for _ in range(cycles):
+        run(pipe, program, 1)
+        states.append(state(pipe))
+    return states
+
+def test_step_back_matches_history():
+    for memory in (Memory, PagedMemory):
+        expected = history("array_sum.asm", memory(), 300)
+        program, pipe = make("array_sum.asm", memory())
+        tt = TimeTravel(pipe, program, checkpoint_interval=16, journal_limit=50)
+        run(pipe, program, 300)
+        assert state(pipe) == expected[300]
+
+        tt.step_back(1)
+        assert state(pipe) == expected[299]
+        tt.step_back(30) # From the journal
+        assert state(pipe) == expected[269]
+        tt.step_back(200) # Past the journal: checkpoint and replay
+        assert state(pipe) == expected[69]
+        tt.run_back_to(cycle=5)
+        assert state(pipe) == expected[5]
+
+        run(pipe, program, 100) # And forwards again
+        assert state(pipe) == expected[105]
+
+def test_run_back_to_pc():
+    expected = history("fibonacci.asm", PagedMemory(), 200)
+    program, pipe = make("fibonacci.asm", PagedMemory())
+    tt = TimeTravel(pipe, program, checkpoint_interval=10, journal_limit=5)
+    run(pipe, program, 200)
+
+    pc = 4
+    last = max(c for c in range(200) if expected[c][1] == pc)
+    assert tt.run_back_to(pc=pc) == last
+    assert state(pipe) == expected[last]
+    assert tt.run_back_to(pc=99) is None
+    assert state(pipe) == expected[last]
+
+def test_counters_follow_step_back():
+    expected = history("array_sum.asm", PagedMemory(), 300)
+    program, pipe = make("array_sum.asm", PagedMemory())
+    tt = TimeTravel(pipe, program, checkpoint_interval=16, journal_limit=100)
+    run(pipe, program, 300)
+
+    tt.step_back(50) # From the journal
+    c = pipe.counters
+    assert c.as_dict() == expected[250][5]
+    assert c.cycles == 250 and c.retired <= c.cycles
+    assert c.load_use_stalls > 0 and c.branch_flushes > 0
+    tt.step_back(150) # Through a checkpoint
+    assert c.as_dict() == expected[100][5]
+
+    # Stepping back across a reset gives the counts from before it
+    c.reset()
+    run(pipe, program, 40)
+    assert c.cycles == 40
+    tt.step_back(20)
+    assert c.cycles == 20 and c.retired <= 20
+    tt.step_back(30)
+    assert c.as_dict() == expected[90][5]
+
+def test_bounded_memory():
+    program, pipe = make("sum_loop.asm", PagedMemory())
+    tt = TimeTravel(pipe, program, checkpoint_interval=100, journal_limit=1000, max_checkpoints=64)
+    run(pipe, program, 50000)
+    assert len(tt.checkpoints) <= 64
+    assert len(tt.entries) == 1000
+    assert tt.earliest == 0
+
+    start = time.perf_counter()
+    tt.step_back(40000)
+    elapsed = time.perf_counter() - start
+    print(f"Stepped back 40000 cycles in {elapsed * 1000:.1f} ms (interval {tt.interval})")
+    assert pipe.cycle == 10000
+
+if __name__ == "__main__":
+    test_step_back_matches_history()
+    test_run_back_to_pc()
+    test_counters_follow_step_back()
+    test_bounded_memory()
+    print("Time travel tests passed!")
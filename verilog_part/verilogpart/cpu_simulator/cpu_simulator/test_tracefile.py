@@ -0,0 +1,94 @@
+import os
+
+from assembler import Assembler
+from cache import Cache
+from cpu import CPU, REG_INDEX
+from memory import PagedMemory
+from pipeline import Pipeline
+from tracefile import (
+    TraceRecorder, TraceReader, RECORD,
+    FLAG_FLUSH, FLAG_FROZEN, FLAG_LINK, FLAG_MEM_WRITE, FLAG_REG_WRITE, FLAG_STALL,
+)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def record(path, name, cycles, dcache=None, **kwargs):
+    with open(os.path.join(HERE, name)) as f:
+        program = Assembler().assemble(f.read())
+    pipe = Pipeline(CPU(), PagedMemory())
+    pipe.dcache = dcache
+    pcs = []
+    with TraceRecorder(path, **kwargs) as rec:
+        pipe.recorder = rec
+        for _ in range(cycles):
+            pipe.fetch(program)
+            pipe.step()
+            pcs.append(pipe.cpu.pc)
+    return pipe, pcs
+
+def test_round_trip(tmp_path):
+    for compression in (None, "zlib", "lzma"):
+        path = str(tmp_path / f"fib_{compression}.trace")
+        pipe, pcs = record(path, "fibonacci.asm", 200, chunk_records=64, compression=compression)
+        with TraceReader(path) as reader:
+            records = list(reader)
+            assert len(reader) == 200
+            assert len(reader.index) == 4
+        assert [r.cycle for r in records] == list(range(1, 201))
+        assert [r.pc for r in records] == pcs
+
+        stores = [r for r in records if r.flags & FLAG_MEM_WRITE]
+        assert [(r.mem_addr, r.mem_value) for r in stores] == [(500, 89)]
+        assert sum(1 for r in records if r.flags & FLAG_FLUSH) > 9
+
+        # Replaying register writes reproduces the final register file
+        regs = [0] * 32
+        regs[REG_INDEX["$sp"]] = 0xFFF
+        for r in records:
+            if r.flags & FLAG_REG_WRITE and r.reg:
+                regs[r.reg] = r.reg_value
+        assert regs == pipe.cpu.regs
+
+    assert os.path.getsize(str(tmp_path / "fib_zlib.trace")) < os.path.getsize(str(tmp_path / "fib_None.trace"))
+
+def test_seek(tmp_path):
+    path = str(tmp_path / "array.trace")
+    record(path, "array_sum.asm", 1000, chunk_records=100, compression="zlib")
+    with TraceReader(path) as reader:
+        full = list(reader)
+        assert reader.record_at(1) == full[0]
+        assert reader.record_at(537) == full[536]
+        assert list(reader.seek(950)) == full[949:]
+        assert any(r.flags & FLAG_STALL for r in full) # LW -> ADD load-use stall
+
+def test_frozen_cycles(tmp_path):
+    # Cycles frozen on a dcache miss are flagged and write nothing: each
+    # store and register write appears once, however long the miss
+    path = str(tmp_path / "frozen.trace")
+    pipe, _ = record(path, "array_sum.asm", 300, dcache=Cache(size=16, assoc=1, miss_latency=10))
+    with TraceReader(path) as reader:
+        records = list(reader)
+    frozen = [r for r in records if r.flags & FLAG_FROZEN]
+    assert len(frozen) == pipe.counters.cache_stalls > 0
+    assert all(r.flags == FLAG_FROZEN for r in frozen)
+
+    stores = [(r.mem_addr, r.mem_value) for r in records if r.flags & FLAG_MEM_WRITE]
+    assert stores == [(0, 10), (1, 20), (2, 30)]
+    writes = sum(1 for r in records if r.flags & FLAG_REG_WRITE)
+    assert writes == sum(n for instr, n in pipe._retired.items() if instr.decoded.wb is not None)
+
+def test_link_flag(tmp_path):
+    path = str(tmp_path / "proc.trace")
+    record(path, "procedure_demo.asm", 30)
+    with TraceReader(path) as reader:
+        links = [r for r in reader if r.flags & FLAG_LINK]
+    assert links and all(r.link_value == 3 for r in links) # JAL at 2 returns to 3
+    assert RECORD.size == 17
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as d:
+        test_round_trip(pathlib.Path(d))
+        test_seek(pathlib.Path(d))
+        test_frozen_cycles(pathlib.Path(d))
+        test_link_flag(pathlib.Path(d))
@@ -0,0 +1,63 @@
+import io
+import os
+
+from assembler import Assembler
+from cpu import CPU
+from memory import PagedMemory
+from pipeline import Pipeline
+from tracing import Tracer, RingBufferSink, FileSink, NullSink, BRANCH, JUMP, STORE, STAGES, ALL
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def run(tracer, cycles=80, dispatch=False):
+    with open(os.path.join(HERE, "fibonacci.asm")) as f:
+        program = Assembler().assemble(f.read())
+    pipe = Pipeline(CPU(), PagedMemory(), dispatch=dispatch)
+    pipe.tracer = tracer
+    for _ in range(cycles):
+        pipe.fetch(program)
+        pipe.step()
+    return pipe
+
+def test_ring_buffer():
+    for dispatch in (False, True):
+        sink = RingBufferSink(capacity=None)
+        run(Tracer(sink, BRANCH | STORE), dispatch=dispatch)
+        events = sink.events()
+        names = [name for _, _, name, _ in events]
+        assert names.count("BNE") == 9
+        assert names.count("store") == 1
+        cycle, category, name, fields = [e for e in events if e[2] == "store"][0]
+        assert category == STORE and fields == {"address": 500, "value": 89}
+
+def test_capacity_and_categories():
+    sink = RingBufferSink(capacity=5)
+    tracer = Tracer(sink, STAGES)
+    run(tracer, cycles=20)
+    assert len(sink.events()) == 5
+    assert sink.events()[-1][0] == 20 # Cycle number of the last step
+    assert all(category == STAGES for _, category, _, _ in sink.events())
+
+    tracer.disable(STAGES)
+    tracer.enable(JUMP)
+    assert not tracer.enabled(STAGES) and tracer.enabled(JUMP)
+
+def test_file_sink():
+    out = io.StringIO()
+    run(Tracer(FileSink(out), ALL & ~STAGES))
+    text = out.getvalue()
+    assert "branch: BNE target=3" in text
+    assert "store: store address=500 value=89" in text
+    assert "Pipeline State" not in text
+
+def test_tracing_off():
+    pipe = run(None)
+    assert pipe.tracer is None
+    assert pipe.cpu.get_register("$t1") == 89
+    run(Tracer(NullSink()))
+
+if __name__ == "__main__":
+    test_ring_buffer()
+    test_capacity_and_categories()
+    test_file_sink()
+    test_tracing_off()
@@ -0,0 +1,74 @@
+import os
+import time
+
+from assembler import Assembler
+import functional
+import translate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PROGRAMS = ["sum_loop.asm", "fibonacci.asm", "procedure_demo.asm", "array_sum.asm"]
+
+def assemble(name):
+    with open(os.path.join(HERE, name)) as f:
+        return Assembler().assemble(f.read())
+
+def test_blocks():
+    prog = assemble("fibonacci.asm")
+    tr = translate.Translator(prog)
+    assert sorted(tr.leaders) == [0, 3, 8, 10, 11]
+
+    loop = tr.lookup(3)
+    print(loop.source)
+    assert loop.length == 5 # ADD, ADD, ADD, ADDI, BNE
+    assert tr.lookup(3) is loop
+    assert tr.lookup(10).halt
+    assert loop.loop and not tr.lookup(0).loop
+
+def test_matches_functional():
+    for name in PROGRAMS:
+        # Budgets ending inside loops exercise the in-block iteration limit
+        for limit in list(range(0, 120, 7)) + [1000]:
+            ref_cpu, ref_mem, ref_retired = functional.run(assemble(name), max_instructions=limit)
+            cpu, mem, retired = translate.run(assemble(name), max_instructions=limit)
+            assert cpu.registers == ref_cpu.registers, name
+            assert cpu.pc == ref_cpu.pc, name
+            assert retired == ref_retired, name
+            assert mem.mapped_pages() == ref_mem.mapped_pages(), name
+            for n in mem.mapped_pages():
+                assert mem.read_page(n) == ref_mem.read_page(n), name
+
+def best_time(run, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def test_loop_speed():
+    prog = Assembler().assemble("""
+    ADDI $t2, $zero, 20000
+    Loop:
+    ADD  $t3, $t0, $t1
+    ADD  $t0, $zero, $t1
+    ADD  $t1, $zero, $t3
+    ADDI $t2, $t2, -1
+    BNE  $t2, $zero, Loop
+    """)
+    ref_cpu, _, ref_retired = functional.run(prog)
+    cpu, _, retired = translate.run(prog)
+    assert cpu.registers == ref_cpu.registers
+    assert retired == ref_retired
+
+    interp = best_time(lambda: functional.run(prog))
+    compiled = best_time(lambda: translate.run(prog))
+    print(f"interpreter {interp:.4f}s, translated {compiled:.4f}s ({interp / compiled:.1f}x)")
+    # Typically ~5x: the loop block iterates without leaving its function
+    assert compiled * 2 < interp
+
+if __name__ == "__main__":
+    test_blocks()
+    test_matches_functional()
+    test_loop_speed()
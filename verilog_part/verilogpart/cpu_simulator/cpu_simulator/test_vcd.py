@@ -0,0 +1,115 @@
+import os
+import random
+import shutil
+import tempfile
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import vcd
+from vcd import VCDFile
+
+VCD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "cpu_wave.vcd")
+
+def copy_wave():
+    # Work on a copy so no index is written next to the repository's file
+    path = os.path.join(tempfile.mkdtemp(), "cpu_wave.vcd")
+    shutil.copy(VCD_FILE, path)
+    return path
+
+def synthetic(path, steps):
+    # Clock, a counter and a wide bus changing every step
+    with open(path, "w") as f:
+        f.write("$timescale 1ps $end\n$scope module top $end\n$var wire 1 ! clk $end\n")
+        f.write("$var wire 8 \" count [7:0] $end\n$var wire 70 # bus [69:0] $end\n$upscope $end\n$enddefinitions $end\n")
+        f.write("#0\n0!\nbx \"\nb0 #\n")
+        for step in range(1, steps):
+            f.write(f"#{step * 10}\n{step % 2}!\n")
+            if step % 2:
+                f.write(f"b{step // 2 % 256:b} \"\n")
+            f.write(f"b{1 << 69 | step:b} #\n")
+
+def test_resolve():
+    print("Testing signal name resolution...")
+    wave = VCDFile(VCD_FILE, index=False)
+    assert wave.resolve("pc_current") == "tb_cpu.uut.pc_current"
+    assert wave.resolve("uut.pc_current") == "tb_cpu.uut.pc_current"
+    assert wave.width("pc_current") == 16
+    with pytest.raises(KeyError):
+        wave.resolve("no_such_signal")
+    print("PASS")
+
+def test_value_at():
+    print("Testing indexed random access...")
+    path = copy_wave()
+    indexed = VCDFile(path, interval=4096)
+    plain = VCDFile(path, index=False, interval=1 << 40) # One checkpoint: a full scan
+    assert len(indexed.index()["checkpoints"]) > 10
+    assert len(plain.index()["checkpoints"]) == 1
+    assert os.path.exists(indexed.index_path)
+    rng = random.Random(1)
+    for _ in range(50):
+        time = rng.randrange(indexed.end_time + 10000)
+        for name in ("pc_current", "uut.instruction", "write_back_data", "tb_cpu.clk"):
+            assert indexed.value_at(name, time) == plain.value_at(name, time), (name, time)
+
+    # A second reader loads the sidecar instead of scanning
+    reloaded = VCDFile(path, interval=4096)
+    assert reloaded.index() == indexed.index()
+    print("PASS")
+
+def test_arrays_and_sample():
+    print("Testing signal arrays against clock_samples...")
+    path = copy_wave()
+    wave = VCDFile(path)
+    names = ["tb_cpu.uut.pc_current", "tb_cpu.uut.mem_wb_dest_reg", "tb_cpu.uut.write_back_data"]
+    expected = list(vcd.clock_samples(path, names))
+    edges = wave.rising_edges()
+    assert len(edges) == len(expected)
+    samples = wave.sample(names, edges)
+    for name in names:
+        signal = samples[name]
+        for i, row in enumerate(expected):
+            assert (int(signal.values[i]) if signal.valid[i] else None) == row[name], (name, i)
+
+    # A window gives the same values as the full arrays
+    full = wave.arrays(["pc_current"])["pc_current"]
+    start, end = int(edges[20]), int(edges[60])
+    window = wave.arrays(["pc_current"], start, end)["pc_current"]
+    assert window.times[0] == start and window.times[-1] <= end
+    inside = (full.times > start) & (full.times <= end)
+    assert list(window.times[1:]) == list(full.times[inside])
+    assert list(window.values[1:]) == list(full.values[inside])
+    print("PASS")
+
+def test_synthetic():
+    print("Testing x values, wide vectors and chunk boundaries...")
+    path = os.path.join(tempfile.mkdtemp(), "wave.vcd")
+    synthetic(path, 5000)
+    wave = VCDFile(path, interval=2048)
+    signals = wave.arrays(["clk", "count", "bus"])
+    assert len(signals["clk"].times) == 5000
+    assert not signals["count"].valid[0] and signals["count"].valid[1:].all()
+    assert signals["count"].values[-1] == 4999 // 2 % 256
+    assert signals["bus"].values.dtype == object and signals["bus"].values[-1] == 1 << 69 | 4999
+    assert wave.value_at("count", 5) is None
+    assert wave.value_at("count", 12345) == 1233 // 2 % 256
+    assert len(wave.rising_edges("clk")) == 2500
+
+    # Tiny read chunks must find the same changes
+    chunk = vcd.CHUNK
+    vcd.CHUNK = 100
+    try:
+        small = VCDFile(path, index=False).arrays(["count", "bus"])
+    finally:
+        vcd.CHUNK = chunk
+    assert list(small["count"].values) == list(signals["count"].values)
+    assert list(small["bus"].times) == list(signals["bus"].times)
+    print("PASS")
+
+if __name__ == "__main__":
+    test_resolve()
+    test_value_at()
+    test_arrays_and_sample()
+    test_synthetic()
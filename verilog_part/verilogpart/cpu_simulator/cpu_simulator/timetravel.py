@@ -0,0 +1,203 @@
+import bisect
+from collections import deque
+
+from snapshot import STAGES, capture_latch, apply_latch
+
+# Reverse execution for the pipeline.
+# While attached (pipe.journal = TimeTravel(...)), every Pipeline.step()
+# appends an undo entry holding the PC and latch contents from before the
+# cycle plus the old values of the registers (CPU.write/set_register) and
+# memory words (Memory.store) the cycle overwrote, and the counter changes
+# (pipe.counters) it made. Recent cycles are undone
+# straight from this journal; older ones are reached by restoring the
+# nearest periodic checkpoint (Pipeline.snapshot()) and re-running at most
+# one checkpoint interval forward. Both the journal and the checkpoint list
+# are bounded: when there are too many checkpoints the interval doubles and
+# every other one is dropped. With a branch predictor or caches attached
+# every step back goes through a checkpoint, since only those hold their state.
+#
+#   tt = TimeTravel(pipe, program)
+#   ... run as usual ...
+#   tt.step_back(100)
+#   tt.run_back_to(pc=12)
+
+
+class TimeTravel:
+    def __init__(self, pipe, program, checkpoint_interval=1000, journal_limit=10000, max_checkpoints=4096):
+        self.pipe = pipe
+        self.program = program
+        self.interval = checkpoint_interval
+        self.max_checkpoints = max_checkpoints
+        self.entries = deque(maxlen=journal_limit)
+        self.checkpoints = {}
+        self._cycles = [] # Sorted checkpoint cycles
+        self._add_checkpoint()
+        self._start()
+        pipe.journal = self
+
+    def detach(self):
+        self.pipe.journal = None
+        self.pipe.cpu.journal = None
+        self.pipe.memory.journal = None
+
+    @property
+    def earliest(self):
+        return self._cycles[0]
+
+    # --- Recording ---
+
+    def _start(self):
+        # Undo information for the next cycle
+        pipe = self.pipe
+        self._pc = pipe.cpu.pc
+        self._latches = [capture_latch(getattr(pipe, stage)) for stage in STAGES]
+        self._regs = pipe.cpu.journal = []
+        self._mem = pipe.memory.journal = []
+        self._counts = (pipe._stalls, pipe._squashed, pipe._fwd_hits, pipe._freeze_cycles)
+
+    def record(self, pipe):
+        # Called by Pipeline.step() at the end of every cycle
+        # A cycle retires the instruction now in WB unless it was frozen, and
+        # a flush is always raised by the instruction in EX
+        counts = self._counts
+        retired = pipe.WB if pipe._freeze_cycles == counts[3] else None
+        flusher = pipe.EX if pipe.flushed else None
+        self.entries.append((self._pc, self._latches, self._regs, self._mem, counts, retired, flusher))
+        if pipe.cycle % self.interval == 0 and pipe.cycle not in self.checkpoints:
+            self._add_checkpoint()
+        self._start()
+
+    def _add_checkpoint(self):
+        cycle = self.pipe.cycle
+        self.checkpoints[cycle] = self.pipe.snapshot()
+        bisect.insort(self._cycles, cycle)
+        if len(self._cycles) > self.max_checkpoints:
+            self.interval *= 2
+            keep = [c for c in self._cycles[1:] if c % self.interval == 0]
+            for c in self._cycles[1:]:
+                if c % self.interval:
+                    del self.checkpoints[c]
+            self._cycles = self._cycles[:1] + keep
+
+    # --- Stepping backwards ---
+
+    def _undo(self):
+        pipe = self.pipe
+        cpu = pipe.cpu
+        memory = pipe.memory
+        pc, latches, regs, mem, counts, retired, flusher = self.entries.pop()
+        cpu.journal = memory.journal = None
+        for idx, value in reversed(self._regs):
+            cpu.regs[idx] = value
+        for address, value in reversed(self._mem):
+            memory.store(address, value)
+        for idx, value in reversed(regs):
+            cpu.regs[idx] = value
+        for address, value in reversed(mem):
+            memory.store(address, value)
+        cpu.pc = pc
+        for stage, latch in zip(STAGES, latches):
+            setattr(pipe, stage, apply_latch(latch))
+        pipe.cycle -= 1
+        pipe.flushed = False
+        pipe._stalls, pipe._squashed, pipe._fwd_hits, pipe._freeze_cycles = counts
+        _uncount(pipe._retired, retired)
+        _uncount(pipe._flushes, flusher)
+        self._start()
+
+    def _replay(self, cycles):
+        pipe = self.pipe
+        program = self.program
+        for _ in range(cycles):
+            pipe.fetch(program)
+            pipe.step()
+
+    def _seek(self, target):
+        # Restore the nearest checkpoint at or before `target`, then run forward
+        i = bisect.bisect_right(self._cycles, target) - 1
+        cycle = self._cycles[i]
+        self.pipe.restore(self.checkpoints[cycle])
+        self.entries.clear()
+        self._start()
+        self._replay(target - cycle)
+
+    def _truncate(self, target):
+        # The history after `target` is discarded: the run may now diverge
+        i = bisect.bisect_right(self._cycles, target)
+        for c in self._cycles[i:]:
+            del self.checkpoints[c]
+        del self._cycles[i:]
+
+    def step_back(self, n=1):
+        pipe = self.pipe
+        target = pipe.cycle - n
+        if target < self.earliest:
+            raise ValueError(f"Cycle {target} is before the earliest checkpoint ({self.earliest})")
+        self._truncate(target)
+        # The journal does not cover predictor or cache state: with either
+        # attached, always go through a checkpoint. The same goes for cycles
+        # before the last counters.reset(), whose counts were cleared.
+        journal_only = (pipe.predictor is None and pipe.icache is None and pipe.dcache is None
+                        and target >= pipe.counters.start_cycle)
+        if journal_only and target >= pipe.cycle - len(self.entries):
+            for _ in range(n):
+                self._undo()
+        else:
+            self._seek(target)
+        return pipe.cycle
+
+    def run_back_to(self, pc=None, cycle=None):
+        # Go back to a cycle, or to the last earlier cycle after which the
+        # next fetch is from `pc`. Returns the new cycle, or None if `pc`
+        # was not reached in the recorded history (the state is unchanged).
+        if cycle is not None:
+            return self.step_back(self.pipe.cycle - cycle)
+        if pc is None:
+            raise ValueError("run_back_to needs a pc or a cycle")
+
+        pipe = self.pipe
+        now = pipe.cycle
+        # Entry k (newest first) holds the state at the end of cycle now - k - 1
+        for k, entry in enumerate(reversed(self.entries)):
+            if entry[0] == pc:
+                return self.step_back(k + 1)
+
+        # Not in the journal: scan checkpoint intervals backwards by replaying them
+        end = now - len(self.entries)
+        found = None
+        saved = pipe.snapshot()
+        self.detach()
+        try:
+            i = bisect.bisect_right(self._cycles, end) - 1
+            if i >= 0 and self._cycles[i] == end:
+                i -= 1 # The state at `end` itself was checked via the journal
+            while i >= 0 and found is None:
+                start = self._cycles[i]
+                pipe.restore(self.checkpoints[start])
+                for c in range(start, end):
+                    if pipe.cpu.pc == pc:
+                        found = c
+                    pipe.fetch(self.program)
+                    pipe.step()
+                end = start
+                i -= 1
+        finally:
+            pipe.restore(saved)
+            pipe.journal = self
+            self._start()
+
+        if found is None:
+            return None
+        self._truncate(found)
+        self._seek(found)
+        return pipe.cycle
+
+
+def _uncount(counts, key):
+    if key is None:
+        return
+    n = counts.get(key, 0) - 1
+    if n > 0:
+        counts[key] = n
+    else:
+        counts.pop(key, None)
@@ -0,0 +1,220 @@
+import bisect
+import collections
+import lzma
+import struct
+import zlib
+
+from instruction import JType
+from predecode import decode, RA
+
+# Compact binary execution trace.
+# TraceRecorder is attached to a Pipeline (pipe.recorder = TraceRecorder(...))
+# and writes one fixed-width record per cycle into a preallocated buffer,
+# which is flushed to disk as one (optionally compressed) chunk when full.
+# A chunk index written on close lets TraceReader seek to any cycle by
+# decompressing a single chunk, without re-simulating.
+#
+# File layout:
+#   header   MAGIC, version, compression, record size
+#   chunks   raw or compressed runs of records
+#   index    (first_cycle, count, offset, stored_size) per chunk
+#   trailer  index offset, chunk count, MAGIC
+
+MAGIC = b"CPUTRACE"
+VERSION = 1
+HEADER = struct.Struct("<8sBBH")
+INDEX_ENTRY = struct.Struct("<IIQI")
+TRAILER = struct.Struct("<QI8s")
+
+# cycle, pc, stage occupancy, flags, WB register, WB value, $ra link value,
+# store address, store value
+RECORD = struct.Struct("<IHBBBHHHH")
+TraceRecord = collections.namedtuple(
+    "TraceRecord", "cycle pc stages flags reg reg_value link_value mem_addr mem_value")
+
+# Stage occupancy bits
+STAGE_IF = 1
+STAGE_ID = 2
+STAGE_EX = 4
+STAGE_MEM = 8
+STAGE_WB = 16
+
+# Flags
+FLAG_STALL = 1
+FLAG_FLUSH = 2
+FLAG_REG_WRITE = 4  # WB wrote reg/reg_value
+FLAG_MEM_WRITE = 8  # MEM stored mem_value at mem_addr
+FLAG_LINK = 16      # JAL in EX wrote link_value to $ra
+FLAG_FROZEN = 32    # Frozen on a cache miss: no stage moved, nothing written
+
+COMPRESSION = {None: 0, "zlib": 1, "lzma": 2}
+_COMPRESS = {0: None, 1: zlib.compress, 2: lzma.compress}
+_DECOMPRESS = {0: None, 1: zlib.decompress, 2: lzma.decompress}
+
+
+def _rec(instruction):
+    try:
+        return instruction.decoded
+    except AttributeError:
+        return decode(instruction)
+
+
+class TraceRecorder:
+    def __init__(self, path, chunk_records=65536, compression=None):
+        if compression not in COMPRESSION:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.file = open(path, "wb")
+        self.compression = COMPRESSION[compression]
+        self.chunk_records = chunk_records
+        self.buffer = bytearray(chunk_records * RECORD.size)
+        self.count = 0
+        self.first_cycle = 0
+        self.index = []
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.compression, RECORD.size))
+
+    def record(self, pipe, stall, frozen=False):
+        stages = 0
+        if pipe.IF is not None: stages |= STAGE_IF
+        if pipe.ID is not None: stages |= STAGE_ID
+        if pipe.EX is not None: stages |= STAGE_EX
+        if pipe.MEM is not None: stages |= STAGE_MEM
+        if pipe.WB is not None: stages |= STAGE_WB
+
+        reg = reg_value = link_value = mem_addr = mem_value = 0
+        if frozen:
+            # WB/MEM still hold what they wrote on the cycle before the miss
+            flags = FLAG_FROZEN
+        else:
+            flags = FLAG_STALL if stall else 0
+            if pipe.flushed:
+                flags |= FLAG_FLUSH
+
+            if pipe.WB is not None:
+                wb = _rec(pipe.WB).wb
+                if wb is not None:
+                    flags |= FLAG_REG_WRITE
+                    reg = wb
+                    reg_value = getattr(pipe.WB, "result", 0) & 0xFFFF if wb else 0
+
+            ex = pipe.EX
+            if ex is not None and not stall and isinstance(ex, JType) and ex.opcode == "JAL":
+                flags |= FLAG_LINK
+                link_value = pipe.cpu.regs[RA]
+
+            if pipe.MEM is not None and _rec(pipe.MEM).is_store:
+                flags |= FLAG_MEM_WRITE
+                mem_addr = pipe.MEM.effective_address & 0xFFFF
+                mem_value = pipe.MEM.val_to_store & 0xFFFF
+
+        if self.count == 0:
+            self.first_cycle = pipe.cycle
+        RECORD.pack_into(self.buffer, self.count * RECORD.size, pipe.cycle, pipe.cpu.pc & 0xFFFF,
+                         stages, flags, reg, reg_value, link_value, mem_addr, mem_value)
+        self.count += 1
+        if self.count == self.chunk_records:
+            self.flush()
+
+    def flush(self):
+        if not self.count:
+            return
+        data = bytes(memoryview(self.buffer)[:self.count * RECORD.size])
+        compress = _COMPRESS[self.compression]
+        if compress is not None:
+            data = compress(data)
+        self.index.append((self.first_cycle, self.count, self.file.tell(), len(data)))
+        self.file.write(data)
+        self.count = 0
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        index_offset = self.file.tell()
+        for entry in self.index:
+            self.file.write(INDEX_ENTRY.pack(*entry))
+        self.file.write(TRAILER.pack(index_offset, len(self.index), MAGIC))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recorders:
+    # Fan-out for the pipeline's single recorder slot, so a TraceRecorder, a
+    # Profiler and the like can watch the same run (see Pipeline.add_recorder)
+    def __init__(self, *recorders):
+        self.recorders = list(recorders)
+
+    def record(self, pipe, stall, frozen=False):
+        for recorder in self.recorders:
+            recorder.record(pipe, stall, frozen)
+
+
+class TraceReader:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        magic, version, compression, record_size = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{path} is not a version {VERSION} trace file")
+        self.decompress = _DECOMPRESS[compression]
+
+        self.file.seek(-TRAILER.size, 2)
+        index_offset, chunks, magic = TRAILER.unpack(self.file.read(TRAILER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} has no chunk index (recorder not closed?)")
+        self.file.seek(index_offset)
+        raw = self.file.read(chunks * INDEX_ENTRY.size)
+        self.index = [INDEX_ENTRY.unpack_from(raw, i * INDEX_ENTRY.size) for i in range(chunks)]
+        self._first_cycles = [entry[0] for entry in self.index]
+
+    def __len__(self):
+        return sum(entry[1] for entry in self.index)
+
+    def _chunk(self, i):
+        first_cycle, count, offset, size = self.index[i]
+        self.file.seek(offset)
+        data = self.file.read(size)
+        if self.decompress is not None:
+            data = self.decompress(data)
+        return data, count
+
+    def _records(self, data, count, start=0):
+        for i in range(start, count):
+            yield TraceRecord._make(RECORD.unpack_from(data, i * RECORD.size))
+
+    def __iter__(self):
+        for i in range(len(self.index)):
+            data, count = self._chunk(i)
+            yield from self._records(data, count)
+
+    def seek(self, cycle):
+        # Iterate records from `cycle` onwards, touching only the chunks needed
+        i = bisect.bisect_right(self._first_cycles, cycle) - 1
+        if i < 0:
+            i, start = 0, 0
+        else:
+            start = cycle - self._first_cycles[i]
+            if start >= self.index[i][1]:
+                i, start = i + 1, 0
+        for j in range(i, len(self.index)):
+            data, count = self._chunk(j)
+            yield from self._records(data, count, start if j == i else 0)
+
+    def record_at(self, cycle):
+        for record in self.seek(cycle):
+            if record.cycle == cycle:
+                return record
+            break
+        raise KeyError(f"Cycle {cycle} not in trace")
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
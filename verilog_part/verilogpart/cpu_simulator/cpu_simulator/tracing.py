@@ -0,0 +1,98 @@
+import collections
+import sys
+
+# Structured tracing for the pipeline.
+# A Tracer filters events by category and hands them to a sink. The pipeline
+# only holds a tracer when tracing is wanted (pipe.tracer = Tracer(...)), so
+# with tracing off each trace point costs a single attribute check.
+#
+# Events are tuples: (cycle, category, name, fields)
+
+BRANCH = 1   # Taken BEQ/BNE
+JUMP = 2     # J, JAL, JR
+STORE = 4    # Memory stores
+STAGES = 8   # IF/ID/EX/MEM/WB contents after every cycle
+ALL = BRANCH | JUMP | STORE | STAGES
+
+CATEGORY_NAMES = {BRANCH: "branch", JUMP: "jump", STORE: "store", STAGES: "stages"}
+
+
+def format_event(event):
+    cycle, category, name, fields = event
+    if category == STAGES:
+        lines = ["Pipeline State:"]
+        lines += [f"{stage}: {value}" for stage, value in fields.items()]
+        lines.append("------")
+        return "\n".join(lines)
+    args = " ".join(f"{key}={value}" for key, value in fields.items())
+    return f"[{cycle}] {CATEGORY_NAMES.get(category, category)}: {name} {args}"
+
+
+class NullSink:
+    def write(self, event):
+        pass
+
+    def close(self):
+        pass
+
+
+class RingBufferSink:
+    # Keeps the last `capacity` events in memory
+    def __init__(self, capacity=4096):
+        self.buffer = collections.deque(maxlen=capacity)
+
+    def write(self, event):
+        self.buffer.append(event)
+
+    def events(self):
+        return list(self.buffer)
+
+    def clear(self):
+        self.buffer.clear()
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    # Writes formatted events to a path or an open text stream
+    def __init__(self, target=None):
+        if target is None:
+            target = sys.stdout
+        if isinstance(target, str):
+            self.stream = open(target, "w")
+            self.owned = True
+        else:
+            self.stream = target
+            self.owned = False
+
+    def write(self, event):
+        self.stream.write(format_event(event) + "\n")
+
+    def close(self):
+        if self.owned:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+
+class Tracer:
+    def __init__(self, sink=None, categories=ALL):
+        self.sink = sink if sink is not None else RingBufferSink()
+        self.categories = categories
+
+    def enabled(self, category):
+        return bool(self.categories & category)
+
+    def enable(self, category):
+        self.categories |= category
+
+    def disable(self, category):
+        self.categories &= ~category
+
+    def emit(self, cycle, category, name, **fields):
+        if self.categories & category:
+            self.sink.write((cycle, category, name, fields))
+
+    def close(self):
+        self.sink.close()
@@ -0,0 +1,196 @@
+from cpu import CPU
+from memory import PagedMemory
+from predecode import (
+    decode,
+    OP_ADD, OP_SUB, OP_AND, OP_OR, OP_SLT, OP_JR, OP_ADDI,
+    OP_LOAD, OP_STORE, OP_BEQ, OP_BNE, OP_J, OP_JAL, RA,
+)
+import functional
+
+# Basic-block translation cache.
+# The assembled program is static, so straight-line runs between control
+# transfers are compiled once into a generated Python function and re-run
+# from the cache on every later visit. Blocks end at BEQ/BNE/J/JAL/JR and
+# before any branch/jump target. A block whose branch goes back to its own
+# entry (a tight loop) iterates inside the generated function, keeping its
+# registers in locals, for as many iterations as the instruction budget
+# allows. Semantics match functional.run().
+
+TERMINATORS = (OP_BEQ, OP_BNE, OP_J, OP_JAL, OP_JR)
+
+
+class Block:
+    __slots__ = ("entry", "length", "fn", "halt", "loop", "source")
+
+    def __init__(self, entry, length, fn, halt, loop, source):
+        self.entry = entry
+        self.length = length # Instructions retired per iteration
+        self.fn = fn         # fn(regs, load, store) -> next pc, or for a loop
+                             # fn(regs, load, store, iterations) -> (next pc, iterations run)
+        self.halt = halt     # Ends in a jump to itself
+        self.loop = loop     # Ends in a branch back to its entry
+        self.source = source
+
+
+def find_leaders(records):
+    leaders = {0}
+    for pc, rec in enumerate(records):
+        if rec.op in TERMINATORS:
+            leaders.add(pc + 1)
+            if rec.op != OP_JR:
+                leaders.add(rec.imm)
+    return leaders
+
+
+def _reg(idx):
+    return f"r{idx}" if idx else "0"
+
+
+class Translator:
+    def __init__(self, program):
+        self.records = [getattr(instr, "decoded", None) or decode(instr) for instr in program]
+        self.leaders = find_leaders(self.records)
+        self.blocks = {}
+
+    def lookup(self, pc):
+        blk = self.blocks.get(pc)
+        if blk is None:
+            blk = self.blocks[pc] = self.translate(pc)
+        return blk
+
+    def translate(self, entry):
+        records = self.records
+        n = len(records)
+        body = []
+        live_in = set() # Read before being written in this block
+        written = set()
+        halt = False
+        pc = entry
+        tail = None
+        branch = None # (condition, taken target) of a closing BEQ/BNE
+
+        def write(idx, expr):
+            if idx:
+                written.add(idx)
+                body.append(f"    r{idx} = {expr}")
+
+        while pc < n:
+            rec = records[pc]
+            op = rec.op
+            reads = (rec.rs1, rec.rs2, rec.rd) if op in (OP_STORE, OP_BEQ, OP_BNE) else (rec.rs1, rec.rs2)
+            for idx in reads:
+                if idx and idx not in written:
+                    live_in.add(idx)
+            a = _reg(rec.rs1)
+            b = _reg(rec.rs2)
+            d = _reg(rec.rd)
+
+            if op == OP_ADDI:
+                write(rec.rd, f"({a} + {rec.imm}) & 0xFFFF")
+            elif op == OP_ADD:
+                write(rec.rd, f"({a} + {b}) & 0xFFFF")
+            elif op == OP_SUB:
+                write(rec.rd, f"({a} - {b}) & 0xFFFF")
+            elif op == OP_AND:
+                write(rec.rd, f"{a} & {b}")
+            elif op == OP_OR:
+                write(rec.rd, f"{a} | {b}")
+            elif op == OP_SLT:
+                write(rec.rd, f"1 if {a} < {b} else 0")
+            elif op == OP_LOAD:
+                if rec.rd:
+                    write(rec.rd, f"load(({a} + {rec.imm}) & 0xFFFF) & 0xFFFF")
+                else:
+                    body.append(f"    load(({a} + {rec.imm}) & 0xFFFF)")
+            elif op == OP_STORE:
+                body.append(f"    store(({a} + {rec.imm}) & 0xFFFF, {d})")
+            elif op == OP_BEQ:
+                branch = (f"{a} == {d}", rec.imm)
+                tail = f"{rec.imm} if {a} == {d} else {pc + 1}"
+            elif op == OP_BNE:
+                branch = (f"{a} != {d}", rec.imm)
+                tail = f"{rec.imm} if {a} != {d} else {pc + 1}"
+            elif op == OP_J:
+                tail = f"{rec.imm}"
+                halt = rec.imm == pc
+            elif op == OP_JAL:
+                write(RA, f"{(pc + 1) & 0xFFFF}")
+                tail = f"{rec.imm}"
+            elif op == OP_JR:
+                tail = a
+
+            pc += 1
+            if tail is not None or pc in self.leaders:
+                break
+
+        if tail is None:
+            tail = f"{pc}"
+
+        loop = branch is not None and branch[1] == entry
+        if loop:
+            # Registers written in the body are read by the next iteration,
+            # so they need values before the first one as well
+            live_in |= written
+            condition = branch[0]
+            lines = [f"def block_{entry}(regs, load, store, iterations):"]
+            lines += [f"    r{idx} = regs[{idx}]" for idx in sorted(live_in)]
+            lines.append("    n = 0")
+            lines.append("    while True:")
+            lines += ["    " + line for line in body]
+            lines.append("        n += 1")
+            lines.append(f"        if not ({condition}):")
+            lines.append(f"            pc = {pc}")
+            lines.append("            break")
+            lines.append("        if n >= iterations:")
+            lines.append(f"            pc = {entry}")
+            lines.append("            break")
+            lines += [f"    regs[{idx}] = r{idx}" for idx in sorted(written)]
+            lines.append("    return pc, n")
+        else:
+            lines = [f"def block_{entry}(regs, load, store):"]
+            lines += [f"    r{idx} = regs[{idx}]" for idx in sorted(live_in)]
+            lines += body
+            lines += [f"    regs[{idx}] = r{idx}" for idx in sorted(written)]
+            lines.append(f"    return {tail}")
+        source = "\n".join(lines) + "\n"
+
+        namespace = {}
+        exec(compile(source, f"<block {entry}>", "exec"), namespace)
+        return Block(entry, pc - entry, namespace[f"block_{entry}"], halt, loop, source)
+
+
+def run(program, max_instructions=1000000, cpu=None, memory=None, translator=None):
+    if cpu is None:
+        cpu = CPU()
+    if memory is None:
+        memory = PagedMemory()
+    if translator is None:
+        translator = Translator(program)
+
+    blocks = translator.blocks
+    lookup = translator.lookup
+    regs = cpu.regs
+    load = memory.load
+    store = memory.store
+    n = len(program)
+    pc = cpu.pc
+    retired = 0
+
+    while 0 <= pc < n:
+        blk = blocks.get(pc) or lookup(pc)
+        if retired + blk.length > max_instructions:
+            # Not enough budget for the whole block: finish by interpretation
+            cpu.pc = pc
+            cpu, memory, tail = functional.run(program, max_instructions - retired, cpu, memory)
+            return cpu, memory, retired + tail
+        if blk.loop:
+            pc, iterations = blk.fn(regs, load, store, (max_instructions - retired) // blk.length)
+            retired += iterations * blk.length
+            continue
+        retired += blk.length
+        pc = blk.fn(regs, load, store)
+        if blk.halt:
+            break
+
+    cpu.pc = pc
+    return cpu, memory, retired
@@ -0,0 +1,374 @@
+import bisect
+import json
+import os
+import re
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+
+# Streaming, indexed Value Change Dump reader.
+# The file is never loaded whole: it is read in large chunks, and changes of
+# unselected signals are skipped by searching only for the identifier codes
+# of the selected ones. A sidecar index (<file>.idx, JSON) records a
+# checkpoint every `interval` bytes: the time, the file offset and the raw
+# value of every signal at that point. Reading a signal at an arbitrary time
+# then seeks to the checkpoint before it and streams at most one interval.
+#
+#   wave = VCDFile("cpu_wave.vcd")
+#   wave.value_at("uut.pc_current", 500000)
+#   signals = wave.arrays(["pc_current", "write_back_data"])
+#   signals["pc_current"].times, signals["pc_current"].values
+#
+# Signals are named by their dotted hierarchical name (tb_cpu.uut.pc_current)
+# or any unique dotted suffix of it (uut.pc_current, pc_current). Values are
+# ints, or None while any bit is x/z; in arrays, such samples are 0 with
+# valid=False.
+
+INDEX_VERSION = 1
+DEFAULT_INTERVAL = 4 * 1024 * 1024
+CHUNK = 8 * 1024 * 1024 # Bytes per read when extracting selected signals
+SCALAR = {b"0", b"1", b"x", b"z", b"X", b"Z"}
+TIMESTAMP = re.compile(rb"\n#(\d+)")
+
+# Value changes of one signal: times (int64), values (uint64, or object for
+# vectors wider than 64 bits) and valid (False where x/z)
+Signal = namedtuple("Signal", ["times", "values", "valid"])
+
+
+def parse_value(raw):
+    # Raw VCD value (bits without the leading b) -> int, or None for x/z
+    try:
+        return int(raw, 2)
+    except ValueError:
+        return None
+
+
+def read_header(f):
+    # Consumes the header of an open VCD file (text or binary) up to
+    # $enddefinitions; returns {name: (code, width)}
+    variables = {}
+    scope = []
+    for line in f:
+        if isinstance(line, bytes):
+            line = line.decode()
+        tokens = line.split()
+        if not tokens:
+            continue
+        keyword = tokens[0]
+        if keyword == "$scope":
+            scope.append(tokens[2])
+        elif keyword == "$upscope":
+            scope.pop()
+        elif keyword == "$var":
+            width, code, name = int(tokens[2]), tokens[3], tokens[4]
+            variables[".".join(scope + [name])] = (code, width)
+        elif keyword == "$enddefinitions":
+            break
+    return variables
+
+
+class VCDFile:
+    def __init__(self, path, index=True, interval=DEFAULT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.use_index = index
+        with open(path, "rb") as f:
+            offset = 0
+            lines = []
+            for line in f:
+                offset += len(line)
+                lines.append(line)
+                if line.lstrip().startswith(b"$enddefinitions"):
+                    break
+        self.variables = read_header(lines)
+        self.data_offset = offset
+        self._index = None
+
+    # --- Names ---
+
+    def resolve(self, name):
+        # Full dotted name of `name`, which may be a unique dotted suffix
+        if name in self.variables:
+            return name
+        matches = [full for full in self.variables if full.endswith("." + name)]
+        if len(matches) != 1:
+            problem = "Ambiguous" if matches else "No"
+            raise KeyError(f"{problem} signal {name} in {self.path}" + (f": {matches}" if matches else ""))
+        return matches[0]
+
+    def code(self, name):
+        return self.variables[self.resolve(name)][0]
+
+    def width(self, name):
+        return self.variables[self.resolve(name)][1]
+
+    def _codes(self, names):
+        # Identifier code (bytes) -> names asking for it
+        codes = {}
+        for name in names:
+            codes.setdefault(self.code(name).encode(), []).append(name)
+        return codes
+
+    # --- Streaming ---
+
+    def _scan(self, offset, codes=None, end=None):
+        # Yields (time, code, raw) from `offset`, for `codes` only (a set of
+        # bytes, None for every signal), stopping after time `end`
+        if codes is not None:
+            yield from self._scan_selected(offset, codes, end)
+            return
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            time = 0
+            for line in f:
+                c = line[:1]
+                if c == b"#":
+                    time = int(line[1:])
+                    if end is not None and time > end:
+                        return
+                    continue
+                if c in SCALAR:
+                    code = line[1:].strip()
+                    if codes is None or code in codes:
+                        yield time, code, c
+                elif c == b"b" or c == b"r":
+                    raw, _, code = line[1:].partition(b" ")
+                    code = code.strip()
+                    if codes is None or code in codes:
+                        yield time, code, raw
+
+    def _scan_selected(self, offset, codes, end):
+        # Same as _scan, but reads large chunks and finds timestamps and the
+        # selected codes with literal searches, so other lines never reach
+        # Python code. A line ending in a selected code is a change of it
+        # when preceded by "<bit>" at the line start or by "b<bits> ".
+        endings = [re.compile(re.escape(code) + rb"(?=\r?\n)") for code in codes]
+        time = 0
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            rest = b"\n"
+            while True:
+                block = f.read(CHUNK)
+                data = rest + block
+                if block:
+                    cut = data.rfind(b"\n")
+                    data, rest = data[:cut + 1], data[cut:]
+                else:
+                    data += b"\n"
+
+                found = []
+                for pattern in endings:
+                    for match in pattern.finditer(data):
+                        i = match.start()
+                        before = data[i - 1:i]
+                        if before in SCALAR and data[i - 2:i - 1] == b"\n":
+                            found.append((i, match.group(), before))
+                        elif before == b" ":
+                            line = data.rfind(b"\n", 0, i) + 1
+                            if data[line:line + 1] in (b"b", b"r"):
+                                found.append((i, match.group(), data[line + 1:i - 1]))
+                found.sort()
+
+                stamps = TIMESTAMP.finditer(data)
+                stamp = next(stamps, None)
+                for i, code, raw in found:
+                    while stamp is not None and stamp.start() < i:
+                        time = int(stamp.group(1))
+                        if end is not None and time > end:
+                            return
+                        stamp = next(stamps, None)
+                    yield time, code, raw
+                for stamp in stamps if stamp is None else [stamp, *stamps]:
+                    time = int(stamp.group(1))
+                    if end is not None and time > end:
+                        return
+                if not block:
+                    return
+
+    def changes(self, names, start=None, end=None):
+        # Streams (time, name, value) for the selected signals. With `start`,
+        # the first entries give each signal's value at `start`.
+        codes = self._codes(names)
+        if start is None:
+            for time, code, raw in self._scan(self.data_offset, set(codes), end):
+                value = parse_value(raw)
+                for name in codes[code]:
+                    yield time, name, value
+            return
+
+        # Replay from the checkpoint up to `start`, then report that state
+        offset, state = self._seek(start)
+        state = {code: state.get(code) for code in codes}
+        replaying = True
+        for time, code, raw in self._scan(offset, set(codes), end):
+            if replaying:
+                if time <= start:
+                    state[code] = raw
+                    continue
+                yield from self._initial(codes, state, start)
+                replaying = False
+            value = parse_value(raw)
+            for name in codes[code]:
+                yield time, name, value
+        if replaying:
+            yield from self._initial(codes, state, start)
+
+    def _initial(self, codes, state, start):
+        for code, wanted in codes.items():
+            raw = state[code]
+            for name in wanted:
+                yield start, name, None if raw is None else parse_value(raw)
+
+    # --- Index ---
+
+    @property
+    def index_path(self):
+        return self.path + ".idx"
+
+    def index(self):
+        # Checkpoints, loaded from the sidecar or built with one full pass
+        if self._index is not None:
+            return self._index
+        stat = os.stat(self.path)
+        if self.use_index:
+            try:
+                with open(self.index_path, "r") as f:
+                    index = json.load(f)
+                if (index["version"] == INDEX_VERSION and index["size"] == stat.st_size
+                        and index["mtime_ns"] == stat.st_mtime_ns and index["interval"] == self.interval):
+                    self._index = index
+                    return index
+            except (OSError, ValueError, KeyError):
+                pass
+        index = self._build_index(stat)
+        if self.use_index:
+            self._write_index(index)
+        self._index = index
+        return index
+
+    def _build_index(self, stat):
+        checkpoints = []
+        state = {}
+        next_checkpoint = self.data_offset
+        offset = self.data_offset
+        time = 0
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                c = line[:1]
+                if c == b"#":
+                    time = int(line[1:])
+                    if offset >= next_checkpoint:
+                        # State before this timestamp's changes, resume here
+                        checkpoints.append([time, offset, {code.decode(): raw.decode() for code, raw in state.items()}])
+                        next_checkpoint = offset + self.interval
+                elif c in SCALAR:
+                    state[line[1:].strip()] = c
+                elif c == b"b" or c == b"r":
+                    raw, _, code = line[1:].partition(b" ")
+                    state[code.strip()] = raw
+                offset += len(line)
+        return {"version": INDEX_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "interval": self.interval, "end_time": time, "checkpoints": checkpoints}
+
+    def _write_index(self, index):
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        try:
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp, self.index_path)
+        except OSError:
+            pass # Read-only location: keep the index in memory
+
+    def _seek(self, time):
+        # (offset, {code: raw}) of the last checkpoint at or before `time`
+        checkpoints = self.index()["checkpoints"]
+        i = bisect.bisect_right([cp[0] for cp in checkpoints], time) - 1
+        if i < 0:
+            return self.data_offset, {}
+        _, offset, state = checkpoints[i]
+        return offset, {code.encode(): raw.encode() for code, raw in state.items()}
+
+    @property
+    def end_time(self):
+        return self.index()["end_time"]
+
+    # --- Random access and arrays ---
+
+    def value_at(self, name, time):
+        # Value of one signal after all changes at `time`
+        code = self.code(name).encode()
+        offset, state = self._seek(time)
+        raw = state.get(code)
+        for _, _, raw in self._scan(offset, {code}, time):
+            pass
+        return None if raw is None else parse_value(raw)
+
+    def arrays(self, names, start=None, end=None):
+        # {name: Signal} of the selected signals' changes in [start, end]
+        times = {name: [] for name in names}
+        values = {name: [] for name in names}
+        for time, name, value in self.changes(names, start, end):
+            times[name].append(time)
+            values[name].append(value)
+        result = {}
+        for name in names:
+            wide = self.width(name) > 64
+            raw = values[name]
+            valid = np.array([value is not None for value in raw], dtype=bool)
+            data = [0 if value is None else value for value in raw]
+            result[name] = Signal(np.array(times[name], dtype=np.int64),
+                                  np.array(data, dtype=object if wide else np.uint64), valid)
+        return result
+
+    def rising_edges(self, clock="tb_cpu.clk", start=None, end=None):
+        signal = self.arrays([clock], start, end)[clock]
+        level = np.where(signal.valid, signal.values, 2).astype(np.int64)
+        rising = (level[1:] == 1) & (level[:-1] == 0)
+        return signal.times[1:][rising]
+
+    def sample(self, names, times, before=True):
+        # Values of the selected signals at each of `times`. before=True gives
+        # the value just before any change at that time (e.g. the settled
+        # value of a register at the clock edge that updates it).
+        times = np.asarray(times, dtype=np.int64)
+        start = int(times[0]) - 1 if len(times) and before else (int(times[0]) if len(times) else None)
+        end = int(times[-1]) if len(times) else None
+        result = {}
+        for name, signal in self.arrays(names, start, end).items():
+            i = np.searchsorted(signal.times, times, side="left" if before else "right") - 1
+            known = i >= 0
+            i = np.maximum(i, 0)
+            result[name] = Signal(times, signal.values[i] if len(signal.times) else np.zeros(len(times), np.uint64),
+                                  (signal.valid[i] & known) if len(signal.times) else np.zeros(len(times), bool))
+        return result
+
+
+def clock_samples(path, names, clock="tb_cpu.clk"):
+    # Streams {name: value} for the selected signals as they stand just
+    # before each rising edge of `clock`, i.e. the settled values of a cycle
+    wave = VCDFile(path, index=False)
+    codes = wave._codes(names)
+    clock_code = wave.code(clock).encode()
+    values = dict.fromkeys(names)
+    before = dict(values)
+    rising = False
+    clock_value = None
+    current = None
+    for time, code, raw in wave._scan(wave.data_offset, set(codes) | {clock_code}):
+        if time != current:
+            if rising:
+                yield before
+                rising = False
+            before = dict(values)
+            current = time
+        value = parse_value(raw)
+        if code == clock_code:
+            rising = rising or (clock_value == 0 and value == 1)
+            clock_value = value
+        for name in codes.get(code, ()):
+            values[name] = value
+    if rising:
+        yield before
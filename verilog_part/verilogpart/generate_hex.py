@@ -1,25 +1,18 @@
-
 import sys
 import os
 
-# Add specific path to find the package
-sys.path.append(os.path.join(os.getcwd(), "cpu_simulator"))
-from cpu_simulator.instruction import Instruction
-from cpu_simulator.program import program
+# Add specific path to find the simulator modules (they use flat imports)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "cpu_simulator", "cpu_simulator"))
+from program import program
+from program_image import encode_program, write_hex
 
 def main():
-    with open("program.hex", "w") as f:
-        for i, instr in enumerate(program):
-            # to_binary returns 32-bit binary string
-            bin_str = instr.to_binary()
-            # Convert to hex
-            hex_val = f"{int(bin_str, 2):08x}"
-            f.write(f"{hex_val}\n")
-            print(f"Instr {i}: {instr} -> {hex_val}")
-        
-        # Fill rest with NOPs (0)
-        for _ in range(len(program), 256):
-             f.write("00000000\n")
+    words = encode_program(program)
+    for i, (instr, word) in enumerate(zip(program, words)):
+        print(f"Instr {i}: {instr} -> {word:08x}")
+
+    # Fill rest with NOPs (0)
+    write_hex("program.hex", words, depth=256)
 
 if __name__ == "__main__":
     main()